@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+# Edit-to-PDF latency of a one-page document, building with a fresh
+# interpreter each time versus the warm worker (preference "Keep the
+# interpreter running between builds").
+#
+# usage: scripts/benchmark_build_latency.py [pdflatex|xelatex|lualatex] [runs]
+
+import sys, os, os.path, time, tempfile
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import setzer.document.build_system.latex_worker.latex_worker as latex_worker
+
+interpreter = sys.argv[1] if len(sys.argv) > 1 else 'pdflatex'
+runs = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+document_template = '''\\documentclass{article}
+\\usepackage{amsmath}
+\\begin{document}
+Edit number %d.
+\\[ e^{i\\pi} + 1 = 0 \\]
+\\end{document}
+'''
+
+def write_document(tex_filename, count):
+    with open(tex_filename, 'w') as file:
+        file.write(document_template % count)
+
+def wait_for_process(process, input_line=None):
+    process.communicate(input=input_line, timeout=60)
+
+def benchmark_cold(tex_filename, arguments):
+    timings = list()
+    for count in range(runs):
+        start_time = time.time()
+        write_document(tex_filename, count)
+        process = subprocess.Popen(arguments + [os.path.basename(tex_filename)], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=os.path.dirname(tex_filename))
+        wait_for_process(process)
+        timings.append(time.time() - start_time)
+    return timings
+
+def benchmark_warm(tex_filename, arguments, build_folder):
+    worker = latex_worker.LaTeXWorker()
+    cwd = os.path.dirname(tex_filename)
+    worker.prepare(arguments, cwd, build_folder)
+
+    timings = list()
+    for count in range(runs):
+        time.sleep(1) # the user is typing, the worker warms up meanwhile
+        start_time = time.time()
+        write_document(tex_filename, count)
+        process, is_warm = worker.get_process(arguments, cwd, build_folder)
+        wait_for_process(process, ('\\input{' + os.path.basename(tex_filename) + '}\n').encode('utf-8'))
+        timings.append(time.time() - start_time)
+        worker.prepare(arguments, cwd, build_folder)
+    worker.stop()
+    return timings
+
+def print_timings(name, timings):
+    timings = sorted(timings)
+    print('{:<6} median {:.3f}s  min {:.3f}s  max {:.3f}s'.format(name, timings[len(timings) // 2], timings[0], timings[-1]))
+
+with tempfile.TemporaryDirectory() as folder:
+    # like the app, the interpreter runs in the document folder and
+    # writes to a build folder of its own.
+    tex_filename = os.path.join(folder, 'benchmark.tex')
+    build_folder = os.path.join(folder, 'build')
+    os.makedirs(build_folder)
+    arguments = [interpreter, '-synctex=1', '-interaction=nonstopmode', '-recorder', '-output-directory=' + build_folder, '-jobname=benchmark']
+
+    print(interpreter + ', ' + str(runs) + ' runs')
+    print_timings('cold', benchmark_cold(tex_filename, arguments))
+    print_timings('warm', benchmark_warm(tex_filename, arguments, build_folder))
+
+
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+# Time to render every page of a PDF at fit-width, in the render thread
+# versus the pool of render processes.
+#
+# usage: scripts/benchmark_preview_rendering.py file.pdf [width in pixels]
+
+import sys, os, os.path, time, math
+import _thread as thread
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import setzer.document.preview.preview_render_pool as preview_render_pool
+
+def get_tasks(pdf_filename, poppler_document, width, tile_size):
+    tasks = list()
+    pdf_date = os.path.getmtime(pdf_filename)
+    for page_number in range(poppler_document.get_n_pages()):
+        page_size = poppler_document.get_page(page_number).get_size()
+        scale_factor = width / page_size.width
+        device_height = math.ceil(page_size.height * scale_factor)
+        for column in range(math.ceil(width / tile_size)):
+            for row in range(math.ceil(device_height / tile_size)):
+                task = {'pdf_filename': pdf_filename, 'pdf_date': pdf_date, 'page_number': page_number, 'tile_key': (width, column, row), 'scale_factor': scale_factor, 'hidpi_factor': 1, 'page_width': width, 'device_width': width, 'device_height': device_height, 'matching_theme_colors': None, 'fg_color': None}
+                tasks.append(task)
+    return tasks
+
+def benchmark_thread(poppler_document, tasks, tile_size):
+    start_time = time.time()
+    for task in tasks:
+        preview_render_pool.render_tile(poppler_document.get_page(task['page_number']), task, tile_size)
+    return time.time() - start_time
+
+def benchmark_pool(render_pool, tasks):
+    lock = thread.allocate_lock()
+    lock.acquire()
+    results = list()
+    def on_tile_rendered(task, surface):
+        results.append(surface)
+        if len(results) == len(tasks):
+            lock.release()
+
+    start_time = time.time()
+    for task in tasks:
+        render_pool.render(task, on_tile_rendered)
+    lock.acquire()
+    return time.time() - start_time, len([surface for surface in results if surface == None])
+
+if __name__ == '__main__':
+    pdf_filename = os.path.abspath(sys.argv[1])
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else 1200
+
+    poppler_document = preview_render_pool.Poppler.Document.new_from_file(preview_render_pool.GLib.filename_to_uri(pdf_filename))
+    render_pool = preview_render_pool.PreviewRenderPool()
+    tasks = get_tasks(pdf_filename, poppler_document, width, render_pool.tile_size)
+    print(str(poppler_document.get_n_pages()) + ' pages, ' + str(len(tasks)) + ' tiles, ' + str(render_pool.number_of_workers) + ' workers')
+
+    print('thread {:.3f}s'.format(benchmark_thread(poppler_document, tasks, render_pool.tile_size)))
+    render_pool.start()
+    benchmark_pool(render_pool, tasks[:render_pool.number_of_workers]) # workers load the document
+    duration, failed = benchmark_pool(render_pool, tasks)
+    print('pool   {:.3f}s ({} failed)'.format(duration, failed))
+    render_pool.stop()
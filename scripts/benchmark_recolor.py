@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+# Time and peak memory of recoloring a rendered page for the dark preview,
+# the PIL based conversion Setzer used before versus recolor_surface().
+# Peak memory counts what is allocated through Python and numpy, PIL's
+# own image buffers are not included.
+#
+# usage: scripts/benchmark_recolor.py [runs]
+
+import sys, os, os.path, time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import setzer.document.preview.preview_render_pool as preview_render_pool
+
+import cairo
+import numpy as np
+from PIL import Image
+
+runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+fg_color = (0.87, 0.87, 0.87, 1)
+
+# an A4 page at 100%, 150%, 200% (or 100% on hidpi) and 300%
+page_sizes = [(794, 1123), (1191, 1684), (1588, 2246), (2382, 3369)]
+
+def get_page_surface(width, height):
+    surface = cairo.ImageSurface(cairo.Format.ARGB32, width, height)
+    ctx = cairo.Context(surface)
+    ctx.set_source_rgba(1, 1, 1, 1)
+    ctx.paint()
+    ctx.set_source_rgba(0, 0, 0, 1)
+    ctx.set_font_size(height / 80)
+    for line in range(60):
+        ctx.move_to(width / 10, height / 10 + line * height / 75)
+        ctx.show_text('The quick brown fox jumps over the lazy dog. ' * 2)
+    return surface
+
+def recolor_with_pil(surface, fg_color):
+    width, height = surface.get_width(), surface.get_height()
+    pil_img = Image.frombuffer("RGBA", (width, height), surface.get_data(), "raw", "RGBA", 0, 1)
+
+    img_data = np.array(pil_img, dtype=np.ubyte)
+    alpha = 255 - 0.3 * img_data[..., 0] - 0.6 * img_data[..., 1] - 0.1 * img_data[..., 2]
+    img_data[:,:,-1] = alpha
+    pil_img = Image.fromarray(np.ubyte(img_data))
+
+    im_bytes = bytearray(pil_img.tobytes('raw', 'BGRa'))
+    surface = cairo.ImageSurface.create_for_data(im_bytes, cairo.FORMAT_ARGB32, width, height)
+    temp_ctx = cairo.Context(surface)
+
+    temp_ctx.set_source_rgba(*fg_color)
+    temp_ctx.set_operator(cairo.Operator.IN)
+    temp_ctx.rectangle(0, 0, width, height)
+    temp_ctx.fill()
+    return surface
+
+def recolor_in_place(surface, fg_color):
+    preview_render_pool.recolor_surface(surface, fg_color)
+    return surface
+
+def benchmark(function, width, height):
+    timings = list()
+    peak = 0
+    for count in range(runs):
+        surface = get_page_surface(width, height)
+        tracemalloc.start()
+        start_time = time.time()
+        function(surface, fg_color)
+        timings.append(time.time() - start_time)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    timings.sort()
+    return timings[len(timings) // 2], peak
+
+def get_max_difference(width, height):
+    ''' The integer weights round a little differently. '''
+
+    surface1 = recolor_with_pil(get_page_surface(width, height), fg_color)
+    surface2 = recolor_in_place(get_page_surface(width, height), fg_color)
+    data1 = np.frombuffer(surface1.get_data(), dtype=np.uint8).astype(np.int16)
+    data2 = np.frombuffer(surface2.get_data(), dtype=np.uint8).astype(np.int16)
+    return int(np.abs(data1 - data2).max())
+
+print('median of ' + str(runs) + ' runs, peak memory')
+for width, height in page_sizes:
+    pil_time, pil_peak = benchmark(recolor_with_pil, width, height)
+    numpy_time, numpy_peak = benchmark(recolor_in_place, width, height)
+    print('{}x{}  pil {:.1f}ms {:.1f}MB  in place {:.1f}ms {:.1f}MB  max difference {}'.format(width, height, pil_time * 1000, pil_peak / 1e6, numpy_time * 1000, numpy_peak / 1e6, get_max_difference(width, height)))
@@ -25,6 +25,10 @@ import os, os.path
 import xml.etree.ElementTree as ET
 
 import setzer.settings.settings as settingscontroller
+import setzer.document.preview.preview_render_pool as preview_render_pool
+import setzer.document.preview.preview_render_scheduler as preview_render_scheduler
+import setzer.document.preview.preview_tile_cache as preview_tile_cache
+import setzer.document.preview.preview_memory_budget as preview_memory_budget
 
 
 class ServiceLocator():
@@ -39,6 +43,10 @@ class ServiceLocator():
     regexes = dict()
     source_language_manager = None
     source_style_scheme_manager = None
+    render_pool = None
+    render_scheduler = None
+    tile_cache = None
+    memory_budget = None
 
     def set_main_window(main_window):
         ServiceLocator.main_window = main_window
@@ -71,9 +79,32 @@ class ServiceLocator():
             ServiceLocator.settings = settingscontroller.Settings(ServiceLocator.get_config_folder())
         return ServiceLocator.settings
 
+    def get_render_pool():
+        if ServiceLocator.render_pool == None:
+            ServiceLocator.render_pool = preview_render_pool.PreviewRenderPool()
+        return ServiceLocator.render_pool
+
+    def get_render_scheduler():
+        if ServiceLocator.render_scheduler == None:
+            ServiceLocator.render_scheduler = preview_render_scheduler.PreviewRenderScheduler(ServiceLocator.get_render_pool())
+        return ServiceLocator.render_scheduler
+
+    def get_tile_cache():
+        if ServiceLocator.tile_cache == None:
+            ServiceLocator.tile_cache = preview_tile_cache.PreviewTileCache()
+        return ServiceLocator.tile_cache
+
+    def get_memory_budget():
+        if ServiceLocator.memory_budget == None:
+            ServiceLocator.memory_budget = preview_memory_budget.PreviewMemoryBudget(ServiceLocator.get_settings())
+        return ServiceLocator.memory_budget
+
     def get_config_folder():
         return os.path.join(GLib.get_user_config_dir(), 'setzer')
 
+    def get_cache_folder():
+        return os.path.join(GLib.get_user_cache_dir(), 'setzer')
+
     def set_setzer_version(setzer_version):
         ServiceLocator.setzer_version = setzer_version
 
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import gi
+gi.require_version('Gtk', '4.0')
+from gi.repository import Gtk
+
+import os.path
+
+
+class BuildAllFinishedDialog(object):
+
+    def __init__(self, main_window):
+        self.main_window = main_window
+
+    def run(self, wall_time, build_times):
+        self.setup(wall_time, build_times)
+        self.view.show(self.main_window)
+
+    def setup(self, wall_time, build_times):
+        self.view = Gtk.AlertDialog()
+        self.view.set_modal(True)
+        self.view.set_message(_('Built {amount} documents in {seconds:.1f}s').format(amount=len(build_times), seconds=wall_time))
+
+        detail = ''
+        total_time = 0
+        for displayname, build_time in build_times:
+            if build_time == None:
+                detail += os.path.basename(displayname) + ': ' + _('not built') + '\n'
+            else:
+                detail += os.path.basename(displayname) + ': {:.1f}s\n'.format(build_time)
+                total_time += build_time
+        detail += '\n' + _('Sum of build times: {seconds:.1f}s').format(seconds=total_time)
+        self.view.set_detail(detail)
+
+
@@ -17,12 +17,14 @@
 
 from setzer.dialogs.about.about import AboutDialog
 from setzer.dialogs.add_remove_packages.add_remove_packages import AddRemovePackagesDialog
+from setzer.dialogs.build_all_finished.build_all_finished import BuildAllFinishedDialog
 from setzer.dialogs.build_save.build_save import BuildSaveDialog
 from setzer.dialogs.building_failed.building_failed import BuildingFailedDialog
 from setzer.dialogs.close_confirmation.close_confirmation import CloseConfirmationDialog
 from setzer.dialogs.document_changed_on_disk.document_changed_on_disk import DocumentChangedOnDiskDialog
 from setzer.dialogs.document_deleted_on_disk.document_deleted_on_disk import DocumentDeletedOnDiskDialog
 from setzer.dialogs.document_wizard.document_wizard import DocumentWizard
+from setzer.dialogs.export_build_timings.export_build_timings import ExportBuildTimingsDialog
 from setzer.dialogs.include_bibtex_file.include_bibtex_file import IncludeBibTeXFile
 from setzer.dialogs.include_latex_file.include_latex_file import IncludeLaTeXFile
 from setzer.dialogs.interpreter_missing.interpreter_missing import InterpreterMissingDialog
@@ -43,10 +45,12 @@ class DialogLocator():
         dialogs = dict()
         dialogs['about'] = AboutDialog(main_window)
         dialogs['add_remove_packages'] = AddRemovePackagesDialog(main_window)
+        dialogs['build_all_finished'] = BuildAllFinishedDialog(main_window)
         dialogs['build_save'] = BuildSaveDialog(main_window, workspace)
         dialogs['document_changed_on_disk'] = DocumentChangedOnDiskDialog(main_window)
         dialogs['document_deleted_on_disk'] = DocumentDeletedOnDiskDialog(main_window)
         dialogs['document_wizard'] = DocumentWizard(main_window)
+        dialogs['export_build_timings'] = ExportBuildTimingsDialog(main_window)
         dialogs['include_bibtex_file'] = IncludeBibTeXFile(main_window)
         dialogs['include_latex_file'] = IncludeLaTeXFile(main_window)
         dialogs['keyboard_shortcuts'] = KeyboardShortcutsDialog(main_window)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import gi
+gi.require_version('Gtk', '4.0')
+from gi.repository import Gtk, Gio
+
+import os.path
+
+
+class ExportBuildTimingsDialog(object):
+
+    def __init__(self, main_window):
+        self.main_window = main_window
+        self.document = None
+
+    def run(self, document):
+        self.document = document
+        self.setup()
+        self.view.save(self.main_window, None, self.dialog_process_response)
+
+    def setup(self):
+        self.view = Gtk.FileDialog()
+        self.view.set_modal(True)
+        self.view.set_title(_('Export Build Timings'))
+
+        pathname = self.document.get_filename()
+        if pathname != None:
+            self.view.set_initial_folder(Gio.File.new_for_path(os.path.dirname(pathname)))
+            self.view.set_initial_name(os.path.splitext(os.path.basename(pathname))[0] + '-build-timings.jsonl')
+        else:
+            self.view.set_initial_name('build-timings.jsonl')
+
+    def dialog_process_response(self, dialog, result):
+        try:
+            file = dialog.save_finish(result)
+        except Exception: pass
+        else:
+            if file != None:
+                self.document.build_system.export_build_history(file.get_path())
+
+
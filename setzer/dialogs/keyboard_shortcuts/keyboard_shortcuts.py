@@ -43,6 +43,7 @@ class KeyboardShortcutsDialog(object):
 
         section = {'title': _('Tools'), 'items': list()}
         section['items'].append({'title': _('Save and build .pdf-file from document'), 'shortcut': 'F5'})
+        section['items'].append({'title': _('Save and build only the included part at the cursor'), 'shortcut': '&lt;shift&gt;F5'})
         section['items'].append({'title': _('Build .pdf-file from document'), 'shortcut': 'F6'})
         section['items'].append({'title': _('Show current position in preview'), 'shortcut': 'F7'})
         data.append(section)
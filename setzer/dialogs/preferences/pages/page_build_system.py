@@ -36,6 +36,20 @@ class PageBuildSystem(object):
         self.view.option_cleanup_build_files.set_active(self.settings.get_value('preferences', 'cleanup_build_files'))
         self.view.option_cleanup_build_files.connect('toggled', self.preferences.on_check_button_toggle, 'cleanup_build_files')
 
+        self.view.option_use_latex_worker.set_active(self.settings.get_value('preferences', 'use_latex_worker'))
+        self.view.option_use_latex_worker.connect('toggled', self.preferences.on_check_button_toggle, 'use_latex_worker')
+
+        self.view.option_halt_on_error.set_active(self.settings.get_value('preferences', 'halt_on_error'))
+        self.view.option_halt_on_error.connect('toggled', self.preferences.on_check_button_toggle, 'halt_on_error')
+
+        self.view.option_auto_build.set_active(self.settings.get_value('preferences', 'auto_build'))
+        self.view.option_auto_build.connect('toggled', self.preferences.on_check_button_toggle, 'auto_build')
+        self.view.option_auto_build.connect('toggled', self.on_auto_build_toggled)
+
+        self.view.auto_build_delay_spinbutton.set_value(self.settings.get_value('preferences', 'auto_build_delay'))
+        self.view.auto_build_delay_spinbutton.connect('value-changed', self.preferences.spin_button_changed, 'auto_build_delay')
+        self.update_auto_build_delay_sensitivity()
+
         self.view.option_autoshow_build_log_errors.set_active(self.settings.get_value('preferences', 'autoshow_build_log') == 'errors')
         self.view.option_autoshow_build_log_errors_warnings.set_active(self.settings.get_value('preferences', 'autoshow_build_log') == 'errors_warnings')
         self.view.option_autoshow_build_log_all.set_active(self.settings.get_value('preferences', 'autoshow_build_log') == 'all')
@@ -52,8 +66,20 @@ class PageBuildSystem(object):
         self.view.option_system_commands_restricted.connect('toggled', self.preferences.on_radio_button_toggle, 'build_option_system_commands', 'restricted')
         self.view.option_system_commands_full.connect('toggled', self.preferences.on_radio_button_toggle, 'build_option_system_commands', 'enable')
 
+        self.view.option_build_profile_normal.set_active(self.settings.get_value('preferences', 'build_profile') == 'normal')
+        self.view.option_build_profile_draft_graphics.set_active(self.settings.get_value('preferences', 'build_profile') == 'draft_graphics')
+
+        self.view.option_build_profile_normal.connect('toggled', self.preferences.on_radio_button_toggle, 'build_profile', 'normal')
+        self.view.option_build_profile_draft_graphics.connect('toggled', self.preferences.on_radio_button_toggle, 'build_profile', 'draft_graphics')
+
         self.setup_latex_interpreters()
 
+    def on_auto_build_toggled(self, button):
+        self.update_auto_build_delay_sensitivity()
+
+    def update_auto_build_delay_sensitivity(self):
+        self.view.auto_build_delay_box.set_sensitive(self.view.option_auto_build.get_active())
+
     def setup_latex_interpreters(self):
         self.latex_interpreters = list()
         for interpreter in ['xelatex', 'pdflatex', 'lualatex', 'tectonic']:
@@ -112,11 +138,17 @@ class PageBuildSystem(object):
         if 'tectonic' in self.latex_interpreters and self.view.option_latex_interpreter['tectonic'].get_active():
             self.view.tectonic_warning_label.set_visible(True)
             self.view.option_use_latexmk.set_visible(False)
+            self.view.option_use_latex_worker.set_visible(False)
+            self.view.option_halt_on_error.set_visible(False)
             self.view.shell_escape_box.set_visible(False)
+            self.view.build_profile_box.set_visible(False)
         else:
             self.view.tectonic_warning_label.set_visible(False)
             self.view.option_use_latexmk.set_visible(True)
+            self.view.option_use_latex_worker.set_visible(True)
+            self.view.option_halt_on_error.set_visible(True)
             self.view.shell_escape_box.set_visible(True)
+            self.view.build_profile_box.set_visible(True)
 
 class PageBuildSystemView(Gtk.Box):
 
@@ -176,6 +208,20 @@ flatpak install org.freedesktop.Sdk.Extension.texlive'''))
 
         self.append(self.tectonic_warning_label)
 
+        self.build_profile_box = Gtk.Box.new(Gtk.Orientation.VERTICAL, 0)
+        label = Gtk.Label()
+        label.set_markup('<b>' + _('Build Profile') + '</b>')
+        label.set_xalign(0)
+        label.set_margin_top(18)
+        label.set_margin_bottom(6)
+        self.build_profile_box.append(label)
+        self.option_build_profile_normal = Gtk.CheckButton.new_with_label(_('Normal'))
+        self.option_build_profile_draft_graphics = Gtk.CheckButton.new_with_label(_('Draft graphics (faster, images are shown as boxes)'))
+        self.option_build_profile_draft_graphics.set_group(self.option_build_profile_normal)
+        self.build_profile_box.append(self.option_build_profile_normal)
+        self.build_profile_box.append(self.option_build_profile_draft_graphics)
+        self.append(self.build_profile_box)
+
         label = Gtk.Label()
         label.set_markup('<b>' + _('Options') + '</b>')
         label.set_xalign(0)
@@ -188,6 +234,27 @@ flatpak install org.freedesktop.Sdk.Extension.texlive'''))
         self.option_use_latexmk = Gtk.CheckButton.new_with_label(_('Use Latexmk'))
         self.append(self.option_use_latexmk)
 
+        self.option_use_latex_worker = Gtk.CheckButton.new_with_label(_('Keep the interpreter running between builds (faster for small documents)'))
+        self.append(self.option_use_latex_worker)
+
+        self.option_halt_on_error = Gtk.CheckButton.new_with_label(_('Stop building at the first error'))
+        self.append(self.option_halt_on_error)
+
+        self.option_auto_build = Gtk.CheckButton.new_with_label(_('Automatically save and build after editing'))
+        self.append(self.option_auto_build)
+
+        self.auto_build_delay_box = Gtk.Box.new(Gtk.Orientation.HORIZONTAL, 0)
+        self.auto_build_delay_box.set_margin_start(24)
+        self.auto_build_delay_box.set_margin_top(6)
+        label = Gtk.Label()
+        label.set_markup(_('Wait after last edit (ms):'))
+        label.set_xalign(0)
+        label.set_margin_end(12)
+        self.auto_build_delay_box.append(label)
+        self.auto_build_delay_spinbutton = Gtk.SpinButton.new_with_range(250, 10000, 250)
+        self.auto_build_delay_box.append(self.auto_build_delay_spinbutton)
+        self.append(self.auto_build_delay_box)
+
         label = Gtk.Label()
         label.set_markup('<b>' + _('Automatically show build log ..') + ' </b>')
         label.set_xalign(0)
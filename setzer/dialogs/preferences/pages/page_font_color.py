@@ -44,6 +44,8 @@ class PageFontColor(object):
         self.view.style_switcher.connect('child-activated', self.on_style_switcher_changed)
         self.view.option_recolor_pdf.set_active(self.settings.get_value('preferences', 'recolor_pdf'))
         self.view.option_recolor_pdf.connect('toggled', self.on_recolor_pdf_option_toggled)
+        self.view.preview_memory_budget_spinbutton.set_value(self.settings.get_value('preferences', 'preview_memory_budget'))
+        self.view.preview_memory_budget_spinbutton.connect('value-changed', self.preferences.spin_button_changed, 'preview_memory_budget')
 
         self.update_font_color_preview()
 
@@ -168,9 +170,21 @@ class PageFontColorView(Gtk.Box):
 
         self.option_recolor_pdf = Gtk.CheckButton.new_with_label(_('Show .pdf in theme colors'))
         self.option_recolor_pdf.set_margin_start(18)
-        self.option_recolor_pdf.set_margin_bottom(18)
         self.append(self.option_recolor_pdf)
 
+        box = Gtk.Box.new(Gtk.Orientation.HORIZONTAL, 0)
+        box.set_margin_start(18)
+        box.set_margin_top(6)
+        box.set_margin_bottom(18)
+        label = Gtk.Label()
+        label.set_markup(_('Memory for rendered .pdf pages (MB):'))
+        label.set_xalign(0)
+        label.set_margin_end(12)
+        box.append(label)
+        self.preview_memory_budget_spinbutton = Gtk.SpinButton.new_with_range(64, 4096, 64)
+        box.append(self.preview_memory_budget_spinbutton)
+        self.append(box)
+
         self.preview_wrapper = Gtk.Box.new(Gtk.Orientation.VERTICAL, 0)
         self.preview_wrapper.get_style_context().add_class('preview')
         scrolled_window = Gtk.ScrolledWindow()
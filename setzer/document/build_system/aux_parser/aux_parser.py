@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import os.path
+
+from setzer.app.service_locator import ServiceLocator
+
+
+class AuxParser():
+    ''' Reads the .aux files LaTeX writes to the build folder. '''
+
+    def __init__(self):
+        self.input_regex = ServiceLocator.get_regex_object(r'^\\@input\{([^}]*)\}')
+
+    def get_aux_files(self, build_folder, aux_filename):
+        ''' Return the main .aux file and the ones of the \\included chapters,
+            which it loads with \\@input, relative to the build folder. '''
+
+        aux_files = [aux_filename]
+        for filename in aux_files:
+            try: file = open(os.path.join(build_folder, filename), 'r', encoding='utf-8', errors='ignore')
+            except (FileNotFoundError, IsADirectoryError): continue
+            with file:
+                for line in file:
+                    match = self.input_regex.match(line)
+                    if match != None:
+                        included_filename = os.path.normpath(match.group(1).strip())
+                        if included_filename not in aux_files:
+                            aux_files.append(included_filename)
+        return aux_files
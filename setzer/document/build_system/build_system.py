@@ -19,7 +19,9 @@ import gi
 from gi.repository import GObject
 
 import _thread as thread, queue
-import time, re, difflib
+import time, re, difflib, json, hashlib, base64
+import os.path
+import shutil
 
 from setzer.app.service_locator import ServiceLocator
 from setzer.dialogs.dialog_locator import DialogLocator
@@ -28,10 +30,12 @@ import setzer.document.build_system.builder.builder_build_bibtex as builder_buil
 import setzer.document.build_system.builder.builder_build_biber as builder_build_biber
 import setzer.document.build_system.builder.builder_build_makeindex as builder_build_makeindex
 import setzer.document.build_system.builder.builder_build_glossaries as builder_build_glossaries
+import setzer.document.build_system.builder.builder_build_auxiliary as builder_build_auxiliary
 import setzer.document.build_system.builder.builder_forward_sync as builder_forward_sync
 import setzer.document.build_system.builder.builder_backward_sync as builder_backward_sync
 import setzer.document.build_system.query.query as query
 from setzer.helpers.observable import Observable
+import setzer.helpers.path as path_helpers
 
 
 class BuildSystem(Observable):
@@ -41,6 +45,7 @@ class BuildSystem(Observable):
         self.document = document
         self.settings = ServiceLocator.get_settings()
         self.active_query = None
+        self.execute_query_lock = thread.allocate_lock()
 
         # possible states: idle, ready_for_building
         # building_in_progress, building_to_stop
@@ -49,9 +54,16 @@ class BuildSystem(Observable):
         # possible values: build, forward_sync, build_and_forward_sync
         self.build_mode = 'build_and_forward_sync'
 
+        # name of the \include to restrict the next build to
+        self.build_part = None
+
         self.document_has_been_built = False
         self.build_time = None
         self.last_build_start_time = None
+        self.build_history = list()
+        self.build_history_length = 20
+        self.first_render_start_time = None
+        self.sharp_render_start_time = None
 
         self.has_synctex_file = False
         self.backward_sync_data = None
@@ -60,6 +72,12 @@ class BuildSystem(Observable):
         self.update_can_sync()
 
         self.build_log_data = {'items': list(), 'error_count': 0, 'warning_count': 0, 'badbox_count': 0}
+        self.input_fingerprints = dict()
+
+        # files the last full build read (from the .fls file), relative to
+        # the document folder, and a key over their modification times.
+        self.recorded_inputs = None
+        self.recorded_inputs_key = None
 
         self.builders = dict()
         self.builders['build_latex'] = builder_build_latex.BuilderBuildLaTeX()
@@ -67,13 +85,35 @@ class BuildSystem(Observable):
         self.builders['build_biber'] = builder_build_biber.BuilderBuildBiber()
         self.builders['build_makeindex'] = builder_build_makeindex.BuilderBuildMakeindex()
         self.builders['build_glossaries'] = builder_build_glossaries.BuilderBuildGlossaries()
+        auxiliary_builders = {job: self.builders[job] for job in ['build_bibtex', 'build_biber', 'build_makeindex', 'build_glossaries']}
+        self.builders['build_auxiliary'] = builder_build_auxiliary.BuilderBuildAuxiliary(auxiliary_builders)
         self.builders['forward_sync'] = builder_forward_sync.BuilderForwardSync()
         self.builders['backward_sync'] = builder_backward_sync.BuilderBackwardSync()
 
         self.document.preview.connect('pdf_changed', self.update_can_sync)
+        self.document.preview.page_renderer.connect('rendered_pages_changed', self.on_rendered_pages_changed)
 
         GObject.timeout_add(50, self.results_loop)
 
+    def on_rendered_pages_changed(self, page_renderer):
+        ''' Time to the first paint of the new pdf (possibly at low
+            resolution), then to all visible tiles being sharp. '''
+
+        if len(self.build_history) == 0: return
+
+        if self.first_render_start_time != None and page_renderer.has_visible_tiles():
+            is_sharp = page_renderer.is_visible_area_sharp()
+            self.add_build_timing_phase(self.build_history[-1], 'first_page_render', self.first_render_start_time, time.time(), None if is_sharp else 'low resolution')
+            if not is_sharp:
+                self.sharp_render_start_time = self.first_render_start_time
+            self.first_render_start_time = None
+            self.add_change_code('build_timing_changed')
+
+        elif self.sharp_render_start_time != None and page_renderer.is_visible_area_sharp():
+            self.add_build_timing_phase(self.build_history[-1], 'sharp_page_render', self.sharp_render_start_time, time.time())
+            self.sharp_render_start_time = None
+            self.add_change_code('build_timing_changed')
+
     def change_build_state(self, state):
         self.build_state = state
 
@@ -129,6 +169,58 @@ class BuildSystem(Observable):
         self.set_build_mode('build_and_forward_sync')
         self.start_building()
 
+    def build_current_part(self, active_document):
+        ''' Build only the \\include the cursor is in, falls back to a full
+            build if there is none or if the last full build left no
+            .aux files to take page numbers and references from. '''
+
+        include_name = self.get_include_name_at_cursor(active_document)
+        if include_name != None and self.can_build_part(include_name):
+            self.build_part = include_name
+        self.build_and_forward_sync(active_document)
+
+    def get_include_name_at_cursor(self, active_document):
+        if self.settings.get_value('preferences', 'latex_interpreter') == 'tectonic': return None
+
+        text = self.document.get_all_text()
+        if active_document == self.document:
+            insert = self.document.source_buffer.get_iter_at_mark(self.document.source_buffer.get_insert())
+            line_start = text.rfind('\n', 0, insert.get_offset()) + 1
+            line_end = text.find('\n', insert.get_offset())
+            if line_end == -1: line_end = len(text)
+
+        for filename, offset in self.document.parser.symbols['included_latex_files']:
+            if not text.startswith('\\include{', offset): continue
+
+            if active_document == self.document:
+                if offset >= line_start and offset <= line_end:
+                    return filename[:-4]
+            elif path_helpers.get_abspath(filename, self.document.get_dirname()) == active_document.get_filename():
+                return filename[:-4]
+        return None
+
+    def can_build_part(self, include_name):
+        if not self.builders['build_latex'].has_aux_file(self.document.get_filename(), self.get_build_folder()): return False
+        return os.path.isfile(path_helpers.get_abspath(include_name + '.aux', self.get_build_folder()))
+
+    def get_build_folder(self):
+        ''' Every document builds into a folder of its own, documents in the
+            same folder would otherwise write the .aux files of the chapters
+            they both \include over each other. The pdf file, and the .log
+            and .synctex.gz files unless they are cleaned up, are put next
+            to the document. Folders not used for a while are removed by the
+            build scheduler. '''
+
+        return os.path.join(ServiceLocator.get_cache_folder(), 'build', base64.urlsafe_b64encode(str.encode(self.document.get_filename())).decode())
+
+    def remove_build_folder(self):
+        ''' Stops the build and the interpreter waiting for the next one,
+            which has its files open in the folder. '''
+
+        self.stop_building()
+        self.builders['build_latex'].shutdown()
+        shutil.rmtree(self.get_build_folder(), ignore_errors=True)
+
     def set_forward_sync_arguments(self, active_document):
         sb = active_document.source_buffer
         self.forward_sync_arguments = dict()
@@ -188,10 +280,12 @@ class BuildSystem(Observable):
     def parse_result(self, result_blob):
         if result_blob['build'] != None or result_blob['forward_sync'] != None:
             if result_blob['build'] != None:
+                pdf_reload_start_time = time.time()
                 try:
                     self.document.preview.set_pdf_filename(result_blob['build']['pdf_filename'])
                 except KeyError: pass
                 self.document.add_change_code('pdf_updated')
+                pdf_reload_end_time = time.time()
 
             if result_blob['forward_sync'] != None:
                 self.document.preview.set_synctex_rectangles(result_blob['forward_sync'])
@@ -213,8 +307,16 @@ class BuildSystem(Observable):
                     return
 
                 build_blob['log_messages']['BibTeX'] = build_blob['bibtex_log_messages']
+                self.input_fingerprints = build_blob['input_fingerprints']
+                if build_blob['includeonly'] != None:
+                    # the pdf file holds only part of the document now, the
+                    # next full build must not be skipped as up to date.
+                    self.recorded_inputs_key = None
+                elif build_blob['recorded_inputs'] != None:
+                    self.set_recorded_inputs(build_blob['recorded_inputs'])
                 self.set_build_log_items(build_blob['log_messages'])
                 self.build_time = time.time() - self.last_build_start_time
+                self.add_build_timing(build_blob, pdf_reload_start_time, pdf_reload_end_time)
 
                 error_count = self.get_error_count()
                 if error_count > 0:
@@ -242,6 +344,82 @@ class BuildSystem(Observable):
         if result_blob['build'] != None:
             self.invalidate_build_log()
 
+    def set_recorded_inputs(self, recorded_inputs):
+        recorded_inputs_changed = (recorded_inputs != self.recorded_inputs)
+        self.recorded_inputs = recorded_inputs
+        self.recorded_inputs_key = self.get_recorded_inputs_key(self.last_build_start_time)
+        if recorded_inputs_changed:
+            self.add_change_code('recorded_inputs_changed')
+
+    def get_recorded_input_filenames(self):
+        if self.recorded_inputs == None: return []
+        return [path_helpers.get_abspath(filename, self.document.get_dirname()) for filename in self.recorded_inputs]
+
+    def get_recorded_inputs_key(self, modified_before=None):
+        ''' Key over the files the last build read, None if one of them was
+            modified after modified_before (it may have been read before). '''
+
+        md5 = hashlib.md5()
+        for filename in self.get_recorded_input_filenames():
+            try: stat = os.stat(filename)
+            except OSError:
+                md5.update((filename + ':None').encode('utf-8'))
+                continue
+            if modified_before != None and stat.st_mtime > modified_before: return None
+            md5.update((filename + ':' + str(stat.st_mtime) + ':' + str(stat.st_size)).encode('utf-8'))
+        return md5.hexdigest()
+
+    def is_up_to_date(self):
+        ''' True if none of the inputs of the last successful build changed. '''
+
+        if self.recorded_inputs == None or self.recorded_inputs_key == None: return False
+        if self.get_error_count() > 0: return False
+        if self.document.preview.pdf_filename == None or not os.path.isfile(self.document.preview.pdf_filename): return False
+        return self.get_recorded_inputs_key() == self.recorded_inputs_key
+
+    def add_build_timing(self, build_blob, pdf_reload_start_time, pdf_reload_end_time):
+        build_timing = dict()
+        build_timing['filename'] = self.document.get_filename()
+        build_timing['date'] = self.last_build_start_time
+        build_timing['latex_interpreter'] = build_blob['latex_interpreter']
+        build_timing['build_profile'] = build_blob['build_profile']
+        build_timing['build_time'] = self.build_time
+        build_timing['phases'] = list()
+        for entry in build_blob['timeline']:
+            self.add_build_timing_phase(build_timing, entry['phase'], entry['start'], entry['start'] + entry['duration'], entry['detail'])
+        self.add_build_timing_phase(build_timing, 'pdf_reload', pdf_reload_start_time, pdf_reload_end_time)
+
+        self.build_history.append(build_timing)
+        del(self.build_history[:-self.build_history_length])
+
+        self.sharp_render_start_time = None
+        if self.document.preview.page_renderer.is_active and self.document.preview.poppler_document != None:
+            self.first_render_start_time = pdf_reload_end_time
+        self.add_change_code('build_timing_changed')
+
+    def add_build_timing_phase(self, build_timing, phase, start_time, end_time, detail=None):
+        build_timing['phases'].append({'phase': phase, 'detail': detail, 'start': start_time - build_timing['date'], 'duration': end_time - start_time})
+
+    def get_last_build_timing(self):
+        if len(self.build_history) == 0: return None
+        return self.build_history[-1]
+
+    def get_average_build_times(self):
+        ''' Average build time per build profile, to compare normal and draft builds. '''
+
+        build_times = dict()
+        for build_timing in self.build_history:
+            build_profile = build_timing.get('build_profile', 'normal')
+            if build_profile not in build_times:
+                build_times[build_profile] = list()
+            build_times[build_profile].append(build_timing['build_time'])
+        return {build_profile: sum(times) / len(times) for build_profile, times in build_times.items()}
+
+    def export_build_history(self, filename):
+        with open(filename, 'w') as file:
+            for build_timing in self.build_history:
+                file.write(json.dumps(build_timing) + '\n')
+
     def add_query(self, query):
         self.stop_building(notify=False)
         self.active_query = query
@@ -250,17 +428,32 @@ class BuildSystem(Observable):
         self.change_build_state('building_in_progress')
 
     def execute_query(self, query):
-        while len(query.jobs) > 0:
-            if not query.force_building_to_stop:
-                self.builders[query.jobs.pop(0)].run(query)
+        with self.execute_query_lock:
+            build_scheduler = ServiceLocator.get_workspace().build_scheduler
+            if 'build_latex' in query.jobs:
+                if build_scheduler.acquire(self, query):
+                    try:
+                        self.run_jobs(query)
+                    finally:
+                        build_scheduler.release(query)
+            else:
+                self.run_jobs(query)
         query.mark_done()
 
+    def run_jobs(self, query):
+        while len(query.jobs) > 0 and not query.force_building_to_stop:
+            self.builders[query.jobs.pop(0)].run(query)
+
     def start_building(self):
+        build_part = self.build_part
+        self.build_part = None
+
         if self.build_mode == 'forward_sync' and not self.has_synctex_file: return
         if self.build_mode == 'backward_sync' and self.backward_sync_data == None: return
         if self.document.filename == None: return
 
         self.build_time = None
+        self.first_render_start_time = None
         mode = self.get_build_mode()
         query_obj = query.Query(self.document.get_filename()[:])
 
@@ -271,6 +464,9 @@ class BuildSystem(Observable):
             interpreter = self.settings.get_value('preferences', 'latex_interpreter')
             use_latexmk = self.settings.get_value('preferences', 'use_latexmk')
             build_option_system_commands = self.settings.get_value('preferences', 'build_option_system_commands')
+            build_profile = self.settings.get_value('preferences', 'build_profile') if interpreter != 'tectonic' else 'normal'
+            use_latex_worker = self.settings.get_value('preferences', 'use_latex_worker')
+            halt_on_error = self.settings.get_value('preferences', 'halt_on_error')
             additional_arguments = ''
 
             if interpreter == 'tectonic':
@@ -287,6 +483,10 @@ class BuildSystem(Observable):
             text = self.document.get_all_text()
             do_cleanup = self.settings.get_value('preferences', 'cleanup_build_files')
 
+        if mode in ['build', 'build_and_forward_sync']:
+            query_obj.build_folder = self.get_build_folder()
+            query_obj.build_data['recorded_inputs'] = self.recorded_inputs
+
         if mode == 'build':
             query_obj.jobs = ['build_latex']
             query_obj.build_data['text'] = text
@@ -294,6 +494,11 @@ class BuildSystem(Observable):
             query_obj.build_data['use_latexmk'] = use_latexmk
             query_obj.build_data['additional_arguments'] = additional_arguments
             query_obj.build_data['do_cleanup'] = do_cleanup
+            query_obj.build_data['input_fingerprints'] = self.input_fingerprints.copy()
+            query_obj.build_data['includeonly'] = build_part
+            query_obj.build_data['build_profile'] = build_profile
+            query_obj.build_data['use_latex_worker'] = use_latex_worker
+            query_obj.build_data['halt_on_error'] = halt_on_error
         elif mode == 'forward_sync':
             query_obj.jobs = ['forward_sync']
             query_obj.can_sync = True
@@ -315,6 +520,11 @@ class BuildSystem(Observable):
             query_obj.build_data['use_latexmk'] = use_latexmk
             query_obj.build_data['additional_arguments'] = additional_arguments
             query_obj.build_data['do_cleanup'] = do_cleanup
+            query_obj.build_data['input_fingerprints'] = self.input_fingerprints.copy()
+            query_obj.build_data['includeonly'] = build_part
+            query_obj.build_data['build_profile'] = build_profile
+            query_obj.build_data['use_latex_worker'] = use_latex_worker
+            query_obj.build_data['halt_on_error'] = halt_on_error
             query_obj.can_sync = False
             query_obj.forward_sync_data['filename'] = synctex_arguments['filename']
             query_obj.forward_sync_data['line'] = synctex_arguments['line']
@@ -324,14 +534,24 @@ class BuildSystem(Observable):
 
     def stop_building(self, notify=True):
         if self.active_query != None:
+            self.active_query.force_building_to_stop = True
             self.active_query.jobs = []
             self.active_query = None
+            ServiceLocator.get_workspace().build_scheduler.notify()
         for builder in self.builders.values():
             builder.stop_running()
         if notify:
             self.show_build_state('')
             self.change_build_state('idle')
 
+    def shutdown(self):
+        ''' Stops the build and the interpreter waiting for the next one. A
+            worker left running would read EOF when the app exits and write
+            its own .log and .fls files over those of the last build. '''
+
+        self.stop_building(notify=False)
+        self.builders['build_latex'].shutdown()
+
     def set_synctex_position(self, document, position):
         position_found, start = document.source_buffer.get_iter_at_line(position['line'])
         end = start.copy()
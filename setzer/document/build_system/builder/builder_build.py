@@ -18,6 +18,7 @@
 import os
 import os.path
 import shutil
+import selectors
 
 
 class BuilderBuild(object):
@@ -30,6 +31,24 @@ class BuilderBuild(object):
             query.build_result = {'error': error,
                                  'error_arg': error_arg}
 
+    def wait_for_process(self, process):
+        ''' Wait for a process started with stdout=PIPE, reading its output
+            as it comes so it can't block on a full pipe. '''
+
+        if process == None: return
+
+        with selectors.DefaultSelector() as selector:
+            selector.register(process.stdout, selectors.EVENT_READ)
+            while True:
+                events = selector.select(timeout=0.1)
+                if len(events) > 0:
+                    if len(os.read(process.stdout.fileno(), 65536)) == 0: break
+                elif process.poll() != None:
+                    # children started with \write18 may keep the pipe open
+                    break
+        process.stdout.close()
+        process.wait()
+
     def cleanup_files(self, query):
         if query.build_data['do_cleanup']:
             self.cleanup_build_files(query)
@@ -41,12 +60,22 @@ class BuilderBuild(object):
                         '.ist', '.glo', '.glg', '.acn', '.alg',
                         '.bcf', '.run.xml', '.out.ps']
         for ending in file_endings:
-            try: os.remove(os.path.splitext(query.tex_filename)[0] + ending)
+            try: os.remove(query.get_build_filename(ending))
             except FileNotFoundError: pass
 
     def cleanup_glossaries_files(self, query):
         for ending in ['.gls', '.acr']:
-            try: os.remove(os.path.splitext(query.tex_filename)[0] + ending)
+            try: os.remove(query.get_build_filename(ending))
             except FileNotFoundError: pass
 
+    def get_search_path_env(self, query, names):
+        ''' The tools run in the build folder, they find the files next to
+            the document through their search paths. The empty entry at the
+            end stands for the default path. '''
+
+        env = os.environ.copy()
+        for name in names:
+            env[name] = os.path.dirname(query.tex_filename) + os.pathsep + env.get(name, '')
+        return env
+
 
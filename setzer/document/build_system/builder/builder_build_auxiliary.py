@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import setzer.document.build_system.builder.builder_build as builder_build
+import setzer.document.build_system.input_fingerprints.input_fingerprints as input_fingerprints
+
+
+class BuilderBuildAuxiliary(builder_build.BuilderBuild):
+    ''' Runs all auxiliary tools requested by one LaTeX pass (bibtex, biber,
+        makeindex, makeglossaries) side by side. They read and write disjoint
+        sets of files, so they don't have to wait for each other.
+
+        The tools don't touch the query, each returns its own result and
+        the results are merged here once all of them are done. '''
+
+    def __init__(self, builders):
+        builder_build.BuilderBuild.__init__(self)
+
+        self.builders = builders
+        self.input_fingerprints = input_fingerprints.InputFingerprints()
+
+    def run(self, query):
+        jobs = sorted(query.build_data['auxiliary_jobs'])
+        query.build_data['auxiliary_jobs'] = set()
+        if len(jobs) == 0: return
+
+        fingerprints = dict()
+        futures = dict()
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            for job in jobs:
+                fingerprints[job] = self.input_fingerprints.get_fingerprint(job, query)
+                futures[job] = executor.submit(self.run_builder, job, query)
+        results = {job: future.result() for job, future in futures.items()}
+
+        for job in jobs:
+            self.add_result(query, job, results[job])
+
+        errors = [results[job]['error'] for job in jobs if results[job]['error'] != None]
+        if len(errors) > 0:
+            self.cleanup_files(query)
+            self.throw_build_error(query, *errors[0])
+            return
+
+        for job in jobs:
+            if fingerprints[job] != None and query.get_build_result() == None:
+                query.build_data['input_fingerprints'][job] = fingerprints[job]
+
+    def run_builder(self, job, query):
+        start_time = time.time()
+        result = self.builders[job].run(query)
+        query.add_timeline_entry(job[6:], start_time)
+        return result
+
+    def add_result(self, query, job, result):
+        data = {'build_bibtex': query.bibtex_data, 'build_biber': query.biber_data, 'build_makeindex': query.makeindex_data, 'build_glossaries': query.glossaries_data}[job]
+        data['ran_on_files'].append(result['ran_on_file'])
+        query.error_count += result['error_count']
+        if result['log_messages'] != None:
+            query.bibtex_log_messages = result['log_messages']
+
+    def stop_running(self):
+        for builder in self.builders.values():
+            builder.stop_running()
+
+
@@ -36,28 +36,23 @@ class BuilderBuildBiber(builder_build.BuilderBuild):
         arguments = ['biber']
         arguments.append(filename)
 
-        query.biber_data['ran_on_files'].append(filename)
-
-        custom_env = os.environ.copy()
-        custom_env['BIBINPUTS'] = os.path.dirname(query.tex_filename) + ':' + os.path.dirname(tex_filename)
+        result = {'ran_on_file': filename, 'error': None, 'error_count': 0, 'log_messages': None}
         try:
-            self.process = subprocess.Popen(arguments, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=os.path.dirname(tex_filename), env=custom_env)
+            self.process = subprocess.Popen(arguments, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=query.build_folder, env=self.get_search_path_env(query, ['BIBINPUTS']))
         except FileNotFoundError:
-            self.cleanup_files(query)
-            self.throw_build_error(query, 'interpreter_not_working', 'biber missing')
-            return
-        self.process.wait()
-
-        self.parse_biber_log(query, tex_filename[:-3] + 'blg')
+            result['error'] = ('interpreter_not_working', 'biber missing')
+            return result
+        self.wait_for_process(self.process)
 
-        query.jobs.insert(0, 'build_latex')
+        self.parse_biber_log(result, query.get_build_filename('.blg'))
+        return result
 
     def stop_running(self):
         if self.process != None:
             self.process.kill()
             self.process = None
 
-    def parse_biber_log(self, query, log_filename):
+    def parse_biber_log(self, result, log_filename):
         pass
 
 
@@ -33,45 +33,47 @@ class BuilderBuildBibTeX(builder_build.BuilderBuild):
         self.bibtex_log_item_regex = ServiceLocator.get_regex_object(r'Warning--(.*)\n--line ([0-9]+) of file (.*)|I couldn' + "'" + r't open style file (.*)\n---line ([0-9]+) of file (.*)|Warning--(.*)')
 
     def run(self, query):
+        ''' Runs in a thread of the auxiliary builder, side by side with the
+            other tools, so it leaves the query alone and returns what it
+            found. '''
+
         tex_filename = query.tex_filename
         filename = tex_filename.rsplit('/', 1)[1][:-4]
 
         arguments = ['bibtex']
         arguments.append(filename + '.aux')
 
-        query.bibtex_data['ran_on_files'].append(filename)
-
+        result = {'ran_on_file': filename, 'error': None, 'error_count': 0, 'log_messages': None}
         try:
-            self.process = subprocess.Popen(arguments, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=os.path.dirname(tex_filename))
+            self.process = subprocess.Popen(arguments, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=query.build_folder, env=self.get_search_path_env(query, ['BIBINPUTS', 'BSTINPUTS']))
         except FileNotFoundError:
-            self.cleanup_files(query)
-            self.throw_build_error(query, 'interpreter_not_working', 'bibtex missing')
-            return
-        self.process.wait()
+            result['error'] = ('interpreter_not_working', 'bibtex missing')
+            return result
+        self.wait_for_process(self.process)
 
-        self.parse_bibtex_log(query, tex_filename[:-3] + 'blg')
-        query.jobs.insert(0, 'build_latex')
+        self.parse_bibtex_log(result, query.get_build_filename('.blg'))
+        return result
 
     def stop_running(self):
         if self.process != None:
             self.process.kill()
             self.process = None
 
-    def parse_bibtex_log(self, query, log_filename):
+    def parse_bibtex_log(self, result, log_filename):
         try: file = open(log_filename, 'rb')
         except FileNotFoundError as e: pass
         else:
             text = file.read().decode('utf-8', errors='ignore')
 
-            query.bibtex_log_messages = {'error': list(), 'warning': list(), 'badbox': list()}
+            log_messages = {'error': list(), 'warning': list(), 'badbox': list()}
             for item in self.bibtex_log_item_regex.finditer(text):
                 line = item.group(0)
 
                 if line.startswith('I couldn\'t open style file'):
-                    query.error_count += 1
+                    result['error_count'] += 1
                     text = 'I couldn\'t open style file ' + item.group(4) + '.bst'
                     line_number = int(item.group(5).strip())
-                    query.bibtex_log_messages['error'].append(('Error', -1, text))
+                    log_messages['error'].append(('Error', -1, text))
                 elif line.startswith('Warning--'):
                     if item.group(1) != None:
                         text = item.group(1)
@@ -79,8 +81,9 @@ class BuilderBuildBibTeX(builder_build.BuilderBuild):
                     else:
                         text = item.group(7)
                         line_number = -1
-                    query.bibtex_log_messages['warning'].append(('Warning', line_number, text))
-            query.bibtex_log_messages['error'].sort(key=itemgetter(1))
-            query.bibtex_log_messages['warning'].sort(key=itemgetter(1))
+                    log_messages['warning'].append(('Warning', line_number, text))
+            log_messages['error'].sort(key=itemgetter(1))
+            log_messages['warning'].sort(key=itemgetter(1))
+            result['log_messages'] = log_messages
 
 
@@ -34,20 +34,15 @@ class BuilderBuildGlossaries(builder_build.BuilderBuild):
         basename = os.path.basename(tex_filename).rsplit('.', 1)[0]
         arguments = ['makeglossaries']
         arguments.append(basename)
+
+        result = {'ran_on_file': basename, 'error': None, 'error_count': 0, 'log_messages': None}
         try:
-            self.process = subprocess.Popen(arguments, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=os.path.dirname(tex_filename))
+            self.process = subprocess.Popen(arguments, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=query.build_folder)
         except FileNotFoundError:
-            self.cleanup_files(query)
-            self.throw_build_error(query, 'interpreter_not_working', 'makeglossaries missing')
-            return
-        self.process.wait()
-        for ending in ['.gls', '.acr']:
-            move_from = os.path.join(os.path.dirname(tex_filename), basename + ending)
-            move_to = os.path.join(os.path.dirname(query.tex_filename), basename + ending)
-            try: shutil.move(move_from, move_to)
-            except FileNotFoundError: pass
-
-        query.jobs.insert(0, 'build_latex')
+            result['error'] = ('interpreter_not_working', 'makeglossaries missing')
+            return result
+        self.wait_for_process(self.process)
+        return result
 
     def stop_running(self):
         if self.process != None:
@@ -20,11 +20,17 @@ import os.path
 import sys
 import base64
 import shutil
-import pexpect
+import hashlib
+import time
+import subprocess
 from operator import itemgetter
 
 import setzer.document.build_system.builder.builder_build as builder_build
 import setzer.document.build_system.latex_log_parser.latex_log_parser as latex_log_parser
+import setzer.document.build_system.input_fingerprints.input_fingerprints as input_fingerprints
+import setzer.document.build_system.fls_parser.fls_parser as fls_parser
+import setzer.document.build_system.aux_parser.aux_parser as aux_parser
+import setzer.document.build_system.latex_worker.latex_worker as latex_worker
 from setzer.app.service_locator import ServiceLocator
 
 
@@ -35,97 +41,174 @@ class BuilderBuildLaTeX(builder_build.BuilderBuild):
 
         self.config_folder = ServiceLocator.get_config_folder()
         self.latex_log_parser = latex_log_parser.LaTeXLogParser()
+        self.input_fingerprints = input_fingerprints.InputFingerprints()
+        self.fls_parser = fls_parser.FLSParser()
+        self.aux_parser = aux_parser.AuxParser()
+        self.latex_worker = latex_worker.LaTeXWorker()
+
+        # files written by one pass and read back by the next, if any of them
+        # changed the document has to be typeset again.
+        self.rerun_file_endings = ['.aux', '.toc', '.lof', '.lot', '.out', '.nav']
+        self.max_latex_passes = 5
+        self.rerun_ignore_regex = ServiceLocator.get_regex_object(r'^(?:\\relax|\\gdef ?\\@abspage@last\{[0-9]*\})?\s*$')
+        self.include_regex = ServiceLocator.get_regex_object(r'\\include\s*\{([^}]*)\}')
 
     def run(self, query):
         build_command_defaults = dict()
-        build_command_defaults['pdflatex'] = 'pdflatex -synctex=1 -interaction=nonstopmode'
-        build_command_defaults['xelatex'] = 'xelatex -synctex=1 -interaction=nonstopmode'
-        build_command_defaults['lualatex'] = 'lualatex --synctex=1 --interaction=nonstopmode'
-        build_command_defaults['tectonic'] = 'tectonic --synctex --keep-logs'
+        build_command_defaults['pdflatex'] = ['pdflatex', '-synctex=1', '-interaction=nonstopmode', '-recorder']
+        build_command_defaults['xelatex'] = ['xelatex', '-synctex=1', '-interaction=nonstopmode', '-recorder']
+        build_command_defaults['lualatex'] = ['lualatex', '--synctex=1', '--interaction=nonstopmode', '--recorder']
+        build_command_defaults['tectonic'] = ['tectonic', '--synctex', '--keep-logs']
 
         latex_interpreter = query.build_data['latex_interpreter']
+        use_latex_worker = query.build_data['use_latex_worker'] and latex_interpreter != 'tectonic' and not query.build_data['use_latexmk']
+        tex_argument = query.tex_filename
         if latex_interpreter == 'tectonic':
-            build_command = build_command_defaults[latex_interpreter]
-            build_command += ' --outdir "' + os.path.dirname(query.tex_filename) + '" "' 
+            arguments = build_command_defaults[latex_interpreter]
+            arguments += ['--outdir', query.build_folder]
         elif query.build_data['use_latexmk']:
             if latex_interpreter == 'pdflatex':
                 interpreter_option = 'pdf'
             else:
                 interpreter_option = latex_interpreter
-            build_command = 'latexmk -' + interpreter_option + ' -synctex=1 -interaction=nonstopmode'
-            build_command += query.build_data['additional_arguments']
-            build_command += ' -output-directory="' + os.path.dirname(query.tex_filename) + '" "'
+            arguments = ['latexmk', '-' + interpreter_option, '-synctex=1', '-interaction=nonstopmode', '-recorder']
+            arguments += query.build_data['additional_arguments'].split()
+            arguments.append('-output-directory=' + query.build_folder)
+            if self.get_pretex(query) != '':
+                arguments.append('-usepretex=' + self.get_pretex(query))
         else:
-            build_command = build_command_defaults[latex_interpreter]
-            build_command += query.build_data['additional_arguments']
-            build_command += ' -output-directory="' + os.path.dirname(query.tex_filename) + '" "'
-        build_command += query.tex_filename + '"'
+            arguments = build_command_defaults[latex_interpreter]
+            arguments += query.build_data['additional_arguments'].split()
+            arguments.append('-output-directory=' + query.build_folder)
+            if self.get_pretex(query) != '' or use_latex_worker:
+                arguments.append('-jobname=' + os.path.splitext(os.path.basename(query.tex_filename))[0])
+                tex_argument = self.get_pretex(query) + '\\input{' + os.path.basename(query.tex_filename) + '}'
+        if query.build_data['halt_on_error'] and latex_interpreter != 'tectonic':
+            arguments.append('--halt-on-error' if latex_interpreter == 'lualatex' and not query.build_data['use_latexmk'] else '-halt-on-error')
+        if not use_latex_worker:
+            self.latex_worker.stop()
+
+        if query.build_data['latex_passes'] == 0:
+            self.prepare_build_folder(query)
+            if query.build_data['includeonly'] != None:
+                self.restore_aux_file(query)
+
+        rerun_file_hashes = self.get_rerun_file_hashes(query)
+        query.build_data['latex_passes'] += 1
+        start_time = time.time()
 
+        # stdin is closed (or closed after the worker read its line), so an
+        # interpreter that asks for input fails right away instead of hanging.
         try:
-            self.process = pexpect.spawn(build_command, cwd=os.path.dirname(query.tex_filename))
-        except pexpect.exceptions.ExceptionPexpect:
+            process, is_warm = None, False
+            if use_latex_worker:
+                process, is_warm = self.latex_worker.get_process(arguments, os.path.dirname(query.tex_filename), query.build_folder)
+                try:
+                    process.stdin.write((tex_argument + '\n').encode('utf-8'))
+                    process.stdin.close()
+                except BrokenPipeError:
+                    # the worker died before it got its line, waiting for it
+                    # would return at once and leave the last pass's log.
+                    self.latex_worker.discard(process, query.build_folder)
+                    process, is_warm = None, False
+            if process == None:
+                process = subprocess.Popen(arguments + [tex_argument], stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=os.path.dirname(query.tex_filename))
+        except FileNotFoundError:
             self.cleanup_files(query)
             self.throw_build_error(query, 'interpreter_missing', latex_interpreter)
             return
+        self.process = process
+        query.add_timeline_entry('process_spawn', start_time, 'warm' if is_warm else None)
 
-        while True:
-            try:
-                out = self.process.expect(['\r\n\r\n', pexpect.TIMEOUT, pexpect.EOF], timeout=20)
-            except AttributeError:
-                break
-            if out == 0:
-                pass
-            elif out == 1:
-                for line in self.process.before.split(b'\n'):
-                    if line.startswith(b'!'):
-                        self.process.sendcontrol('c')
-                        self.process.sendline('x')
-            else:
-                break
+        self.wait_for_process(process)
+        query.add_timeline_entry('latex', start_time, query.build_data['rerun_latex_reason'])
 
         # parse results
+        start_time = time.time()
         try:
-            if self.parse_build_log(query):
-                return
+            needs_auxiliary_jobs = self.parse_build_log(query)
         except FileNotFoundError as e:
             self.cleanup_files(query)
             self.throw_build_error(query, 'interpreter_not_working', 'log file missing')
             return
+        query.add_timeline_entry('log_parsing', start_time)
 
+        # another pass follows, its interpreter can load while the tools run.
+        if needs_auxiliary_jobs:
+            if use_latex_worker:
+                self.latex_worker.prepare(arguments, os.path.dirname(query.tex_filename), query.build_folder)
+            return
+
+        changed_files = self.get_changed_rerun_files(query, rerun_file_hashes)
+        if len(changed_files) > 0:
+            query.build_data['rerun_latex_reason'] = ' '.join(changed_files) + ' changed'
+            query.jobs.insert(0, 'build_latex')
+            if use_latex_worker:
+                self.latex_worker.prepare(arguments, os.path.dirname(query.tex_filename), query.build_folder)
+            return
+
+        start_time = time.time()
         query.can_sync = self.copy_synctex_file(query)
+        query.add_timeline_entry('synctex_copy', start_time)
+        if query.build_data['includeonly'] == None and query.error_count == 0:
+            self.save_aux_file(query)
+        recorded_inputs = self.get_recorded_inputs(query)
+        if not query.build_data['do_cleanup']:
+            self.copy_files_to_document_folder(query)
         self.cleanup_files(query)
 
+        # the interpreter for the next build writes its own .fls file, it
+        # starts only after the one of this pass has been read and removed.
+        if use_latex_worker:
+            self.latex_worker.prepare(arguments, os.path.dirname(query.tex_filename), query.build_folder)
+
         pdf_filename = query.tex_filename.rsplit('.tex', 1)[0] + '.pdf'
         if query.error_count > 0:
-            if os.path.isfile(pdf_filename):
-                os.remove(pdf_filename)
+            for filename in [query.get_build_filename('.pdf'), pdf_filename]:
+                if os.path.isfile(filename):
+                    os.remove(filename)
             pdf_filename = None
+        else:
+            self.move_pdf_file(query, pdf_filename)
 
         with query.build_result_lock:
             query.build_result = {'pdf_filename': pdf_filename, 
                                   'has_synctex_file': query.can_sync,
                                   'log_messages': query.log_messages,
                                   'bibtex_log_messages': query.bibtex_log_messages,
+                                  'input_fingerprints': query.build_data['input_fingerprints'],
+                                  'timeline': query.get_timeline(),
+                                  'latex_interpreter': query.build_data['latex_interpreter'],
+                                  'build_profile': query.build_data['build_profile'],
+                                  'includeonly': query.build_data['includeonly'],
+                                  'recorded_inputs': recorded_inputs,
                                   'error': None,
                                   'error_arg': None}
 
     def stop_running(self):
         if self.process != None:
-            self.process.sendcontrol('c')
-            self.process.sendline('x')
-            self.process.terminate(True)
+            self.process.kill()
             self.process = None
 
+    def shutdown(self):
+        self.stop_running()
+        self.latex_worker.stop()
+
     def parse_build_log(self, query):
         query.log_messages = list()
         query.error_count = 0
 
-        log_items = self.latex_log_parser.parse_build_log(query.tex_filename)
+        log_items = self.latex_log_parser.parse_build_log(query.tex_filename, query.get_build_filename('.log'))
         additional_jobs = self.latex_log_parser.get_additional_jobs(log_items, query)
+        if not query.build_data['use_latexmk']:
+            additional_jobs = self.input_fingerprints.filter_jobs(additional_jobs, query)
         file_no = 0
 
-        for job in additional_jobs:
-            query.jobs.insert(0, job)
+        if len(additional_jobs) > 0:
+            query.build_data['auxiliary_jobs'] = additional_jobs
+            query.build_data['rerun_latex_reason'] = 'after ' + ', '.join(sorted(job[6:] for job in additional_jobs))
+            query.jobs.insert(0, 'build_latex')
+            query.jobs.insert(0, 'build_auxiliary')
             return True
 
         for filename, items in log_items.items():
@@ -137,8 +220,132 @@ class BuilderBuildLaTeX(builder_build.BuilderBuild):
 
         return False
 
+    def get_changed_rerun_files(self, query, previous_hashes):
+        if query.build_data['use_latexmk']: return []
+        if query.build_data['latex_interpreter'] == 'tectonic': return []
+        if query.error_count > 0: return []
+        if query.build_data['latex_passes'] >= self.max_latex_passes: return []
+
+        hashes = self.get_rerun_file_hashes(query)
+        empty_hash = hashlib.md5().digest()
+        return [name for name in hashes if hashes[name] != previous_hashes.get(name, empty_hash)]
+
+    def get_rerun_file_hashes(self, query):
+        ''' Hashes of the files in rerun_file_endings and of the .aux files of
+            \included chapters, labels defined there are read back from those. '''
+
+        hashes = dict()
+        for ending in self.rerun_file_endings:
+            hashes[ending] = self.get_rerun_file_hash(query.get_build_filename(ending))
+
+        aux_files = self.aux_parser.get_aux_files(query.build_folder, os.path.basename(query.get_build_filename('.aux')))
+        for filename in aux_files[1:]:
+            hashes[filename] = self.get_rerun_file_hash(os.path.join(query.build_folder, filename))
+        return hashes
+
+    def get_rerun_file_hash(self, filename):
+        md5 = hashlib.md5()
+        try: file = open(filename, 'rb')
+        except FileNotFoundError: pass
+        else:
+            with file:
+                for line in file:
+                    if not self.rerun_ignore_regex.match(line.decode('utf-8', errors='ignore')):
+                        md5.update(line)
+        return md5.digest()
+
+    def get_recorded_inputs(self, query):
+        ''' Partial builds don't read the excluded chapters, so only full
+            builds tell which files the document depends on. '''
+
+        if query.build_data['latex_interpreter'] == 'tectonic': return None
+        if query.build_data['includeonly'] != None: return None
+
+        try: return self.fls_parser.parse_fls(query.tex_filename, query.build_folder)
+        except FileNotFoundError: return None
+
+    def prepare_build_folder(self, query):
+        ''' TeX doesn't create folders, chapters \included from subfolders
+            need them in the build folder for their .aux files. '''
+
+        folders = {''}
+        for match in self.include_regex.finditer(query.build_data['text']):
+            folders.add(os.path.dirname(match.group(1).strip()))
+        if query.build_data['recorded_inputs'] != None:
+            for filename in query.build_data['recorded_inputs']:
+                if filename.endswith('.tex'):
+                    folders.add(os.path.dirname(filename))
+
+        for folder in folders:
+            if os.path.isabs(folder): continue
+            folder = os.path.normpath(os.path.join(query.build_folder, folder))
+            if folder == query.build_folder or folder.startswith(query.build_folder + os.sep):
+                os.makedirs(folder, exist_ok=True)
+
+    def move_pdf_file(self, query, pdf_filename):
+        ''' Puts the pdf file next to the document, replacing the old one in
+            one step, the preview may still be reading it. '''
+
+        build_filename = query.get_build_filename('.pdf')
+        if not os.path.isfile(build_filename): return
+
+        try: os.replace(build_filename, pdf_filename)
+        except OSError:
+            # the build folder is on another file system
+            temp_filename = os.path.join(os.path.dirname(pdf_filename), '.' + os.path.basename(pdf_filename) + '.part')
+            try:
+                shutil.copyfile(build_filename, temp_filename)
+                os.replace(temp_filename, pdf_filename)
+                os.remove(build_filename)
+            except OSError: pass
+
+    def copy_files_to_document_folder(self, query):
+        ''' Other tools (viewers, editors, latexmk) look for these next to
+            the pdf file. '''
+
+        dirname = os.path.dirname(query.tex_filename)
+        for ending in ['.log', '.synctex.gz']:
+            build_filename = query.get_build_filename(ending)
+            try: shutil.copyfile(build_filename, os.path.join(dirname, os.path.basename(build_filename)))
+            except OSError: pass
+
+    def get_pretex(self, query):
+        ''' TeX code run before the document is read, passed on the command line. '''
+
+        pretex = ''
+        if query.build_data['build_profile'] == 'draft_graphics':
+            pretex += '\\PassOptionsToPackage{draft}{graphicx}\\PassOptionsToPackage{draft}{graphics}'
+        if query.build_data['includeonly'] != None:
+            pretex += '\\includeonly{' + query.build_data['includeonly'] + '}'
+        return pretex
+
+    def get_aux_file_copy_filename(self, tex_filename):
+        folder = self.config_folder + '/' + base64.urlsafe_b64encode(str.encode(tex_filename)).decode()
+        return folder + '/' + os.path.splitext(os.path.basename(tex_filename))[0] + '.aux'
+
+    def has_aux_file(self, tex_filename, build_folder):
+        ''' Partial builds need the .aux file of the last full build. '''
+
+        if os.path.isfile(os.path.join(build_folder, os.path.splitext(os.path.basename(tex_filename))[0] + '.aux')): return True
+        return os.path.isfile(self.get_aux_file_copy_filename(tex_filename))
+
+    def save_aux_file(self, query):
+        move_to = self.get_aux_file_copy_filename(query.tex_filename)
+        if not os.path.exists(os.path.dirname(move_to)):
+            os.makedirs(os.path.dirname(move_to))
+
+        try: shutil.copyfile(query.get_build_filename('.aux'), move_to)
+        except FileNotFoundError: pass
+
+    def restore_aux_file(self, query):
+        move_to = query.get_build_filename('.aux')
+        if os.path.isfile(move_to): return
+
+        try: shutil.copyfile(self.get_aux_file_copy_filename(query.tex_filename), move_to)
+        except FileNotFoundError: pass
+
     def copy_synctex_file(self, query):
-        move_from = os.path.splitext(query.tex_filename)[0] + '.synctex.gz'
+        move_from = query.get_build_filename('.synctex.gz')
         folder = self.config_folder + '/' + base64.urlsafe_b64encode(str.encode(query.tex_filename)).decode()
         move_to = folder + '/' + os.path.splitext(os.path.basename(query.tex_filename))[0] + '.synctex.gz'
 
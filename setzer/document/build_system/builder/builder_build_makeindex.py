@@ -38,17 +38,14 @@ class BuilderBuildMakeindex(builder_build.BuilderBuild):
         arguments = ['makeindex']
         arguments.append(filename + '.idx')
 
-        query.makeindex_data['ran_on_files'].append(filename)
-
+        result = {'ran_on_file': filename, 'error': None, 'error_count': 0, 'log_messages': None}
         try:
-            self.process = subprocess.Popen(arguments, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=os.path.dirname(tex_filename))
+            self.process = subprocess.Popen(arguments, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=query.build_folder, env=self.get_search_path_env(query, ['INDEXSTYLE']))
         except FileNotFoundError:
-            self.cleanup_files(query)
-            self.throw_build_error(query, 'interpreter_not_working', 'makeindex missing')
-            return
-        self.process.wait()
-
-        query.jobs.insert(0, 'build_latex')
+            result['error'] = ('interpreter_not_working', 'makeindex missing')
+            return result
+        self.wait_for_process(self.process)
+        return result
 
     def stop_running(self):
         if self.process != None:
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import os.path
+
+from setzer.app.service_locator import ServiceLocator
+
+
+class FLSParser():
+    ''' Reads the .fls file LaTeX writes when run with -recorder. '''
+
+    def __init__(self):
+        # files of the TeX distribution and system fonts, they don't change
+        # while working on a document and there are a lot of them.
+        self.system_file_regex = ServiceLocator.get_regex_object(r'(?:^|/)(?:texmf[^/]*|texlive|miktex|fonts)(?:/|$)')
+
+    def parse_fls(self, tex_filename, build_folder):
+        ''' Return the files read by the last build, relative to the document
+            folder where possible, without the files it wrote itself or the
+            tools left in the build folder. '''
+
+        dirname = os.path.dirname(tex_filename)
+        basename = os.path.splitext(os.path.basename(tex_filename))[0]
+        build_folder = os.path.normpath(build_folder)
+
+        with open(os.path.join(build_folder, basename + '.fls'), 'r', encoding='utf-8', errors='ignore') as file:
+            lines = file.read().splitlines()
+
+        working_directory = dirname
+        inputs = set()
+        outputs = set()
+        for line in lines:
+            if line.startswith('PWD '):
+                working_directory = line[4:]
+            elif line.startswith('INPUT '):
+                inputs.add(os.path.normpath(os.path.join(working_directory, line[6:])))
+            elif line.startswith('OUTPUT '):
+                outputs.add(os.path.normpath(os.path.join(working_directory, line[7:])))
+
+        recorded_inputs = set()
+        for filename in inputs - outputs:
+            if self.system_file_regex.search(filename): continue
+            if filename.startswith(build_folder + os.sep): continue
+            if os.path.dirname(filename) == dirname and os.path.basename(filename).startswith(basename + '.') and filename != tex_filename: continue
+
+            relative_filename = os.path.relpath(filename, dirname)
+            if relative_filename.startswith('..' + os.sep):
+                recorded_inputs.add(filename)
+            else:
+                recorded_inputs.add(relative_filename)
+        return sorted(recorded_inputs)
+
+
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import os.path
+import hashlib
+
+import setzer.document.build_system.aux_parser.aux_parser as aux_parser
+from setzer.app.service_locator import ServiceLocator
+
+
+class InputFingerprints():
+    ''' Fingerprints of the inputs of the auxiliary tools. A tool whose
+        fingerprint matches the one from its last run (and whose output is
+        still there) doesn't have to run again. '''
+
+    def __init__(self):
+        self.citation_regex = ServiceLocator.get_regex_object(r'^\\(?:citation|bibdata|bibstyle)\{.*\}$')
+        self.bibdata_regex = ServiceLocator.get_regex_object(r'^\\bibdata\{(.*)\}$')
+        self.bcf_datasource_regex = ServiceLocator.get_regex_object(r'<bcf:datasource[^>]*>(.*)</bcf:datasource>')
+        self.aux_parser = aux_parser.AuxParser()
+
+        self.input_files = dict()
+        self.input_files['build_bibtex'] = ['.aux']
+        self.input_files['build_biber'] = ['.bcf']
+        self.input_files['build_makeindex'] = ['.idx']
+        self.input_files['build_glossaries'] = ['.glo', '.acn']
+
+        self.output_files = dict()
+        self.output_files['build_bibtex'] = ['.bbl']
+        self.output_files['build_biber'] = ['.bbl']
+        self.output_files['build_makeindex'] = ['.ind']
+        self.output_files['build_glossaries'] = ['.gls']
+
+    def filter_jobs(self, jobs, query):
+        ''' Drop jobs from the set the log asked for whose inputs didn't change,
+            add jobs whose inputs changed since their last run. '''
+
+        previous_fingerprints = query.build_data['input_fingerprints']
+        basename = query.get_build_filename('')
+
+        result = set()
+        for job in self.input_files:
+            if os.path.basename(basename) in self.get_ran_on_files(query, job): continue
+
+            fingerprint = self.get_fingerprint(job, query)
+            if fingerprint == None:
+                if job in jobs:
+                    result.add(job)
+                continue
+
+            outputs_exist = all(os.path.isfile(basename + ending) for ending in self.output_files[job])
+            is_up_to_date = outputs_exist and previous_fingerprints.get(job) == fingerprint
+            if job in jobs and not is_up_to_date:
+                result.add(job)
+            elif job not in jobs and job in previous_fingerprints and not is_up_to_date:
+                result.add(job)
+
+        if 'build_biber' in result:
+            result -= {'build_bibtex'}
+        return result
+
+    def get_ran_on_files(self, query, job):
+        if job == 'build_bibtex': return query.bibtex_data['ran_on_files']
+        if job == 'build_biber': return query.biber_data['ran_on_files']
+        if job == 'build_makeindex': return query.makeindex_data['ran_on_files']
+        if job == 'build_glossaries': return query.glossaries_data['ran_on_files']
+
+    def get_fingerprint(self, job, query):
+        basename = query.get_build_filename('')
+        dirname = os.path.dirname(query.tex_filename)
+
+        md5 = hashlib.md5()
+        found_input = False
+        for ending in self.input_files[job]:
+            try: file = open(basename + ending, 'rb')
+            except FileNotFoundError: continue
+            with file:
+                text = file.read()
+            found_input = True
+
+            if job == 'build_bibtex':
+                # citations in \included chapters go to the chapters' .aux files
+                for filename in self.aux_parser.get_aux_files(query.build_folder, os.path.basename(basename) + ending)[1:]:
+                    try: file = open(os.path.join(query.build_folder, filename), 'rb')
+                    except FileNotFoundError: continue
+                    with file:
+                        text += b'\n' + file.read()
+
+                lines = [line for line in text.decode('utf-8', errors='ignore').splitlines() if self.citation_regex.match(line)]
+                if len(lines) == 0: return None
+                md5.update('\n'.join(lines).encode('utf-8'))
+                for line in lines:
+                    match = self.bibdata_regex.match(line)
+                    if match != None:
+                        for name in match.group(1).split(','):
+                            self.update_with_mtime(md5, os.path.join(dirname, name.strip() + '.bib'))
+            elif job == 'build_biber':
+                md5.update(text)
+                for match in self.bcf_datasource_regex.finditer(text.decode('utf-8', errors='ignore')):
+                    self.update_with_mtime(md5, os.path.join(dirname, match.group(1).strip()))
+            else:
+                md5.update(ending.encode('utf-8'))
+                md5.update(text)
+
+        if not found_input: return None
+        return md5.hexdigest()
+
+    def update_with_mtime(self, md5, filename):
+        try: mtime = os.path.getmtime(filename)
+        except OSError: mtime = None
+        md5.update((filename + ':' + str(mtime)).encode('utf-8'))
+
+
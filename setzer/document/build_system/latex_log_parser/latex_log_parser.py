@@ -34,8 +34,7 @@ class LaTeXLogParser():
         self.badbox_line_number_regex = ServiceLocator.get_regex_object(r'lines ([0-9]+)--([0-9]+)')
         self.other_line_number_regex = ServiceLocator.get_regex_object(r'(l\.| input line \n| input line )([0-9]+)( |\.)')
 
-    def parse_build_log(self, tex_filename):
-        log_filename = os.path.dirname(tex_filename) + '/' + os.path.basename(tex_filename).rsplit('.tex', 1)[0] + '.log'
+    def parse_build_log(self, tex_filename, log_filename):
         try: file = open(log_filename, 'rb')
         except FileNotFoundError as e: raise e
         else:
@@ -52,73 +51,31 @@ class LaTeXLogParser():
 
     def get_additional_jobs(self, log_items, query):
         jobs = set()
-        rerun_latex_reasons = set()
+        basename = query.tex_filename.rsplit('/', 1)[1][:-4]
         for filename, items in log_items.items():
             for item in items['error'] + items['warning']:
 
-                if item[2].startswith('No file ') and item[2].find(query.tex_filename.rsplit('.', 1)[0].rsplit('/', 1)[1]) >= 0 and item[2].find('.bbl.') >= 0:
-                    if not query.tex_filename.rsplit('/', 1)[1][:-4] in query.bibtex_data['ran_on_files']:
+                if item[2].startswith('No file ') and item[2].find(basename) >= 0 and item[2].find('.bbl.') >= 0:
+                    if not basename in query.bibtex_data['ran_on_files']:
                         jobs |= {'build_bibtex'}
 
-                elif item[2].startswith('No file ') and item[2].find(query.tex_filename.rsplit('.', 1)[0].rsplit('/', 1)[1]) >= 0 and item[2].find('.ind.') >= 0:
-                    if not query.tex_filename.rsplit('/', 1)[1][:-4] in query.makeindex_data['ran_on_files']:
+                elif item[2].startswith('No file ') and item[2].find(basename) >= 0 and item[2].find('.ind.') >= 0:
+                    if not basename in query.makeindex_data['ran_on_files']:
                         jobs |= {'build_makeindex'}
 
                 elif item[2] == 'Please (re)run Biber on the file:':
                     line = item[3]
-                    if line.find(query.tex_filename.rsplit('.', 1)[0].rsplit('/', 1)[1]) >= 0:
-                        if not query.tex_filename.rsplit('/', 1)[1][:-4] in query.biber_data['ran_on_files']:
+                    if line.find(basename) >= 0:
+                        if not basename in query.biber_data['ran_on_files']:
                             jobs |= {'build_biber'}
 
-                elif item[2] == 'File `' + query.tex_filename.rsplit('/', 1)[1][:-4] + '.out\' has changed.':
-                    jobs |= {'build_latex'}
-                    rerun_latex_reasons |= {1}
-
-                elif item[2] == 'Please rerun LaTeX.':
-                    jobs |= {'build_latex'}
-                    rerun_latex_reasons |= {2}
-
-                elif item[2] == 'Label(s) may have changed. Rerun to get cross-references right.':
-                    jobs |= {'build_latex'}
-                    rerun_latex_reasons |= {3}
-
-                elif item[2] == 'There were undefined references.':
-                    jobs |= {'build_latex'}
-                    rerun_latex_reasons |= {3}
-
-                elif item[2] == 'Citation(s) may have changed.':
-                    jobs |= {'build_latex'}
-                    rerun_latex_reasons |= {4}
-
-                elif item[2].startswith('No file ') and item[2].find(query.tex_filename.rsplit('.', 1)[0].rsplit('/', 1)[1]) >= 0 and (item[2].find('.toc.') >= 0 or item[2].find('.aux.') >= 0):
-                    jobs |= {'build_latex'}
-                    rerun_latex_reasons |= {5}
-
-                elif item[2] == 'Rerun to get transparencies right.':
-                    jobs |= {'build_latex'}
-                    rerun_latex_reasons |= {6}
-
-                elif item[2].startswith('No file ') and item[2].find(query.tex_filename.rsplit('.', 1)[0].rsplit('/', 1)[1]) >= 0 and (item[2].find('.gls.') >= 0 or item[2].find('.acr.') >= 0):
-                    jobs |= {'build_glossaries'}
-
-                elif item[2].startswith('No file ') and item[2].find(query.tex_filename.rsplit('.', 1)[0].rsplit('/', 1)[1]) >= 0 and (item[2].find('.aux.') >= 0):
-                    jobs |= {'build_latex'}
-                    rerun_latex_reasons |= {7}
+                elif item[2].startswith('No file ') and item[2].find(basename) >= 0 and (item[2].find('.gls.') >= 0 or item[2].find('.acr.') >= 0):
+                    if not basename in query.glossaries_data['ran_on_files']:
+                        jobs |= {'build_glossaries'}
 
+        # biber and bibtex both write the .bbl file, biber takes precedence
         if 'build_biber' in jobs:
-            return {'build_biber'}
-        if 'build_bibtex' in jobs:
-            return {'build_bibtex'}
-        if 'build_makeindex' in jobs:
-            return {'build_makeindex'}
-        if 'build_glossaries' in jobs:
-            return {'build_glossaries'}
-        if 'build_latex' in jobs:
-            if len(rerun_latex_reasons - query.build_data['rerun_latex_reasons']) > 0:
-                query.build_data['rerun_latex_reasons'] = rerun_latex_reasons
-                return {'build_latex'}
-            else:
-                jobs -= {'build_latex'}
+            jobs -= {'build_bibtex'}
         return jobs
 
     def parse_log_text(self, filename, text):
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import os
+import glob
+import _thread as thread
+import subprocess
+
+
+class LaTeXWorker():
+    ''' Keeps an interpreter started ahead of the next build. It loads its
+        format and then waits on a \read from the terminal for the line
+        that inputs the document, so process startup and format loading
+        are out of the way by the time the user builds. '''
+
+    def __init__(self):
+        self.process = None
+        self.arguments = None
+        self.cwd = None
+        self.output_folder = None
+        self.lock = thread.allocate_lock()
+
+        # \read from the terminal isn't allowed in nonstopmode, so the worker
+        # switches to it only after the line has been read.
+        self.worker_argument = '\\scrollmode\\read16 to\\setzerinput\\nonstopmode\\setzerinput'
+
+    def get_process(self, arguments, cwd, output_folder):
+        ''' Return the waiting process if it was started with the same arguments,
+            a new one otherwise, and whether it was started in advance. The
+            caller writes the input line to its stdin to start typesetting. '''
+
+        with self.lock:
+            process = None
+            if self.process != None:
+                if self.process.poll() == None and arguments == self.arguments and cwd == self.cwd:
+                    process = self.process
+                else:
+                    self.kill(self.process, self.output_folder)
+                self.process = None
+
+        if process == None:
+            return (self.spawn(arguments, cwd), False)
+        return (process, True)
+
+    def prepare(self, arguments, cwd, output_folder):
+        with self.lock:
+            if self.process != None:
+                self.kill(self.process, self.output_folder)
+            try:
+                self.process = self.spawn(arguments, cwd)
+            except FileNotFoundError:
+                self.process = None
+            self.arguments = arguments
+            self.cwd = cwd
+            self.output_folder = output_folder
+
+    def discard(self, process, output_folder):
+        ''' For a process from get_process that turned out to be dead. '''
+
+        self.kill(process, output_folder)
+
+    def stop(self):
+        with self.lock:
+            if self.process != None:
+                self.kill(self.process, self.output_folder)
+                self.process = None
+
+    def spawn(self, arguments, cwd):
+        return subprocess.Popen(arguments + [self.worker_argument], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, cwd=cwd)
+
+    def kill(self, process, output_folder):
+        ''' With -recorder the interpreter opens <program><pid>.fls in the
+            output folder as soon as it starts and renames it only when the
+            job begins, a worker killed while waiting leaves that file
+            behind. '''
+
+        process.kill()
+        process.wait()
+        try: process.stdin.close()
+        except BrokenPipeError: pass
+        process.stdout.close()
+
+        for filename in glob.glob(os.path.join(glob.escape(output_folder), '*' + str(process.pid) + '.fls')):
+            try: os.remove(filename)
+            except FileNotFoundError: pass
+
+
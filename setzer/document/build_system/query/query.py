@@ -16,6 +16,8 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>
 
 import _thread as thread
+import time
+import os.path
 
 
 class Query(object):
@@ -32,20 +34,31 @@ class Query(object):
         self.synctex_file = None
         self.synctex_file_lock = thread.allocate_lock()
 
-        self.build_data = {'rerun_latex_reasons': set()}
+        self.build_data = {'latex_passes': 0, 'auxiliary_jobs': set(), 'input_fingerprints': dict(), 'rerun_latex_reason': None, 'includeonly': None, 'build_profile': 'normal', 'use_latex_worker': False, 'halt_on_error': False}
         self.biber_data = {'ran_on_files': []}
         self.bibtex_data = {'ran_on_files': []}
         self.makeindex_data = {'ran_on_files': []}
+        self.glossaries_data = {'ran_on_files': []}
         self.can_sync = False
         self.forward_sync_data = dict()
         self.backward_sync_data = dict()
         self.tex_filename = tex_filename
 
+        # where the interpreter and the tools write their files, the pdf
+        # file is moved next to the document after the build.
+        self.build_folder = os.path.dirname(tex_filename)
+
         self.log_messages = dict()
         self.bibtex_log_messages = {'error': list(), 'warning': list(), 'badbox': list()}
         self.force_building_to_stop = False
         self.error_count = 0
 
+        self.timeline = list()
+        self.timeline_lock = thread.allocate_lock()
+
+    def get_build_filename(self, ending):
+        return os.path.join(self.build_folder, os.path.splitext(os.path.basename(self.tex_filename))[0] + ending)
+
     def get_build_result(self):
         return_value = None
         with self.build_result_lock:
@@ -67,6 +80,14 @@ class Query(object):
                 return_value = self.backward_sync_result
         return return_value
 
+    def add_timeline_entry(self, phase, start_time, detail=None):
+        with self.timeline_lock:
+            self.timeline.append({'phase': phase, 'detail': detail, 'start': start_time, 'duration': time.time() - start_time})
+
+    def get_timeline(self):
+        with self.timeline_lock:
+            return sorted(self.timeline, key=lambda entry: entry['start'])
+
     def mark_done(self):
         with self.done_executing_lock:
             self.done_executing = True
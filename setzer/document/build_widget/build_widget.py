@@ -41,10 +41,12 @@ class BuildWidget(Observable):
         self.build_button_state = ('idle', int(time.time()*1000))
         self.set_clean_button_state()
         self.update_build_button()
+        self.update_build_timing_tooltip()
 
         self.document.connect('filename_change', self.on_filename_change)
         self.document.build_system.connect('build_state_change', self.on_build_state_change)
         self.document.build_system.connect('build_state', self.on_build_state)
+        self.document.build_system.connect('build_timing_changed', self.on_build_timing_changed)
         self.settings.connect('settings_changed', self.on_settings_changed)
 
         self.view.build_timer.connect('notify::child-revealed', self.on_revealer_finished)
@@ -104,6 +106,43 @@ class BuildWidget(Observable):
                 message += '(' + str(error_count) + ' ' + _('errors') + ')!'
             self.show_message(message)
 
+    def on_build_timing_changed(self, build_system):
+        self.update_build_timing_tooltip()
+
+    def update_build_timing_tooltip(self):
+        tooltip_text = _('Save and build .pdf-file from document') + ' (F5)'
+
+        build_timing = self.document.build_system.get_last_build_timing()
+        if build_timing != None:
+            phase_names = dict()
+            phase_names['latex'] = _('LaTeX')
+            phase_names['process_spawn'] = _('Process start')
+            phase_names['bibtex'] = _('BibTeX')
+            phase_names['biber'] = _('Biber')
+            phase_names['makeindex'] = _('Makeindex')
+            phase_names['glossaries'] = _('Glossaries')
+            phase_names['log_parsing'] = _('Log parsing')
+            phase_names['synctex_copy'] = _('SyncTeX copy')
+            phase_names['pdf_reload'] = _('PDF reload')
+            phase_names['first_page_render'] = _('First page render')
+            phase_names['sharp_page_render'] = _('Sharp page render')
+
+            profile_names = {'normal': _('Normal'), 'draft_graphics': _('Draft graphics')}
+            profile_name = profile_names[build_timing.get('build_profile', 'normal')]
+            tooltip_text += '\n\n' + _('Last build') + ': {:.2f}s ({}, {})'.format(build_timing['build_time'], build_timing['latex_interpreter'], profile_name)
+
+            average_times = self.document.build_system.get_average_build_times()
+            if len(average_times) > 1:
+                for build_profile, average_time in average_times.items():
+                    tooltip_text += '\n' + _('Average') + ' ' + profile_names[build_profile] + ': {:.2f}s'.format(average_time)
+            for phase in build_timing['phases']:
+                tooltip_text += '\n' + phase_names.get(phase['phase'], phase['phase'])
+                if phase['detail'] != None:
+                    tooltip_text += ' (' + phase['detail'] + ')'
+                tooltip_text += ': {:.2f}s'.format(phase['duration'])
+
+        self.view.build_button.set_tooltip_text(tooltip_text)
+
     def on_settings_changed(self, settings, parameter):
         section, item, value = parameter
         if (section, item) == ('preferences', 'cleanup_build_files'):
@@ -126,10 +165,10 @@ class BuildWidget(Observable):
             file_endings = ['.aux', '.blg', '.bbl', '.dvi', '.fdb_latexmk', '.fls', '.idx' ,'.ilg', '.ind', '.log', '.nav', '.out', '.snm', '.synctex.gz', '.toc', '.ist', '.glo', '.glg', '.acn', '.alg', '.gls', '.acr', '.bcf', '.run.xml']
             if document != None:
                 if document.filename != None:
-                    pathname = document.get_filename().rsplit('/', 1)
+                    if os.path.isdir(document.build_system.get_build_folder()): return True
+                    basename = os.path.splitext(os.path.basename(document.get_filename()))[0]
                     for ending in file_endings:
-                        filename = pathname[0] + '/' + pathname[1].rsplit('.', 1)[0] + ending
-                        if os.path.exists(filename): return True
+                        if os.path.exists(os.path.join(document.get_dirname(), basename + ending)): return True
             return False
 
         if self.settings.get_value('preferences', 'cleanup_build_files') == True:
@@ -143,11 +182,12 @@ class BuildWidget(Observable):
         if self.document == None: return
         if self.document.filename == None: return
 
-        filename_base = os.path.splitext(document.get_filename())[0]
+        basename = os.path.splitext(os.path.basename(document.get_filename()))[0]
         file_endings = ['.aux', '.blg', '.bbl', '.dvi', '.xdv', '.fdb_latexmk', '.fls', '.idx' ,'.ilg', '.ind', '.log', '.nav', '.out', '.snm', '.synctex.gz', '.toc', '.ist', '.glo', '.glg', '.acn', '.alg', '.gls', '.acr', '.bcf', '.run.xml', '.out.ps']
         for ending in file_endings:
-            try: os.remove(filename_base + ending)
+            try: os.remove(os.path.join(document.get_dirname(), basename + ending))
             except FileNotFoundError: pass
+        document.build_system.remove_build_folder()
 
         self.set_clean_button_state()
 
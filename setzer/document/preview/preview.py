@@ -22,9 +22,9 @@ from gi.repository import Poppler
 from gi.repository import GLib
 from gi.repository import Gio
 
+import _thread as thread
 import os.path
 import time
-import math
 
 import setzer.document.preview.preview_viewgtk as preview_view
 import setzer.document.preview.preview_layouter as preview_layouter
@@ -32,8 +32,11 @@ import setzer.document.preview.preview_presenter as preview_presenter
 import setzer.document.preview.preview_controller as preview_controller
 import setzer.document.preview.preview_page_renderer as preview_page_renderer
 import setzer.document.preview.preview_links_parser as preview_links_parser
+import setzer.document.preview.preview_search as preview_search
+import setzer.document.preview.preview_thumbnails as preview_thumbnails
 import setzer.document.preview.preview_zoom_manager as preview_zoom_manager
 import setzer.document.preview.context_menu.context_menu as context_menu
+from setzer.app.service_locator import ServiceLocator
 from setzer.helpers.observable import Observable
 from setzer.helpers.timer import timer
 
@@ -45,12 +48,18 @@ class Preview(Observable):
         self.document = document
 
         self.pdf_filename = None
+        self.pdf_date = None
+        self.pdf_hash = None
+        self.load_pdf_count = 0
         self.recolor_pdf = self.document.settings.get_value('preferences', 'recolor_pdf')
 
         self.poppler_document = None
+        self.page_sizes = list()
         self.page_width = None
         self.page_height = None
+        self.vertical_margin = None
         self.layout = None
+        self.pending_position = None
 
         self.visible_synctex_rectangles = list()
         self.visible_synctex_rectangles_time = None
@@ -61,6 +70,8 @@ class Preview(Observable):
         self.controller = preview_controller.PreviewController(self, self.view)
         self.page_renderer = preview_page_renderer.PreviewPageRenderer(self)
         self.links_parser = preview_links_parser.PreviewLinksParser(self)
+        self.search = preview_search.PreviewSearch(self, self.view)
+        self.thumbnails = preview_thumbnails.PreviewThumbnails(self, self.view)
         self.presenter = preview_presenter.PreviewPresenter(self, self.page_renderer, self.view)
         self.context_menu = context_menu.ContextMenu(self, self.view)
 
@@ -92,32 +103,68 @@ class Preview(Observable):
             self.pdf_filename = pdf_filename
 
     def get_pdf_date(self):
-        if self.pdf_filename != None:
-            return os.path.getmtime(self.pdf_filename)
-        else:
-            return None
+        ''' Modification date of the file the current document was loaded from. '''
+
+        return self.pdf_date
 
     def load_pdf(self):
+        ''' Opening the file and reading its metadata happens in a thread,
+            the old document stays on screen until the new one is ready. '''
+
+        self.load_pdf_count += 1
+        thread.start_new_thread(self.load_pdf_in_thread, (self.pdf_filename, self.load_pdf_count))
+
+    def load_pdf_in_thread(self, pdf_filename, load_pdf_count):
         try:
-            self.poppler_document = Poppler.Document.new_from_file(GLib.filename_to_uri(self.pdf_filename))
+            pdf_date = os.path.getmtime(pdf_filename)
+            poppler_document = Poppler.Document.new_from_file(GLib.filename_to_uri(pdf_filename))
+            page_sizes = list()
+            for page_number in range(poppler_document.get_n_pages()):
+                page_size = poppler_document.get_page(page_number).get_size()
+                page_sizes.append((page_size.width, page_size.height))
+            vertical_margin = self.get_vertical_margin(poppler_document, page_sizes[0][0])
+            pdf_hash = ServiceLocator.get_tile_cache().get_pdf_hash(pdf_filename, pdf_date)
         except Exception:
-            self.reset_pdf_data()
-            return
+            result = None
+        else:
+            result = {'pdf_date': pdf_date, 'pdf_hash': pdf_hash, 'poppler_document': poppler_document, 'page_sizes': page_sizes, 'vertical_margin': vertical_margin}
+        GLib.idle_add(self.on_pdf_loaded, result, load_pdf_count)
 
-        page_size = self.poppler_document.get_page(0).get_size()
-        self.page_width = page_size.width
-        self.page_height = page_size.height
-        self.update_vertical_margin()
-        self.layout = None
+    def on_pdf_loaded(self, result, load_pdf_count):
+        if load_pdf_count != self.load_pdf_count: return False
+        if result == None:
+            self.reset_pdf_data()
+            return False
+
+        self.poppler_document = result['poppler_document']
+        self.pdf_date = result['pdf_date']
+        self.pdf_hash = result['pdf_hash']
+        self.page_sizes = result['page_sizes']
+        self.page_width, self.page_height = self.page_sizes[0]
+        self.vertical_margin = result['vertical_margin']
+
+        # a reload keeps zoom level and scroll position, the old pages stay
+        # on screen until the new ones are rendered.
+        if self.layout != None:
+            self.layout = self.layouter.create_layout()
         self.add_change_code('pdf_changed')
         self.add_change_code('layout_changed')
+        if self.layout != None:
+            self.zoom_manager.update_dynamic_zoom_levels()
+            self.scroll_to_pending_position()
+        return False
 
     def reset_pdf_data(self):
         self.pdf_filename = None
+        self.pdf_date = None
+        self.pdf_hash = None
         self.poppler_document = None
+        self.page_sizes = list()
         self.page_width = None
         self.page_height = None
+        self.vertical_margin = None
         self.layout = None
+        self.pending_position = None
         self.add_change_code('pdf_changed')
         self.add_change_code('layout_changed')
 
@@ -128,21 +175,35 @@ class Preview(Observable):
 
         self.layout = self.layouter.create_layout()
         self.add_change_code('layout_changed')
+        self.scroll_to_pending_position()
 
-    def update_vertical_margin(self):
-        current_min = self.page_width
-        for page_number in range(0, min(self.poppler_document.get_n_pages(), 3)):
-            page = self.poppler_document.get_page(page_number)
+    def get_vertical_margin(self, poppler_document, page_width):
+        current_min = page_width
+        for page_number in range(0, min(poppler_document.get_n_pages(), 3)):
+            page = poppler_document.get_page(page_number)
             layout = page.get_text_layout()
             for rect in layout[1]:
                 if rect.x1 < current_min:
                     current_min = rect.x1
         current_min -= 20
-        self.vertical_margin = current_min
+        return current_min
 
     def scroll_to_position(self, x, y):
+        ''' Without a layout (the pdf is still loading) the position is kept
+            until there is one, the zoom manager does the same with the zoom level. '''
+
+        if self.layout == None:
+            self.pending_position = (x, y)
+            return
+
+        self.view.content.scroll_to_position([x, y])
+
+    def scroll_to_pending_position(self):
         if self.layout == None: return
+        if self.pending_position == None: return
 
+        x, y = self.pending_position
+        self.pending_position = None
         self.view.content.scroll_to_position([x, y])
 
     def scroll_dest_on_screen(self, dest):
@@ -153,7 +214,7 @@ class Preview(Observable):
         left = dest.left * self.layout.scale_factor
         top = dest.top * self.layout.scale_factor
         x = max(min(left, content.scrolling_offset_x), content.scrolling_offset_x + content.width)
-        y = (self.layout.page_height + self.layout.page_gap) * (page_number) - top - self.layout.page_gap
+        y = self.layout.get_page_offset(page_number - 1) + self.layout.page_heights[page_number - 1] - top
 
         self.view.content.scroll_to_position([x, y])
 
@@ -180,7 +241,7 @@ class Preview(Observable):
             height = position['height'] * self.layout.scale_factor
 
             x = max(min(left - 18, content.scrolling_offset_x), left + width - content.width + 18)
-            y = (self.layout.page_height + self.layout.page_gap) * (page_number - 1) + max(0, top - height / 2 - content.height * 0.3)
+            y = self.layout.get_page_offset(page_number - 1) + max(0, top - height / 2 - content.height * 0.3)
 
             content.scroll_to_position([x, y])
             self.presenter.start_fade_loop()
@@ -189,20 +250,20 @@ class Preview(Observable):
         if self.layout == None: return False
 
         window_width = self.view.get_allocated_width()
-        y_total_pixels = min(max(y_offset, 0), (self.layout.page_height + self.layout.page_gap) * self.poppler_document.get_n_pages() - self.layout.page_gap)
-        x_pixels = min(max(x_offset - self.layout.get_horizontal_margin(window_width), 0), self.layout.page_width)
-        page = math.floor(y_total_pixels / (self.layout.page_height + self.layout.page_gap))
-        y_pixels = min(max(y_total_pixels - page * (self.layout.page_height + self.layout.page_gap), 0), self.layout.page_height)
+        page = self.layout.get_page_by_offset(y_offset) - 1
+        x_pixels = min(max(x_offset - self.layout.get_horizontal_margin(window_width, page), 0), self.layout.page_widths[page])
+        y_pixels = min(max(y_offset - self.layout.get_page_offset(page), 0), self.layout.page_heights[page])
         x = x_pixels / self.layout.scale_factor
         y = y_pixels / self.layout.scale_factor
+        page_width, page_height = self.page_sizes[page]
         page += 1
 
         poppler_page = self.poppler_document.get_page(page - 1)
         rect = Poppler.Rectangle()
-        rect.x1 = max(min(x, self.page_width), 0)
-        rect.y1 = max(min(y, self.page_height), 0)
-        rect.x2 = max(min(x, self.page_width), 0)
-        rect.y2 = max(min(y, self.page_height), 0)
+        rect.x1 = max(min(x, page_width), 0)
+        rect.y1 = max(min(y, page_height), 0)
+        rect.x2 = max(min(x, page_width), 0)
+        rect.y2 = max(min(y, page_height), 0)
         word = poppler_page.get_selected_text(Poppler.SelectionStyle.WORD, rect)
         context = poppler_page.get_selected_text(Poppler.SelectionStyle.LINE, rect)
         self.document.build_system.backward_sync(page, x, y, word, context)
@@ -91,7 +91,7 @@ class PreviewController(object):
 
         factor = zoom_level / manager.zoom_level
         x = factor * self.view.content.scrolling_offset_x + (factor - 1) * self.view.content.cursor_x
-        prev_pages = self.view.content.scrolling_offset_y // (layout.page_height + layout.page_gap)
+        prev_pages = layout.get_page_by_offset(self.view.content.scrolling_offset_y) - 1
         y = (1 - factor) * prev_pages * layout.page_gap + factor * self.view.content.scrolling_offset_y + (factor - 1) * self.view.content.cursor_y
         manager.set_zoom_level(zoom_level)
         self.preview.scroll_to_position(x, y)
@@ -113,19 +113,17 @@ class PreviewController(object):
         page_number, x_offset, y_offset = data
         cursor = self.cursor_default
         link_target = ''
-        links = self.preview.links_parser.get_links_for_page(page_number)
-        y_offset = (self.preview.page_height - y_offset)
-        for link in links:
-            if x_offset > link[0].x1 and x_offset < link[0].x2 and y_offset > link[0].y1 and y_offset < link[0].y2:
-                cursor = self.cursor_pointer
-                self.label_height = max(self.view.target_label.get_allocated_height(), self.label_height)
-                if self.view.overlay.get_allocated_height() - content.cursor_y <= self.label_height:
-                    link_target = ''
-                elif link[2] == 'uri':
-                    link_target = link[1]
-                elif link[2] == 'goto':
-                    link_target = _('Go to page ') + str(link[1].page_num)
-                break
+        y_offset = (self.preview.page_sizes[page_number][1] - y_offset)
+        link = self.preview.links_parser.get_link_at(page_number, x_offset, y_offset)
+        if link != None:
+            cursor = self.cursor_pointer
+            self.label_height = max(self.view.target_label.get_allocated_height(), self.label_height)
+            if self.view.overlay.get_allocated_height() - content.cursor_y <= self.label_height:
+                link_target = ''
+            elif link[2] == 'uri':
+                link_target = link[1]
+            elif link[2] == 'goto':
+                link_target = _('Go to page ') + str(link[1].page_num)
 
         self.view.set_cursor(cursor)
         self.view.set_link_target_string(link_target)
@@ -145,16 +143,14 @@ class PreviewController(object):
             if data == None: return True
 
             page_number, x_offset, y_offset = data
-            links = self.preview.links_parser.get_links_for_page(page_number)
-            y_offset = self.preview.page_height - y_offset
-            for link in links:
-                if x_offset > link[0].x1 and x_offset < link[0].x2 and y_offset > link[0].y1 and y_offset < link[0].y2:
-                    if link[2] == 'goto':
-                        self.preview.scroll_dest_on_screen(link[1])
-                        return True
-                    elif link[2] == 'uri':
-                        thread.start_new_thread(webbrowser.open_new_tab, (link[1],))
-                        return True
+            y_offset = self.preview.page_sizes[page_number][1] - y_offset
+            link = self.preview.links_parser.get_link_at(page_number, x_offset, y_offset)
+            if link == None: return True
+
+            if link[2] == 'goto':
+                self.preview.scroll_dest_on_screen(link[1])
+            elif link[2] == 'uri':
+                thread.start_new_thread(webbrowser.open_new_tab, (link[1],))
             return True
 
 
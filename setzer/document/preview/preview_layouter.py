@@ -15,6 +15,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program. If not, see <http://www.gnu.org/licenses/>
 
+import bisect
+import itertools
+
 from setzer.helpers.observable import Observable
 
 
@@ -34,9 +37,13 @@ class PreviewLayouter(Observable):
             layout.page_width = layout.scale_factor * self.preview.page_width
             layout.page_height = layout.scale_factor * self.preview.page_height
             layout.page_gap = layout.hidpi_factor * 10
+            layout.page_widths = [layout.scale_factor * page_width for page_width, page_height in self.preview.page_sizes]
+            layout.page_heights = [layout.scale_factor * page_height for page_width, page_height in self.preview.page_sizes]
+            layout.page_offsets = list(itertools.accumulate((page_height + layout.page_gap for page_height in layout.page_heights[:-1]), initial=0))
+            layout.max_page_width = max(layout.page_widths)
             layout.border_width = 1
-            layout.canvas_width = layout.page_width + 2 * layout.get_horizontal_margin(window_width)
-            layout.canvas_height = self.preview.poppler_document.get_n_pages() * (layout.page_height + layout.page_gap) - layout.page_gap
+            layout.canvas_width = max(layout.max_page_width, window_width)
+            layout.canvas_height = layout.page_offsets[-1] + layout.page_heights[-1]
             self.update_synctex_rectangles(layout)
             return layout
         else:
@@ -58,11 +65,19 @@ class PreviewLayouter(Observable):
 
 
 class PreviewLayout(object):
+    ''' Pages can differ in size, page_offsets holds the top of each page
+        so the page at an offset is found by binary search. page_width and
+        page_height are those of the first page, zoom levels and tiles
+        refer to it. '''
 
     def __init__(self, hidpi_factor):
         self.hidpi_factor = hidpi_factor
         self.page_width = None
         self.page_height = None
+        self.page_widths = list()
+        self.page_heights = list()
+        self.page_offsets = list()
+        self.max_page_width = None
         self.page_gap = None
         self.border_width = None
         self.canvas_width = None
@@ -70,20 +85,27 @@ class PreviewLayout(object):
         self.scale_factor = None
         self.visible_synctex_rectangles = dict()
 
-    def get_horizontal_margin(self, window_width):
-        return int(max((window_width - self.page_width) / 2, 0))
+    def get_horizontal_margin(self, window_width, page_number):
+        ''' Pages are centered on the widest page, or on the window if it's wider. '''
+
+        return int(max((max(window_width, self.max_page_width) - self.page_widths[page_number]) / 2, 0))
 
     def get_page_number_and_offsets_by_document_offsets(self, x, y, window_width):
-        if y % (self.page_height + self.page_gap) > self.page_height: return None
-        if x < self.get_horizontal_margin(window_width) or x > (self.get_horizontal_margin(window_width) + self.page_width): return None
+        page_number = self.get_page_by_offset(y) - 1
+        y_offset = y - self.page_offsets[page_number]
+        if y_offset < 0 or y_offset > self.page_heights[page_number]: return None
 
-        page_number = int(y // (self.page_height + self.page_gap))
-        y_offset = y % (self.page_height + self.page_gap) / self.scale_factor
-        x_offset = (x - self.get_horizontal_margin(window_width)) / self.scale_factor
+        margin = self.get_horizontal_margin(window_width, page_number)
+        if x < margin or x > (margin + self.page_widths[page_number]): return None
 
-        return (page_number, x_offset, y_offset)
+        return (page_number, (x - margin) / self.scale_factor, y_offset / self.scale_factor)
 
     def get_page_by_offset(self, offset):
-        return int(1 + offset // (self.page_height + self.page_gap))
+        ''' Number of the page at the offset, starting at 1. '''
+
+        return min(max(bisect.bisect_right(self.page_offsets, offset), 1), len(self.page_offsets))
+
+    def get_page_offset(self, page_number):
+        return self.page_offsets[page_number]
 
 
@@ -18,44 +18,100 @@
 import gi
 gi.require_version('Poppler', '0.18')
 from gi.repository import Poppler
+from gi.repository import GLib
+
+import _thread as thread
 
 from setzer.helpers.observable import Observable
 from setzer.helpers.timer import timer
 
 
 class PreviewLinksParser(Observable):
+    ''' After each load the links of all pages are read in a thread, with
+        its own Poppler document, named destinations are resolved there
+        once. Pages asked for before that are read on the spot. '''
 
     def __init__(self, preview):
         Observable.__init__(self)
         self.preview = preview
         self.links = dict()
+        self.parse_count = 0
 
         self.preview.connect('pdf_changed', self.on_pdf_changed)
 
     def on_pdf_changed(self, notifying_object):
+        self.links = dict()
+        self.parse_count += 1
         if self.preview.poppler_document != None:
-            self.links = dict()
-            for page_num in range(self.preview.poppler_document.get_n_pages()):
-                self.links[page_num] = None
-        else:
-            self.links = dict()
-
-    def get_links_for_page(self, page_number):
-        if page_number in self.links:
-            if self.links[page_number] == None:
-                links = list()
-                link_mapping_list = self.preview.poppler_document.get_page(page_number).get_link_mapping()
-                for link_mapping in link_mapping_list:
-                    action = link_mapping.action
-                    area = link_mapping.area
-                    if action.type == Poppler.ActionType.URI:
-                        links.append([area, action.uri.uri, 'uri'])
-                    elif action.type == Poppler.ActionType.GOTO_DEST:
-                        dest = self.preview.poppler_document.find_dest(action.goto_dest.dest.named_dest)
-                        links.append([area, dest, 'goto'])
-                self.links[page_number] = links
-            return self.links[page_number]
-        else:
-            return list()
+            thread.start_new_thread(self.parse_links_in_thread, (self.preview.pdf_filename, self.parse_count))
+
+    def parse_links_in_thread(self, pdf_filename, parse_count):
+        try:
+            poppler_document = Poppler.Document.new_from_file(GLib.filename_to_uri(pdf_filename))
+            destinations = dict()
+            links = dict()
+            for page_number in range(poppler_document.get_n_pages()):
+                links[page_number] = self.parse_page(poppler_document, page_number, destinations)
+        except Exception:
+            return
+        GLib.idle_add(self.on_links_parsed, links, parse_count)
+
+    def on_links_parsed(self, links, parse_count):
+        if parse_count == self.parse_count and len(links) == self.preview.poppler_document.get_n_pages():
+            self.links = links
+        return False
+
+    def get_link_at(self, page_number, x, y):
+        ''' The link at the point (x, y) of the page, in pdf coordinates, or None. '''
+
+        if self.preview.poppler_document == None: return None
+        if page_number < 0 or page_number >= self.preview.poppler_document.get_n_pages(): return None
+
+        if page_number not in self.links:
+            self.links[page_number] = self.parse_page(self.preview.poppler_document, page_number, dict())
+        return self.links[page_number].get_link_at(x, y)
+
+    def parse_page(self, poppler_document, page_number, destinations):
+        page_links = PageLinks()
+        for link_mapping in poppler_document.get_page(page_number).get_link_mapping():
+            action = link_mapping.action
+            area = link_mapping.area
+            rectangle = (min(area.x1, area.x2), min(area.y1, area.y2), max(area.x1, area.x2), max(area.y1, area.y2))
+            if action.type == Poppler.ActionType.URI:
+                page_links.add_link([rectangle, action.uri.uri, 'uri'])
+            elif action.type == Poppler.ActionType.GOTO_DEST:
+                dest = action.goto_dest.dest
+                if dest.type == Poppler.DestType.NAMED:
+                    if dest.named_dest not in destinations:
+                        destinations[dest.named_dest] = poppler_document.find_dest(dest.named_dest)
+                    dest = destinations[dest.named_dest]
+                else:
+                    dest = dest.copy()
+                if dest != None:
+                    page_links.add_link([rectangle, dest, 'goto'])
+        return page_links
+
+
+class PageLinks(object):
+    ''' The links of a page in a grid of square cells, a point is only
+        tested against the links that overlap its cell. '''
+
+    def __init__(self, cell_size=32):
+        self.cell_size = cell_size
+        self.cells = dict()
+
+    def add_link(self, link):
+        x1, y1, x2, y2 = link[0]
+        for column in range(int(x1 // self.cell_size), int(x2 // self.cell_size) + 1):
+            for row in range(int(y1 // self.cell_size), int(y2 // self.cell_size) + 1):
+                if (column, row) not in self.cells:
+                    self.cells[(column, row)] = list()
+                self.cells[(column, row)].append(link)
+
+    def get_link_at(self, x, y):
+        for link in self.cells.get((int(x // self.cell_size), int(y // self.cell_size)), list()):
+            x1, y1, x2, y2 = link[0]
+            if x > x1 and x < x2 and y > y1 and y < y2: return link
+        return None
 
 
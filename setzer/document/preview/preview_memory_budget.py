@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import weakref
+
+
+class PreviewMemoryBudget(object):
+    ''' One limit for the rendered tiles of all previews. Renderers keep
+        their tiles (also when their document isn't active) until all of
+        them together take more than the budget, then pages go in least
+        recently used order, across documents. Visible pages stay. '''
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.renderers = weakref.WeakSet()
+
+        self.settings.connect('settings_changed', self.on_settings_changed)
+
+    def on_settings_changed(self, settings, parameter):
+        section, item, value = parameter
+
+        if item == 'preview_memory_budget':
+            self.enforce()
+
+    def add_renderer(self, renderer):
+        self.renderers.add(renderer)
+
+    def get_budget(self):
+        return self.settings.get_value('preferences', 'preview_memory_budget') * 1024 * 1024
+
+    def enforce(self):
+        pages = list()
+        total_size = 0
+        for renderer in list(self.renderers):
+            for page_number, tiles in renderer.rendered_tiles.items():
+                size = sum(item[0].get_stride() * item[0].get_height() for item in tiles.values())
+                pages.append((renderer.get_page_last_used(page_number), renderer, page_number, size))
+                total_size += size
+
+        budget = self.get_budget()
+        if total_size <= budget: return
+
+        pages.sort(key=lambda page: page[0])
+        for last_used, renderer, page_number, size in pages:
+            if total_size <= budget: return
+            if renderer.is_page_visible(page_number): continue
+
+            renderer.remove_page(page_number)
+            total_size -= size
+
+
@@ -17,31 +17,70 @@
 
 import gi
 gi.require_version('Gtk', '4.0')
-from gi.repository import GObject, Gdk
-import cairo
+from gi.repository import GLib
 
 import _thread as thread, queue
+import heapq
 import time
 import math
-import numpy as np
-from PIL import Image, ImageFilter
 
+import setzer.document.preview.preview_render_pool as preview_render_pool
 from setzer.app.color_manager import ColorManager
+from setzer.app.service_locator import ServiceLocator
 from setzer.helpers.observable import Observable
 
 
 class PreviewPageRenderer(Observable):
+    ''' Renders pages in square tiles, only those close to the viewport.
+        Tiles are keyed by page number, then by (page width, column, row),
+        so tiles of the previous zoom level can be drawn until the new
+        ones are there. Visible pages without any tiles first get a quick
+        render at a fraction of the width, drawn scaled up the same way.
+
+        After a build, tiles of the old pdf file stay on screen until new
+        ones replace them. A page is only rendered again once the
+        fingerprints of the page in both files differ, otherwise its tiles
+        carry over to the new file.
+
+        Tiles are rendered closest to the middle of the view first, while
+        scrolling those ahead of the view count as closer and the pages
+        rendered in advance shift in the direction of scrolling. Each
+        update replaces the whole queue, tasks that were superseded in
+        the meantime never start.
+
+        Tiles of pages out of view are kept, also while the document isn't
+        active, the memory budget shared by all previews decides which
+        pages go. '''
 
     def __init__(self, preview):
         Observable.__init__(self)
         self.preview = preview
         self.maximum_rendered_pixels = 20000000
+        self.render_pool = ServiceLocator.get_render_pool()
+        self.render_scheduler = ServiceLocator.get_render_scheduler()
+        self.tile_cache = ServiceLocator.get_tile_cache()
+        self.memory_budget = ServiceLocator.get_memory_budget()
+        self.memory_budget.add_renderer(self)
+        self.tile_size = self.render_pool.tile_size
+        self.low_resolution_factor = 4
+        # scrolling speed, in pixels per second, at which tiles ahead of
+        # the view count as being at a quarter of their distance.
+        self.full_prefetch_velocity = 3000
 
         self.visible_pages_lock = thread.allocate_lock()
         self.visible_pages = list()
+        self.visible_pages_additional = [0, -1]
+        self.wanted_tiles = dict()
+        self.wanted_low_resolution_tiles = dict()
         self.page_width = None
         self.pdf_date = None
-        self.rendered_pages = dict()
+        self.colors_key = None
+        self.rendered_tiles = dict()
+        self.page_last_used = dict()
+        self.pages_to_verify = dict()
+        self.page_fingerprints = dict()
+        self.queued_fingerprints = set()
+        self.poppler_documents = dict()
         self.is_active_lock = thread.allocate_lock()
         self.is_active = False
 
@@ -50,19 +89,20 @@ class PreviewPageRenderer(Observable):
         self.preview.connect('recolor_pdf_changed', self.on_recolor_pdf_changed)
         self.preview.document.settings.connect('settings_changed', self.on_settings_changed)
 
-        self.page_render_count_lock = thread.allocate_lock()
-        self.page_render_count = dict()
-        self.render_queue = queue.Queue()
-        self.render_queue_low_priority = queue.Queue()
+        self.render_queue = list()
+        self.rendering_tiles = dict()
+        self.fingerprint_queue = queue.Queue()
         self.rendered_pages_queue = queue.Queue()
-        thread.start_new_thread(self.render_page_loop, ())
-        GObject.timeout_add(50, self.rendered_pages_loop)
+        self.rendered_pages_lock = thread.allocate_lock()
+        self.rendered_pages_idle_added = False
+        self.render_scheduler.add_renderer(self)
 
     def on_layout_or_position_changed(self, notifying_object):
         if self.preview.layout != None:
             self.update_rendered_pages()
         else:
-            self.rendered_pages = dict()
+            self.rendered_tiles = dict()
+            self.pages_to_verify = dict()
 
     def on_recolor_pdf_changed(self, preview):
         self.update_rendered_pages()
@@ -74,112 +114,309 @@ class PreviewPageRenderer(Observable):
             self.update_rendered_pages()
 
     def activate(self):
+        self.render_pool.start()
         with self.is_active_lock:
             self.is_active = True
         self.update_rendered_pages()
+        self.render_scheduler.notify()
 
     def deactivate(self):
         with self.is_active_lock:
             self.is_active = False
-        self.rendered_pages = dict()
         with self.visible_pages_lock:
             self.visible_pages = list()
+            self.wanted_tiles = dict()
+            self.wanted_low_resolution_tiles = dict()
+            self.render_queue = list()
         self.page_width = None
         self.pdf_date = None
 
-    def render_page_loop(self):
-        while True:
-            with self.is_active_lock:
-                is_active = self.is_active
-            todo = None
-            if is_active:
-                try: todo = self.render_queue.get(block=False)
-                except queue.Empty:
-                    try: todo = self.render_queue_low_priority.get(block=False)
-                    except queue.Empty:
-                        todo = None
-            if todo != None:
-                with self.page_render_count_lock:
-                    render_count = self.page_render_count[todo['page_number']]
-                with self.visible_pages_lock:
-                    is_visible = (todo['page_number'] >= self.visible_pages_additional[0] and todo['page_number'] <= self.visible_pages_additional[1])
-                if todo['render_count'] == render_count and is_visible:
-                    colors = todo['matching_theme_colors']
-                    width = todo['page_width'] * todo['hidpi_factor']
-                    height = todo['page_height'] * 2
-                    surface = cairo.ImageSurface(cairo.Format.ARGB32, width, height)
-                    ctx = cairo.Context(surface)
-
-                    ctx.set_source_rgba(1, 1, 1, 1)
-                    ctx.rectangle(0, 0, width, height)
-                    ctx.fill()
-
-                    ctx.scale(todo['scale_factor'] * todo['hidpi_factor'], todo['scale_factor'] * todo['hidpi_factor'])
-                    page = self.preview.poppler_document.get_page(todo['page_number'])
-                    page.render(ctx)
-
-                    if colors != None:
-                        pil_img = Image.frombuffer("RGBA", (width, height), surface.get_data(), "raw", "RGBA", 0, 1)
-
-                        img_data = np.array(pil_img, dtype=np.ubyte)
-                        alpha = 255 - 0.3 * img_data[..., 0] - 0.6 * img_data[..., 1] - 0.1 * img_data[..., 2]
-                        img_data[:,:,-1] = alpha
-                        pil_img = Image.fromarray(np.ubyte(img_data))
-
-                        im_bytes = bytearray(pil_img.tobytes('raw', 'BGRa'))
-                        surface = cairo.ImageSurface.create_for_data(im_bytes, cairo.FORMAT_ARGB32, width, height)
-                        temp_ctx = cairo.Context(surface)
-
-                        Gdk.cairo_set_source_rgba(temp_ctx, colors[0])
-                        temp_ctx.set_operator(cairo.Operator.IN)
-                        temp_ctx.rectangle(0, 0, width, height)
-                        temp_ctx.fill()
-
-                    self.rendered_pages_queue.put({'page_number': todo['page_number'], 'item': [surface, todo['page_width'], todo['pdf_date'], colors]})
-            else:
-                time.sleep(0.05)
+    def get_next_task(self, has_free_slot):
+        ''' Called by the render scheduler, returns the most urgent task as
+            (function, todo), or None. '''
 
-    def rendered_pages_loop(self):
         with self.is_active_lock:
-            is_active = self.is_active
-        if not is_active: return True
+            if not self.is_active: return None
 
-        changed = False
+        try: return (self.compute_page_fingerprint, self.fingerprint_queue.get(block=False))
+        except queue.Empty: pass
+        if not has_free_slot: return None
+
+        with self.visible_pages_lock:
+            if len(self.render_queue) == 0: return None
+            todo = heapq.heappop(self.render_queue)[2]
+            self.rendering_tiles[todo['page_number'], todo['tile_key']] = (todo['pdf_date'], self.get_colors_key(todo['matching_theme_colors']))
+        return (self.render_tile, todo)
+
+    def has_queued_tasks(self):
+        ''' Whether get_next_task would return something once a slot is free. '''
+
+        with self.is_active_lock:
+            if not self.is_active: return False
+
+        if not self.fingerprint_queue.empty(): return True
+        with self.visible_pages_lock:
+            return len(self.render_queue) > 0
+
+    def render_tile(self, todo):
+        todo['cache_key'] = self.tile_cache.get_cache_key(todo['pdf_hash'], todo['page_number'], todo['tile_key'], todo['device_width'], todo['device_height'], todo['hidpi_factor'], self.get_colors_key(todo['matching_theme_colors']))
+        surface = self.tile_cache.load(todo['cache_key'])
+        if surface != None:
+            self.add_rendered_tile(todo, surface)
+        elif self.render_pool.is_available:
+            self.render_scheduler.render(todo, self.on_tile_rendered)
+        else:
+            todo['fg_color'] = preview_render_pool.get_rgba_tuple(todo['matching_theme_colors'])
+            try:
+                poppler_document = preview_render_pool.get_poppler_document(self.poppler_documents, todo['pdf_filename'], todo['pdf_date'])
+                surface = preview_render_pool.render_tile(poppler_document.get_page(todo['page_number']), todo, self.tile_size)
+            except Exception:
+                surface = None
+            self.on_tile_rendered(todo, surface)
+
+    def compute_page_fingerprint(self, todo):
+        ''' Uses its own Poppler document, the preview's one belongs to the
+            main thread. Runs in the scheduler thread, like render_tile(). '''
+
+        try:
+            poppler_document = preview_render_pool.get_poppler_document(self.poppler_documents, todo['pdf_filename'], todo['pdf_date'])
+            fingerprint = preview_render_pool.get_page_fingerprint(poppler_document.get_page(todo['page_number']))
+        except Exception:
+            fingerprint = None
+        self.deliver({'page_number': todo['page_number'], 'pdf_date': todo['pdf_date'], 'fingerprint': fingerprint})
+
+    def on_tile_rendered(self, todo, surface):
+        if surface == None:
+            self.deliver({'page_number': todo['page_number'], 'tile_key': todo['tile_key'], 'item': None})
+            return
+
+        self.tile_cache.save(todo['cache_key'], surface)
+        self.add_rendered_tile(todo, surface)
+
+    def add_rendered_tile(self, todo, surface):
+        self.deliver({'page_number': todo['page_number'], 'tile_key': todo['tile_key'], 'item': [surface, todo['page_width'], todo['pdf_date'], todo['matching_theme_colors']]})
+
+    def deliver(self, result):
+        ''' Hands a result to the main thread, results that arrive
+            together are handled in one idle callback. '''
+
+        self.rendered_pages_queue.put(result)
+        with self.rendered_pages_lock:
+            if self.rendered_pages_idle_added: return
+            self.rendered_pages_idle_added = True
+        GLib.idle_add(self.rendered_pages_loop)
+
+    def rendered_pages_loop(self):
+        with self.rendered_pages_lock:
+            self.rendered_pages_idle_added = False
+
+        changed_pages = set()
+        checked_pages = set()
         while self.rendered_pages_queue.empty() == False:
             try: todo = self.rendered_pages_queue.get(block=False)
             except queue.Empty: pass
             else:
-                try:
-                    del(self.rendered_pages[todo['page_number']])
-                except KeyError: pass
-                self.rendered_pages[todo['page_number']] = todo['item']
-                changed = True
-        if changed:
+                if 'fingerprint' in todo:
+                    if self.add_page_fingerprint(todo['page_number'], todo['pdf_date'], todo['fingerprint']):
+                        changed_pages.add(todo['page_number'])
+                    checked_pages.add(todo['page_number'])
+                    continue
+
+                with self.visible_pages_lock:
+                    self.rendering_tiles.pop((todo['page_number'], todo['tile_key']), None)
+                if todo['item'] == None: continue
+                if todo['item'][2] != self.pdf_date: continue
+                if self.get_colors_key(todo['item'][3]) != self.colors_key: continue
+
+                if todo['page_number'] not in self.rendered_tiles:
+                    self.rendered_tiles[todo['page_number']] = dict()
+                self.rendered_tiles[todo['page_number']][todo['tile_key']] = todo['item']
+                changed_pages.add(todo['page_number'])
+                if self.page_fingerprints.get(todo['page_number'], (None, None))[0] != self.pdf_date:
+                    self.queue_fingerprint(todo['page_number'], self.pdf_date)
+
+        for page_number in changed_pages:
+            self.page_last_used[page_number] = time.time()
+            self.remove_replaced_tiles(page_number)
+        if len(changed_pages) > 0:
+            self.memory_budget.enforce()
+        if len(checked_pages) > 0:
+            self.update_rendered_pages()
+        if len(changed_pages) > 0:
             self.add_change_code('rendered_pages_changed')
+        return False
+
+    def add_page_fingerprint(self, page_number, pdf_date, fingerprint):
+        ''' Returns True if stale tiles of the page are valid again. '''
+
+        self.queued_fingerprints.discard((page_number, pdf_date))
+        if pdf_date != self.pdf_date: return False
+        if fingerprint != None:
+            self.page_fingerprints[page_number] = (pdf_date, fingerprint)
+
+        if page_number not in self.pages_to_verify: return False
+        old_pdf_date, old_fingerprint = self.pages_to_verify.pop(page_number)
+        if fingerprint == None or fingerprint != old_fingerprint: return False
+
+        for item in self.rendered_tiles.get(page_number, dict()).values():
+            if item[2] == old_pdf_date:
+                item[2] = pdf_date
+        return True
+
+    def verify_stale_tiles(self, page_number, old_pdf_date, pdf_date):
+        ''' Compares the page in both files, if we know what it looked like. '''
+
+        if page_number in self.pages_to_verify:
+            self.queue_fingerprint(page_number, pdf_date)
+            return
+
+        fingerprint_date, fingerprint = self.page_fingerprints.get(page_number, (None, None))
+        if fingerprint_date != old_pdf_date: return
+
+        self.pages_to_verify[page_number] = (old_pdf_date, fingerprint)
+        self.queue_fingerprint(page_number, pdf_date)
+
+    def queue_fingerprint(self, page_number, pdf_date):
+        if (page_number, pdf_date) in self.queued_fingerprints: return
+
+        self.queued_fingerprints.add((page_number, pdf_date))
+        self.fingerprint_queue.put({'pdf_filename': self.preview.pdf_filename, 'page_number': page_number, 'pdf_date': pdf_date})
+        self.render_scheduler.notify()
+
+    def remove_replaced_tiles(self, page_number):
+        ''' Tiles of another zoom level or of the old pdf file are kept as
+            long as the current ones don't cover all visible tiles of the
+            page. '''
+
+        tiles = self.rendered_tiles[page_number]
+        with self.visible_pages_lock:
+            wanted_tiles = self.wanted_tiles.get(page_number, set())
+        if not all(self.has_tile(page_number, tile_key) for tile_key in wanted_tiles): return
+
+        for tile_key in list(tiles):
+            if tile_key[0] != self.page_width or tiles[tile_key][2] != self.pdf_date:
+                del(tiles[tile_key])
+
+    def get_page_last_used(self, page_number):
+        return self.page_last_used.get(page_number, 0)
+
+    def is_page_visible(self, page_number):
+        with self.visible_pages_lock:
+            visible_pages = self.visible_pages
+        if len(visible_pages) == 0: return False
+
+        return page_number >= visible_pages[0] and page_number <= visible_pages[1]
+
+    def remove_page(self, page_number):
+        if page_number not in self.rendered_tiles: return
+
+        del(self.rendered_tiles[page_number])
+        self.page_last_used.pop(page_number, None)
+        self.pages_to_verify.pop(page_number, None)
+        self.add_change_code('rendered_pages_changed')
+
+    def has_tile(self, page_number, tile_key):
+        ''' True if the tile is there and up to date. '''
+
+        item = self.rendered_tiles.get(page_number, dict()).get(tile_key)
+        return item != None and item[2] == self.pdf_date
+
+    def has_visible_tiles(self):
+        ''' True if something of the current pdf file is on screen. '''
+
+        pdf_date = self.preview.get_pdf_date()
+        with self.visible_pages_lock:
+            visible_pages = self.visible_pages
+        if len(visible_pages) == 0: return False
+
+        for page_number in range(visible_pages[0], visible_pages[1] + 1):
+            for item in self.rendered_tiles.get(page_number, dict()).values():
+                if item[2] == pdf_date: return True
+        return False
+
+    def is_visible_area_sharp(self):
+        ''' True if all visible tiles are there at the current zoom level. '''
+
+        with self.visible_pages_lock:
+            visible_pages = self.visible_pages
+            wanted_tiles = self.wanted_tiles
+        if len(visible_pages) == 0: return False
+
+        for page_number in range(visible_pages[0], visible_pages[1] + 1):
+            if not all(self.has_tile(page_number, tile_key) for tile_key in wanted_tiles.get(page_number, set())): return False
         return True
 
+    def get_colors_key(self, colors):
+        if colors == None: return None
+        return (colors[0].to_string(), colors[1].to_string())
+
+    def get_device_size(self, layout, page_number, scale=1):
+        return (math.ceil(layout.page_widths[page_number] * scale * layout.hidpi_factor), math.ceil(layout.page_heights[page_number] * scale * layout.hidpi_factor))
+
+    def get_tile_range(self, x0, y0, x1, y1, device_width, device_height):
+        columns = range(max(int(x0 // self.tile_size), 0), min(math.ceil(x1 / self.tile_size), math.ceil(device_width / self.tile_size)))
+        rows = range(max(int(y0 // self.tile_size), 0), min(math.ceil(y1 / self.tile_size), math.ceil(device_height / self.tile_size)))
+        return [(column, row) for column in columns for row in rows]
+
     def update_rendered_pages(self):
         with self.is_active_lock:
             is_active = self.is_active
         if not is_active: return
         if self.preview.layout == None: return
 
-        hidpi_factor = self.preview.layout.hidpi_factor
-        page_width = int(self.preview.layout.page_width)
-        page_height = int(self.preview.layout.page_height)
-
-        offset = self.preview.view.content.scrolling_offset_y
-        current_page = self.preview.layout.get_page_by_offset(offset) - 1
-
-        visible_pages = [current_page, min(current_page + math.floor(self.preview.view.get_allocated_height() / page_height) + 1, self.preview.poppler_document.get_n_pages() - 1)]
+        layout = self.preview.layout
+        hidpi_factor = layout.hidpi_factor
+        page_width = int(layout.page_width)
+        device_width = math.ceil(layout.page_width * hidpi_factor)
+        device_height = math.ceil(layout.page_height * hidpi_factor)
+        n_pages = len(layout.page_offsets)
+
+        content = self.preview.view.content
+        offset = content.scrolling_offset_y
+        visible_pages = [layout.get_page_by_offset(offset) - 1, layout.get_page_by_offset(offset + self.preview.view.get_allocated_height()) - 1]
+
+        # the visible part of a page, in device pixels, plus a margin of one tile
+        def get_x_range(page_number):
+            x0 = (content.scrolling_offset_x - layout.get_horizontal_margin(content.width, page_number)) * hidpi_factor - self.tile_size
+            return (x0, x0 + content.width * hidpi_factor + 2 * self.tile_size)
+
+        # the number of pages rendered in advance is estimated with the size of the first page
+        band_width = min(content.width * hidpi_factor + 2 * self.tile_size, device_width)
+
+        # while scrolling, up to 80% of the pages rendered in advance lie ahead
+        velocity = content.get_velocity_y()
+        prefetch_weight = min(abs(velocity) / self.full_prefetch_velocity, 1)
+        max_additional_pages = max(math.floor(self.maximum_rendered_pixels / (band_width * device_height) - visible_pages[1] + visible_pages[0]), 0)
+        pages_ahead = int(max_additional_pages * (0.5 + 0.3 * prefetch_weight))
+        pages_behind = max_additional_pages - pages_ahead
+        if velocity < 0:
+            pages_ahead, pages_behind = pages_behind, pages_ahead
+        visible_pages_additional = [max(visible_pages[0] - pages_behind, 0), min(visible_pages[1] + pages_ahead, n_pages - 1)]
+
+        wanted_tiles = dict()
+        visible_tiles = set()
+        for page_number in range(visible_pages_additional[0], visible_pages_additional[1] + 1):
+            page_device_width, page_device_height = self.get_device_size(layout, page_number)
+            x0, x1 = get_x_range(page_number)
+            if page_number >= visible_pages[0] and page_number <= visible_pages[1]:
+                page_offset = (offset - layout.get_page_offset(page_number)) * hidpi_factor
+                y0 = page_offset - self.tile_size
+                y1 = page_offset + content.height * hidpi_factor + self.tile_size
+            else:
+                y0, y1 = 0, page_device_height
+            tiles = self.get_tile_range(x0, y0, x1, y1, page_device_width, page_device_height)
+            wanted_tiles[page_number] = set((page_width, column, row) for column, row in tiles)
+            if page_number >= visible_pages[0] and page_number <= visible_pages[1]:
+                visible_tiles |= set((page_number, tile_key) for tile_key in wanted_tiles[page_number])
 
-        max_additional_pages = max(math.floor(self.maximum_rendered_pixels / (page_width * page_height * hidpi_factor * hidpi_factor) - visible_pages[1] + visible_pages[0]), 0)
-        visible_pages_additional = [max(int(visible_pages[0] - max_additional_pages / 2), 0), min(int(visible_pages[1] + max_additional_pages / 2), self.preview.poppler_document.get_n_pages() - 1)]
+        for page_number in range(visible_pages[0], visible_pages[1] + 1):
+            self.page_last_used[page_number] = time.time()
 
         pdf_date = self.preview.get_pdf_date()
         with self.visible_pages_lock:
             self.visible_pages = visible_pages
             self.visible_pages_additional = visible_pages_additional
+            self.wanted_tiles = wanted_tiles
         self.page_width = page_width
         self.pdf_date = pdf_date
 
@@ -187,51 +424,107 @@ class PreviewPageRenderer(Observable):
             colors = (ColorManager.get_ui_color('view_fg_color'), ColorManager.get_ui_color('view_bg_color'))
         else:
             colors = None
+        colors_key = self.get_colors_key(colors)
+        self.colors_key = colors_key
 
         changed = False
-        for page_number in list(self.rendered_pages):
-            if self.rendered_pages[page_number][3] == None and colors == None:
-                colors_changed = False
-            elif self.rendered_pages[page_number][3] == None and colors != None:
-                colors_changed = True
-            elif self.rendered_pages[page_number][3] != None and colors == None:
-                colors_changed = True
-            elif not self.rendered_pages[page_number][3][0].equal(colors[0]):
-                colors_changed = True
-            elif not self.rendered_pages[page_number][3][1].equal(colors[1]):
-                colors_changed = True
-            else:
-                colors_changed = False
-
-            if self.rendered_pages[page_number][2] != pdf_date or colors_changed or page_number < visible_pages_additional[0] or page_number > visible_pages_additional[1]:
-                del(self.rendered_pages[page_number])
-                changed = True
+        for page_number in list(self.rendered_tiles):
+            tiles = self.rendered_tiles[page_number]
+            stale_pdf_dates = set()
+            for tile_key in list(tiles):
+                item = tiles[tile_key]
+                colors_changed = (self.get_colors_key(item[3]) != colors_key)
+
+                # tiles of the current zoom level stay until the memory
+                # budget needs the space, those of the old pdf file only
+                # close to the view.
+                if tile_key[0] != page_width:
+                    is_wanted = (page_number >= visible_pages[0] and page_number <= visible_pages[1])
+                elif item[2] != pdf_date:
+                    is_wanted = (tile_key in wanted_tiles.get(page_number, set()))
+                else:
+                    is_wanted = True
+                if colors_changed or not is_wanted:
+                    del(tiles[tile_key])
+                    changed = True
+                elif item[2] != pdf_date:
+                    stale_pdf_dates.add(item[2])
+            for old_pdf_date in stale_pdf_dates:
+                self.verify_stale_tiles(page_number, old_pdf_date, pdf_date)
+            if len(tiles) == 0:
+                del(self.rendered_tiles[page_number])
+
+        for page_number in list(self.pages_to_verify):
+            if page_number not in self.rendered_tiles:
+                del(self.pages_to_verify[page_number])
         if changed:
             self.add_change_code('rendered_pages_changed')
 
-        scale_factor = self.preview.layout.scale_factor
-
-        for page_number in range(0, self.preview.poppler_document.get_n_pages()):
-            if page_number not in self.rendered_pages or self.rendered_pages[page_number][1] != page_width or self.rendered_pages[page_number][2] != pdf_date:
-                with self.page_render_count_lock:
-                    try:
-                        self.page_render_count[page_number] += 1
-                    except KeyError:
-                        self.page_render_count[page_number] = 1
-
-                    render_task = dict()
-                    render_task['page_number'] = page_number
-                    render_task['render_count'] = self.page_render_count[page_number]
-                    render_task['scale_factor'] = scale_factor
-                    render_task['hidpi_factor'] = hidpi_factor
-                    render_task['page_width'] = page_width
-                    render_task['page_height'] = page_height
-                    render_task['pdf_date'] = pdf_date
-                    render_task['matching_theme_colors'] = colors
-
-                    if visible_pages != None and page_number >= visible_pages[0] and page_number <= visible_pages[1]:
-                        self.render_queue.put(render_task)
-                    elif page_number >= visible_pages_additional[0] and page_number <= visible_pages_additional[1]:
-                        self.render_queue_low_priority.put(render_task)
+        scale_factor = layout.scale_factor
+
+        # blank visible pages are rendered whole at low resolution first
+        low_resolution_page_width = max(page_width // self.low_resolution_factor, 1)
+        low_resolution_scale = low_resolution_page_width / layout.page_width
+        wanted_low_resolution_tiles = dict()
+        for page_number in range(visible_pages[0], visible_pages[1] + 1):
+            if page_number in self.rendered_tiles: continue
+            low_resolution_device_width, low_resolution_device_height = self.get_device_size(layout, page_number, low_resolution_scale)
+            tiles = self.get_tile_range(0, 0, low_resolution_device_width, low_resolution_device_height, low_resolution_device_width, low_resolution_device_height)
+            wanted_low_resolution_tiles[page_number] = set((low_resolution_page_width, column, row) for column, row in tiles)
+        with self.visible_pages_lock:
+            self.wanted_low_resolution_tiles = wanted_low_resolution_tiles
+
+        # distances in device pixels from the middle of the view
+        center_y = (offset + content.height / 2) * hidpi_factor
+        def get_distance(page_number, tile_key, tile_size):
+            distance_x = abs((tile_key[1] + 0.5) * tile_size - sum(get_x_range(page_number)) / 2)
+            distance_y = layout.get_page_offset(page_number) * hidpi_factor + (tile_key[2] + 0.5) * tile_size - center_y
+            if distance_y * velocity > 0:
+                distance_y *= 1 / (1 + 3 * prefetch_weight)
+            else:
+                distance_y *= 1 + 3 * prefetch_weight
+            return distance_x + abs(distance_y)
+
+        with self.visible_pages_lock:
+            rendering_tiles = dict(self.rendering_tiles)
+
+        render_queue = list()
+        for page_number, tile_keys in wanted_low_resolution_tiles.items():
+            low_resolution_device_width, low_resolution_device_height = self.get_device_size(layout, page_number, low_resolution_scale)
+            for tile_key in tile_keys:
+                if rendering_tiles.get((page_number, tile_key)) == (pdf_date, colors_key): continue
+
+                priority = (0, get_distance(page_number, tile_key, self.tile_size * self.low_resolution_factor))
+                render_queue.append((priority, len(render_queue), self.get_render_task(page_number, tile_key, scale_factor * low_resolution_scale, hidpi_factor, low_resolution_device_width, low_resolution_device_height, pdf_date, colors)))
+
+        for page_number, tile_keys in wanted_tiles.items():
+            if page_number in self.pages_to_verify: continue
+            page_device_width, page_device_height = self.get_device_size(layout, page_number)
+            for tile_key in tile_keys:
+                if self.has_tile(page_number, tile_key): continue
+                if rendering_tiles.get((page_number, tile_key)) == (pdf_date, colors_key): continue
+
+                priority = (1 if (page_number, tile_key) in visible_tiles else 2, get_distance(page_number, tile_key, self.tile_size))
+                render_queue.append((priority, len(render_queue), self.get_render_task(page_number, tile_key, scale_factor, hidpi_factor, page_device_width, page_device_height, pdf_date, colors)))
+
+        heapq.heapify(render_queue)
+        with self.visible_pages_lock:
+            self.render_queue = render_queue
+        self.render_scheduler.notify()
+
+    def get_render_task(self, page_number, tile_key, scale_factor, hidpi_factor, device_width, device_height, pdf_date, colors):
+        render_task = dict()
+        render_task['pdf_filename'] = self.preview.pdf_filename
+        render_task['pdf_hash'] = self.preview.pdf_hash
+        render_task['page_number'] = page_number
+        render_task['tile_key'] = tile_key
+        render_task['scale_factor'] = scale_factor
+        render_task['hidpi_factor'] = hidpi_factor
+        render_task['page_width'] = tile_key[0]
+        render_task['device_width'] = device_width
+        render_task['device_height'] = device_height
+        render_task['pdf_date'] = pdf_date
+        render_task['matching_theme_colors'] = colors
+        return render_task
 
 
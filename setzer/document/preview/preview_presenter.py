@@ -43,6 +43,8 @@ class PreviewPresenter(object):
         self.preview.connect('pdf_changed', self.on_pdf_changed)
         self.preview.connect('layout_changed', self.on_layout_changed)
         self.page_renderer.connect('rendered_pages_changed', self.on_rendered_pages_changed)
+        self.preview.search.connect('search_results_changed', self.on_search_results_changed)
+        self.preview.thumbnails.connect('thumbnail_rendered', self.on_thumbnail_rendered)
 
         self.show_blank_slate()
 
@@ -61,6 +63,12 @@ class PreviewPresenter(object):
     def on_rendered_pages_changed(self, page_renderer):
         self.view.drawing_area.queue_draw()
 
+    def on_search_results_changed(self, search):
+        self.view.drawing_area.queue_draw()
+
+    def on_thumbnail_rendered(self, thumbnails, page_number):
+        self.view.drawing_area.queue_draw()
+
     def show_blank_slate(self):
         self.view.stack.set_visible_child_name('blank_slate')
 
@@ -85,21 +93,23 @@ class PreviewPresenter(object):
 
         self.draw_background(ctx, drawing_area)
 
-        page_height = self.preview.layout.page_height
-        page_gap = self.preview.layout.page_gap
-        margin = self.preview.layout.get_horizontal_margin(width)
+        layout = self.preview.layout
         scrolling_offset_x = self.view.content.scrolling_offset_x
         scrolling_offset_y = self.view.content.scrolling_offset_y
-        first_page = int(scrolling_offset_y // (page_height + page_gap))
-        last_page = min(int((scrolling_offset_y + height + 1) // (page_height + page_gap)), self.preview.poppler_document.get_n_pages() - 1)
-        ctx.transform(cairo.Matrix(1, 0, 0, 1, margin - scrolling_offset_x, first_page * (page_height + page_gap) - scrolling_offset_y))
+        first_page = layout.get_page_by_offset(scrolling_offset_y) - 1
+        last_page = layout.get_page_by_offset(scrolling_offset_y + height + 1) - 1
 
         for page_number in range(first_page, last_page + 1):
-            self.draw_page_background_and_outline(ctx)
+            margin = layout.get_horizontal_margin(width, page_number)
+            matrix = ctx.get_matrix()
+            ctx.transform(cairo.Matrix(1, 0, 0, 1, margin - scrolling_offset_x, layout.get_page_offset(page_number) - scrolling_offset_y))
+
+            self.draw_page_background_and_outline(ctx, page_number)
             self.draw_rendered_page(ctx, page_number)
+            self.draw_search_results(ctx, page_number)
             self.draw_synctex_rectangles(ctx, page_number)
 
-            ctx.transform(cairo.Matrix(1, 0, 0, 1, 0, page_height + self.preview.layout.page_gap))
+            ctx.set_matrix(matrix)
 
     def draw_background(self, ctx, drawing_area):
         ctx.rectangle(0, 0, drawing_area.get_allocated_width(), drawing_area.get_allocated_height())
@@ -107,36 +117,78 @@ class PreviewPresenter(object):
         ctx.fill()
 
     #@timer
-    def draw_page_background_and_outline(self, ctx):
+    def draw_page_background_and_outline(self, ctx, page_number):
+        page_width = self.preview.layout.page_widths[page_number]
+        page_height = self.preview.layout.page_heights[page_number]
+
         Gdk.cairo_set_source_rgba(ctx, ColorManager.get_ui_color('borders'))
-        ctx.rectangle(- self.preview.layout.border_width, - self.preview.layout.border_width, self.preview.layout.page_width + 2 * self.preview.layout.border_width, self.preview.layout.page_height + 2 * self.preview.layout.border_width)
+        ctx.rectangle(- self.preview.layout.border_width, - self.preview.layout.border_width, page_width + 2 * self.preview.layout.border_width, page_height + 2 * self.preview.layout.border_width)
         ctx.fill()
 
         if self.preview.recolor_pdf:
             Gdk.cairo_set_source_rgba(ctx, ColorManager.get_ui_color('view_bg_color'))
         else:
             ctx.set_source_rgba(1, 1, 1, 1)
-        ctx.rectangle(0, 0, self.preview.layout.page_width, self.preview.layout.page_height)
+        ctx.rectangle(0, 0, page_width, page_height)
         ctx.fill()
 
     def draw_rendered_page(self, ctx, page_number):
-        if not page_number in self.page_renderer.rendered_pages: return
+        if len(self.page_renderer.rendered_tiles.get(page_number, [])) == 0:
+            self.draw_thumbnail(ctx, page_number)
+            return
 
-        rendered_page_data = self.page_renderer.rendered_pages[page_number]
-        surface = rendered_page_data[0]
-        page_width = rendered_page_data[1] * self.preview.layout.hidpi_factor
+        tiles = self.page_renderer.rendered_tiles[page_number]
+        tile_size = self.page_renderer.tile_size
 
-        if not isinstance(surface, cairo.ImageSurface): return
+        # tiles of the current zoom level go on top of older ones, sharper
+        # ones on top of low resolution ones.
+        current_page_width = int(self.preview.layout.page_width)
+        for tile_key in sorted(tiles, key=lambda tile_key: (tile_key[0] == current_page_width, tile_key[0])):
+            surface, page_width, pdf_date, colors = tiles[tile_key]
+            if not isinstance(surface, cairo.ImageSurface): continue
 
-        matrix = ctx.get_matrix()
-        factor = self.preview.layout.page_width / page_width
-        ctx.scale(factor, factor)
+            page_width, column, row = tile_key
+            matrix = ctx.get_matrix()
+            factor = self.preview.layout.page_width / (page_width * self.preview.layout.hidpi_factor)
+            ctx.scale(factor, factor)
 
-        ctx.set_source_surface(surface, 0, 0)
-        ctx.rectangle(0, 0, self.preview.layout.page_width / factor, self.preview.layout.page_height / factor)
-        ctx.fill()
+            ctx.set_source_surface(surface, column * tile_size, row * tile_size)
+            ctx.get_source().set_extend(cairo.Extend.PAD)
+            ctx.rectangle(column * tile_size, row * tile_size, surface.get_width(), surface.get_height())
+            ctx.fill()
+
+            ctx.set_matrix(matrix)
+
+    def draw_thumbnail(self, ctx, page_number):
+        ''' Stands in for pages without tiles, when scrolling fast or zoomed out. '''
 
-        ctx.set_matrix(matrix)
+        surface = self.preview.thumbnails.get_surface(page_number)
+        if surface == None: return
+
+        page_width = self.preview.layout.page_widths[page_number]
+        page_height = self.preview.layout.page_heights[page_number]
+        factor = page_width / surface.get_width()
+
+        ctx.save()
+        ctx.rectangle(0, 0, page_width, page_height)
+        ctx.clip()
+        ctx.scale(factor, factor)
+        ctx.set_source_surface(surface, 0, 0)
+        ctx.get_source().set_filter(cairo.Filter.BILINEAR)
+        ctx.paint()
+        ctx.restore()
+
+    def draw_search_results(self, ctx, page_number):
+        rectangles = self.preview.search.get_rectangles(page_number)
+        if len(rectangles) == 0: return
+
+        scale_factor = self.preview.layout.scale_factor
+        ctx.set_operator(cairo.Operator.MULTIPLY)
+        for x1, y1, x2, y2, is_current in rectangles:
+            Gdk.cairo_set_source_rgba(ctx, ColorManager.get_ui_color('highlight_search_current_preview' if is_current else 'highlight_search_preview'))
+            ctx.rectangle(x1 * scale_factor, y1 * scale_factor, (x2 - x1) * scale_factor, (y2 - y1) * scale_factor)
+            ctx.fill()
+        ctx.set_operator(cairo.Operator.OVER)
 
     def draw_synctex_rectangles(self, ctx, page_number):
         try:
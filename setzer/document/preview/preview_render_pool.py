@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import gi
+gi.require_version('Poppler', '0.18')
+from gi.repository import Poppler
+from gi.repository import GLib
+import cairo
+
+import _thread as thread, queue
+import multiprocessing
+import multiprocessing.connection
+from multiprocessing import shared_memory
+import atexit
+import hashlib
+import os, os.path
+import numpy as np
+
+
+class PreviewRenderPool(object):
+    ''' Renders tiles in worker processes, each with its own Poppler
+        document, so pages render on all cores. Pixels come back through
+        shared memory, one slot per tile in flight. '''
+
+    def __init__(self):
+        self.tile_size = 512
+        self.tasks_per_worker = 2
+        self.number_of_workers = max(min((os.cpu_count() or 2) - 1, 8), 1)
+
+        # forking a process that runs GTK isn't safe.
+        self.context = multiprocessing.get_context('spawn')
+        self.lock = thread.allocate_lock()
+        self.is_started = False
+        self.is_available = False
+        self.is_stopped = False
+        self.workers = list()
+        self.slots = list()
+        self.free_slots = queue.Queue()
+        self.pending_tasks = dict()
+        self.task_count = 0
+
+    def start(self):
+        with self.lock:
+            if self.is_started: return self.is_available
+            self.is_started = True
+
+            try:
+                for slot_index in range(self.number_of_workers * self.tasks_per_worker):
+                    self.slots.append(shared_memory.SharedMemory(create=True, size=self.tile_size * self.tile_size * 4))
+                    self.free_slots.put(slot_index)
+                for worker_index in range(self.number_of_workers):
+                    self.workers.append(self.spawn_worker())
+            except OSError:
+                self.free_slots = queue.Queue()
+                self.release_resources()
+                return False
+
+            self.is_available = True
+        atexit.register(self.stop)
+        thread.start_new_thread(self.results_loop, ())
+        return True
+
+    def stop(self):
+        with self.lock:
+            self.is_stopped = True
+            self.is_available = False
+            self.release_resources()
+
+    def release_resources(self):
+        for worker in self.workers:
+            worker['process'].kill()
+        self.workers = list()
+        for slot in self.slots:
+            slot.close()
+            slot.unlink()
+        self.slots = list()
+
+    def spawn_worker(self):
+        ''' Each worker sends its results through its own pipe, the parent
+            closes the writing end so a crash shows up as end of file. '''
+
+        task_queue = self.context.Queue()
+        result_connection, worker_connection = self.context.Pipe(duplex=False)
+        slot_names = [slot.name for slot in self.slots]
+        process = self.context.Process(target=worker_loop, args=(task_queue, worker_connection, slot_names, self.tile_size), daemon=True)
+        process.start()
+        worker_connection.close()
+        return {'process': process, 'task_queue': task_queue, 'result_connection': result_connection, 'task_ids': set()}
+
+    def has_free_slot(self):
+        if not self.is_available: return True
+        return not self.free_slots.empty()
+
+    def render(self, task, callback):
+        ''' Blocks until a slot is free, callback(task, surface) is called
+            from another thread, with surface None if rendering failed. '''
+
+        slot_index = self.free_slots.get()
+        with self.lock:
+            if not self.is_available:
+                self.free_slots.put(slot_index)
+                return
+            self.task_count += 1
+            task_id = self.task_count
+            worker = min(self.workers, key=lambda worker: len(worker['task_ids']))
+            worker['task_ids'].add(task_id)
+            self.pending_tasks[task_id] = (task, callback, slot_index)
+
+        worker_task = dict((key, value) for key, value in task.items() if key != 'matching_theme_colors')
+        worker_task['task_id'] = task_id
+        worker_task['slot_index'] = slot_index
+        worker_task['fg_color'] = get_rgba_tuple(task['matching_theme_colors'])
+        worker['task_queue'].put(worker_task)
+
+    def results_loop(self):
+        ''' Blocks until a worker sends a result or exits. '''
+
+        while True:
+            with self.lock:
+                if self.is_stopped: return
+                connections = [worker['result_connection'] for worker in self.workers]
+                sentinels = [worker['process'].sentinel for worker in self.workers]
+
+            for ready in multiprocessing.connection.wait(connections + sentinels):
+                if ready not in connections: continue
+                try:
+                    while ready.poll():
+                        self.add_result(*ready.recv())
+                except (OSError, EOFError): pass
+            self.replace_dead_workers()
+
+    def add_result(self, task_id, width, height, stride):
+        with self.lock:
+            if self.is_stopped: return
+            if task_id not in self.pending_tasks: return
+            task, callback, slot_index = self.pending_tasks.pop(task_id)
+            for worker in self.workers:
+                worker['task_ids'].discard(task_id)
+
+            surface = None
+            if width != None:
+                surface = cairo.ImageSurface(cairo.Format.ARGB32, width, height)
+                surface.get_data()[:stride * height] = self.slots[slot_index].buf[:stride * height]
+                surface.mark_dirty()
+        self.free_slots.put(slot_index)
+        callback(task, surface)
+
+    def replace_dead_workers(self):
+        ''' A worker that crashed (Poppler can segfault on broken files)
+            takes its tasks with it, these fail and it is started again. '''
+
+        failed_tasks = list()
+        with self.lock:
+            if self.is_stopped: return
+            for worker_index, worker in enumerate(self.workers):
+                if worker['process'].is_alive(): continue
+
+                for task_id in worker['task_ids']:
+                    failed_tasks.append(self.pending_tasks.pop(task_id))
+                worker['result_connection'].close()
+                self.workers[worker_index] = self.spawn_worker()
+
+        for task, callback, slot_index in failed_tasks:
+            self.free_slots.put(slot_index)
+            callback(task, None)
+
+
+def worker_loop(task_queue, result_connection, slot_names, tile_size):
+    slots = [shared_memory.SharedMemory(name=name) for name in slot_names]
+    documents = dict()
+
+    while True:
+        task = task_queue.get()
+        if task == None: return
+
+        try:
+            poppler_document = get_poppler_document(documents, task['pdf_filename'], task['pdf_date'])
+            surface = render_tile(poppler_document.get_page(task['page_number']), task, tile_size)
+        except Exception:
+            result_connection.send((task['task_id'], None, None, None))
+            continue
+
+        surface.flush()
+        size = surface.get_stride() * surface.get_height()
+        slots[task['slot_index']].buf[:size] = surface.get_data()[:size]
+        result_connection.send((task['task_id'], surface.get_width(), surface.get_height(), surface.get_stride()))
+
+
+def get_poppler_document(documents, pdf_filename, pdf_date):
+    ''' The file may have been rebuilt since the task was queued, tiles
+        of a newer file would be stored under the old date. '''
+
+    if os.path.getmtime(pdf_filename) != pdf_date:
+        raise FileNotFoundError()
+
+    key = (pdf_filename, pdf_date)
+    if key not in documents:
+        for old_key in list(documents):
+            if old_key[0] == pdf_filename or len(documents) >= 4:
+                del(documents[old_key])
+        documents[key] = Poppler.Document.new_from_file(GLib.filename_to_uri(pdf_filename))
+    return documents[key]
+
+
+def get_rgba_tuple(colors):
+    if colors == None: return None
+    return (colors[0].red, colors[0].green, colors[0].blue, colors[0].alpha)
+
+
+def render_tile(page, task, tile_size):
+    fg_color = task['fg_color']
+    page_width, column, row = task['tile_key']
+    width = min(tile_size, task['device_width'] - column * tile_size)
+    height = min(tile_size, task['device_height'] - row * tile_size)
+    surface = cairo.ImageSurface(cairo.Format.ARGB32, width, height)
+    ctx = cairo.Context(surface)
+
+    ctx.set_source_rgba(1, 1, 1, 1)
+    ctx.rectangle(0, 0, width, height)
+    ctx.fill()
+
+    ctx.translate(- column * tile_size, - row * tile_size)
+    ctx.scale(task['scale_factor'] * task['hidpi_factor'], task['scale_factor'] * task['hidpi_factor'])
+    page.render(ctx)
+
+    if fg_color != None:
+        recolor_surface(surface, fg_color)
+    return surface
+
+
+def render_small_page(page, width=200):
+    ''' The page on a transparent background, for fingerprints and thumbnails. '''
+
+    page_size = page.get_size()
+    scale = width / page_size.width
+    surface = cairo.ImageSurface(cairo.Format.ARGB32, width, max(int(page_size.height * scale), 1))
+    ctx = cairo.Context(surface)
+    ctx.scale(scale, scale)
+    page.render(ctx)
+    surface.flush()
+    return surface
+
+
+def get_thumbnail(small_page, width, fg_color):
+    scale = width / small_page.get_width()
+    surface = cairo.ImageSurface(cairo.Format.ARGB32, width, max(int(small_page.get_height() * scale), 1))
+    ctx = cairo.Context(surface)
+
+    ctx.set_source_rgba(1, 1, 1, 1)
+    ctx.paint()
+    ctx.scale(scale, scale)
+    ctx.set_source_surface(small_page, 0, 0)
+    ctx.paint()
+
+    if fg_color != None:
+        recolor_surface(surface, fg_color)
+    surface.flush()
+    return surface
+
+
+def get_page_fingerprint(page, small_page=None):
+    ''' Changes if what the page shows changes: its size, text and text
+        layout, the images on it and, for drawings, a small render. '''
+
+    md5 = hashlib.md5()
+    page_size = page.get_size()
+    md5.update(repr((page_size.width, page_size.height)).encode('utf-8'))
+    md5.update(page.get_text().encode('utf-8'))
+
+    has_layout, rectangles = page.get_text_layout()
+    md5.update(repr([(round(rect.x1, 2), round(rect.y1, 2), round(rect.x2, 2), round(rect.y2, 2)) for rect in rectangles]).encode('utf-8'))
+    for mapping in page.get_image_mapping():
+        md5.update(repr((mapping.image_id, round(mapping.area.x1, 2), round(mapping.area.y1, 2), round(mapping.area.x2, 2), round(mapping.area.y2, 2))).encode('utf-8'))
+
+    if small_page == None:
+        small_page = render_small_page(page)
+    md5.update(small_page.get_data())
+
+    return md5.digest()
+
+
+def recolor_surface(surface, fg_color):
+    ''' Turns the page into the foreground color, with the darkness of
+        each pixel as its alpha. Works in place on the pixel data, with
+        integers: the alpha channel is set through a numpy view, then the
+        color is filled in by cairo. '''
+
+    surface.flush()
+    width, height, stride = surface.get_width(), surface.get_height(), surface.get_stride()
+    pixels = np.ndarray((height, width, 4), dtype=np.uint8, buffer=surface.get_data(), strides=(stride, 4, 1))
+
+    # 77, 154 and 25 add up to 256, so the shift divides by 256.
+    brightness = np.multiply(pixels[..., 0], 77, dtype=np.uint16)
+    brightness += np.multiply(pixels[..., 1], 154, dtype=np.uint16)
+    brightness += np.multiply(pixels[..., 2], 25, dtype=np.uint16)
+    brightness >>= 8
+    np.subtract(255, brightness, out=pixels[..., 3], casting='unsafe')
+    surface.mark_dirty()
+
+    ctx = cairo.Context(surface)
+    ctx.set_source_rgba(*fg_color)
+    ctx.set_operator(cairo.Operator.IN)
+    ctx.paint()
+
+
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import _thread as thread
+import threading
+import traceback
+import weakref
+
+
+class PreviewRenderScheduler(object):
+    ''' One thread runs the render tasks of all previews. It sleeps on a
+        condition until a renderer queues something or a slot of the
+        render pool is free again, so idle previews cost no wakeups.
+        Low priority renderers only get a turn when the queues of all other
+        ones are empty, not when they merely wait for a free slot. '''
+
+    def __init__(self, render_pool):
+        self.render_pool = render_pool
+        self.renderers = weakref.WeakSet()
+        self.low_priority_renderers = weakref.WeakSet()
+        self.condition = threading.Condition()
+
+        thread.start_new_thread(self.run, ())
+
+    def add_renderer(self, renderer, low_priority=False):
+        with self.condition:
+            if low_priority:
+                self.low_priority_renderers.add(renderer)
+            else:
+                self.renderers.add(renderer)
+
+    def notify(self):
+        with self.condition:
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            with self.condition:
+                task = self.get_next_task()
+                while task == None:
+                    self.condition.wait()
+                    task = self.get_next_task()
+
+            # the thread is shared by all previews, a task that fails
+            # mustn't stop rendering for the others.
+            function, todo = task
+            try:
+                function(todo)
+            except Exception:
+                traceback.print_exc()
+
+    def get_next_task(self):
+        has_free_slot = self.render_pool.has_free_slot()
+        renderers = list(self.renderers)
+        for renderer in renderers:
+            task = renderer.get_next_task(has_free_slot)
+            if task != None: return task
+
+        if any(renderer.has_queued_tasks() for renderer in renderers): return None
+        for renderer in list(self.low_priority_renderers):
+            task = renderer.get_next_task(has_free_slot)
+            if task != None: return task
+        return None
+
+    def render(self, todo, callback):
+        ''' Renders in the pool, waking up the scheduler when the slot is free again. '''
+
+        def on_rendered(todo, surface):
+            callback(todo, surface)
+            self.notify()
+
+        self.render_pool.render(todo, on_rendered)
+
+
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import gi
+gi.require_version('Poppler', '0.18')
+gi.require_version('Gtk', '4.0')
+from gi.repository import Poppler
+from gi.repository import GLib
+
+import _thread as thread
+import collections
+import re
+
+from setzer.helpers.observable import Observable
+
+
+class PreviewSearch(Observable):
+    ''' Finds text in the pdf file. After each load a thread extracts the
+        text of all pages with its own Poppler document. Texts are kept by
+        content hash of the file, so builds that don't change the file
+        and other documents with the same file don't extract them again.
+
+        Results are searched in the extracted texts, longer queries only
+        in pages that matched the shorter one. Rectangles of results are
+        read from the text layout, only for pages that are drawn. '''
+
+    texts = collections.OrderedDict()
+    texts_lock = thread.allocate_lock()
+    maximum_cached_texts = 8
+
+    def __init__(self, preview, view):
+        Observable.__init__(self)
+        self.preview = preview
+        self.view = view.search_bar
+
+        self.page_texts = None
+        self.extract_count = 0
+        self.query = ''
+        self.results = list()
+        self.results_by_page = dict()
+        self.current_result = None
+        self.text_layouts = dict()
+        self.result_rectangles = dict()
+
+        self.preview.connect('pdf_changed', self.on_pdf_changed)
+        self.view.entry.connect('changed', self.on_search_entry_changed)
+        self.view.entry.connect('stop_search', self.on_search_stop)
+        self.view.entry.connect('next_match', self.on_search_next_match)
+        self.view.entry.connect('previous_match', self.on_search_previous_match)
+        self.view.entry.connect('activate', self.on_search_next_match)
+        self.view.close_button.connect('clicked', self.on_search_stop)
+        self.view.next_button.connect('clicked', self.on_search_next_match)
+        self.view.prev_button.connect('clicked', self.on_search_previous_match)
+
+    def on_pdf_changed(self, preview):
+        self.page_texts = None
+        self.text_layouts = dict()
+        self.extract_count += 1
+        self.set_results(list())
+        if self.preview.poppler_document != None:
+            thread.start_new_thread(self.extract_texts_in_thread, (self.preview.pdf_filename, self.preview.pdf_hash, self.extract_count))
+
+    def extract_texts_in_thread(self, pdf_filename, pdf_hash, extract_count):
+        with PreviewSearch.texts_lock:
+            if pdf_hash != None and pdf_hash in PreviewSearch.texts:
+                PreviewSearch.texts.move_to_end(pdf_hash)
+                GLib.idle_add(self.on_texts_extracted, PreviewSearch.texts[pdf_hash], extract_count)
+                return
+
+        try:
+            poppler_document = Poppler.Document.new_from_file(GLib.filename_to_uri(pdf_filename))
+            page_texts = list()
+            for page_number in range(poppler_document.get_n_pages()):
+                page_texts.append(self.get_lowercase_text(poppler_document.get_page(page_number).get_text()))
+        except Exception:
+            return
+
+        if pdf_hash != None:
+            with PreviewSearch.texts_lock:
+                PreviewSearch.texts[pdf_hash] = page_texts
+                while len(PreviewSearch.texts) > PreviewSearch.maximum_cached_texts:
+                    PreviewSearch.texts.popitem(last=False)
+        GLib.idle_add(self.on_texts_extracted, page_texts, extract_count)
+
+    def get_lowercase_text(self, text):
+        ''' Lowercase, with each character at its place in the text layout. '''
+
+        lowercase_text = text.lower()
+        if len(lowercase_text) == len(text): return lowercase_text
+        return ''.join(char.lower() if len(char.lower()) == 1 else char for char in text)
+
+    def on_texts_extracted(self, page_texts, extract_count):
+        if extract_count != self.extract_count: return False
+
+        self.page_texts = page_texts
+        self.query = ''
+        self.update_results(self.view.entry.get_text())
+        return False
+
+    def on_search_entry_changed(self, entry):
+        self.update_results(entry.get_text())
+
+    def on_search_next_match(self, *arguments):
+        if len(self.results) == 0: return
+
+        self.set_current_result((self.current_result + 1) % len(self.results))
+        self.scroll_to_current_result()
+
+    def on_search_previous_match(self, *arguments):
+        if len(self.results) == 0: return
+
+        self.set_current_result((self.current_result - 1) % len(self.results))
+        self.scroll_to_current_result()
+
+    def on_search_stop(self, *arguments):
+        self.hide_search_bar()
+
+    def update_results(self, query):
+        words = query.lower().split()
+        query = ' '.join(words)
+        if self.page_texts == None or query == '':
+            self.query = query
+            self.set_results(list())
+            return
+        if query == self.query: return
+
+        if self.query != '' and query.startswith(self.query):
+            page_numbers = sorted(self.results_by_page)
+        else:
+            page_numbers = range(len(self.page_texts))
+        self.query = query
+
+        # words may be split across lines in the text of a page
+        pattern = re.compile(r'\s+'.join(re.escape(word) for word in words))
+        results = list()
+        for page_number in page_numbers:
+            for match in pattern.finditer(self.page_texts[page_number]):
+                results.append((page_number, match.start(), match.end()))
+        self.set_results(results)
+
+        if len(results) > 0:
+            self.set_current_result(self.get_first_result_in_view())
+            self.scroll_to_current_result()
+
+    def set_results(self, results):
+        self.results = results
+        self.results_by_page = dict()
+        for index, result in enumerate(results):
+            if result[0] not in self.results_by_page:
+                self.results_by_page[result[0]] = list()
+            self.results_by_page[result[0]].append(index)
+        self.result_rectangles = dict()
+        self.current_result = 0 if len(results) > 0 else None
+
+        self.update_match_counter()
+        self.add_change_code('search_results_changed')
+
+    def set_current_result(self, index):
+        self.current_result = index
+        self.update_match_counter()
+        self.add_change_code('search_results_changed')
+
+    def get_first_result_in_view(self):
+        if self.preview.layout == None: return 0
+
+        page_number = self.preview.layout.get_page_by_offset(self.preview.view.content.scrolling_offset_y) - 1
+        for index, result in enumerate(self.results):
+            if result[0] >= page_number: return index
+        return 0
+
+    def get_rectangles(self, page_number):
+        ''' Rectangles of the results on the page, in pdf coordinates, as
+            (x1, y1, x2, y2, is_current). '''
+
+        rectangles = list()
+        for index in self.results_by_page.get(page_number, list()):
+            for rectangle in self.get_result_rectangles(index):
+                rectangles.append(rectangle + (index == self.current_result,))
+        return rectangles
+
+    def get_result_rectangles(self, index):
+        ''' One rectangle per line of the result. '''
+
+        if index in self.result_rectangles: return self.result_rectangles[index]
+
+        page_number, start, end = self.results[index]
+        text_layout = self.get_text_layout(page_number)
+        rectangles = list()
+        if len(text_layout) == len(self.page_texts[page_number]):
+            for offset in range(start, end):
+                if self.page_texts[page_number][offset].isspace(): continue
+
+                x1, y1, x2, y2 = text_layout[offset]
+                if len(rectangles) > 0 and abs(rectangles[-1][1] - y1) < 1 and x1 >= rectangles[-1][0]:
+                    rectangles[-1] = (rectangles[-1][0], min(rectangles[-1][1], y1), max(rectangles[-1][2], x2), max(rectangles[-1][3], y2))
+                else:
+                    rectangles.append((x1, y1, x2, y2))
+        self.result_rectangles[index] = rectangles
+        return rectangles
+
+    def get_text_layout(self, page_number):
+        if page_number not in self.text_layouts:
+            has_layout, rectangles = self.preview.poppler_document.get_page(page_number).get_text_layout()
+            self.text_layouts[page_number] = [(rect.x1, rect.y1, rect.x2, rect.y2) for rect in rectangles] if has_layout else list()
+        return self.text_layouts[page_number]
+
+    def scroll_to_current_result(self):
+        layout = self.preview.layout
+        if layout == None or self.current_result == None: return
+
+        page_number = self.results[self.current_result][0]
+        rectangles = self.get_result_rectangles(self.current_result)
+        if len(rectangles) > 0:
+            x1, y1, x2, y2 = rectangles[0]
+        else:
+            x1, y1, x2, y2 = 0, 0, 0, 0
+
+        content = self.preview.view.content
+        left = layout.get_horizontal_margin(content.width, page_number) + x1 * layout.scale_factor
+        width = (x2 - x1) * layout.scale_factor
+        top = layout.get_page_offset(page_number) + y1 * layout.scale_factor
+        height = (y2 - y1) * layout.scale_factor
+        if top >= content.scrolling_offset_y and top + height <= content.scrolling_offset_y + content.height:
+            y = content.scrolling_offset_y
+        else:
+            y = max(0, top - content.height * 0.3)
+        x = max(min(left - 18, content.scrolling_offset_x), left + width - content.width + 18)
+        self.preview.scroll_to_position(x, y)
+
+    def update_match_counter(self):
+        if len(self.results) == 0:
+            self.view.match_counter.set_text('')
+            if self.query != '' and self.page_texts != None:
+                self.view.entry.get_style_context().add_class('error')
+            else:
+                self.view.entry.get_style_context().remove_class('error')
+        else:
+            self.view.match_counter.set_text(_('{0} of {1}').format(self.current_result + 1, len(self.results)))
+            self.view.entry.get_style_context().remove_class('error')
+        self.view.prev_button.set_sensitive(len(self.results) > 0)
+        self.view.next_button.set_sensitive(len(self.results) > 0)
+
+    def is_visible(self):
+        return self.view.get_reveal_child()
+
+    def show_search_bar(self):
+        if self.is_visible(): return
+
+        self.view.set_reveal_child(True)
+        GLib.idle_add(self.search_entry_grab_focus)
+        self.add_change_code('search_bar_visibility_changed')
+
+    def hide_search_bar(self):
+        if not self.is_visible(): return
+
+        self.view.set_reveal_child(False)
+        self.view.entry.set_text('')
+        self.add_change_code('search_bar_visibility_changed')
+
+    def search_entry_grab_focus(self):
+        self.view.entry.grab_focus()
+        self.view.entry.select_region(0, len(self.view.entry.get_text()))
+        return False
+
+
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import gi
+gi.require_version('Gtk', '4.0')
+from gi.repository import Gdk
+from gi.repository import GLib
+import cairo
+
+import _thread as thread
+import bisect
+import collections
+import heapq
+import itertools
+import zlib
+
+import setzer.document.preview.preview_render_pool as preview_render_pool
+from setzer.app.color_manager import ColorManager
+from setzer.app.service_locator import ServiceLocator
+from setzer.helpers.observable import Observable
+
+
+class PreviewThumbnails(Observable):
+    ''' A strip of small pages next to the preview, clicking one jumps to
+        the page. Thumbnails are made in the render scheduler thread at low
+        priority, from the same small render as the page fingerprint, and
+        are kept zlib compressed, with a few decoded ones for drawing.
+
+        After a build, thumbnails of the old pdf file stay until they are
+        replaced. A page keeps its thumbnail if its fingerprint didn't
+        change. The preview draws thumbnails in place of pages that have
+        no tiles yet. '''
+
+    def __init__(self, preview, view):
+        Observable.__init__(self)
+        self.preview = preview
+        self.view = view.thumbnails
+        self.content = self.view.content
+        self.render_scheduler = ServiceLocator.get_render_scheduler()
+
+        self.thumbnail_width = 100
+        self.margin = 12
+        self.page_gap = 10
+        self.additional_pages = 10
+        self.maximum_decoded_surfaces = 64
+
+        self.page_offsets = list()
+        self.page_heights = list()
+        self.pdf_date = None
+        self.colors = None
+        self.thumbnails = dict()
+        self.surfaces = collections.OrderedDict()
+        self.poppler_documents = dict()
+
+        self.render_queue_lock = thread.allocate_lock()
+        self.render_queue = list()
+        self.rendering_pages = dict()
+
+        self.view.drawing_area.set_draw_func(self.draw)
+        self.content.connect('scrolling_offset_changed', self.on_scrolling_offset_changed)
+        self.content.connect('size_changed', self.on_size_changed)
+        self.content.connect('primary_button_press', self.on_primary_button_press)
+        self.preview.connect('pdf_changed', self.on_pdf_changed)
+        self.preview.connect('position_changed', self.on_position_changed)
+        self.preview.connect('recolor_pdf_changed', self.on_recolor_pdf_changed)
+        self.preview.document.settings.connect('settings_changed', self.on_settings_changed)
+
+        self.render_scheduler.add_renderer(self, low_priority=True)
+
+    def on_pdf_changed(self, preview):
+        if self.preview.poppler_document == None:
+            self.thumbnails = dict()
+            self.surfaces = collections.OrderedDict()
+
+        self.pdf_date = self.preview.get_pdf_date()
+        self.update_layout()
+        for page_number in list(self.thumbnails):
+            if page_number >= len(self.page_offsets):
+                del(self.thumbnails[page_number])
+                self.surfaces.pop(page_number, None)
+        self.update_render_queue()
+        self.content.queue_draw()
+
+    def on_position_changed(self, preview):
+        if not self.is_visible(): return
+
+        self.scroll_current_page_into_view()
+        self.content.queue_draw()
+
+    def on_recolor_pdf_changed(self, preview):
+        self.update_render_queue()
+        self.content.queue_draw()
+
+    def on_settings_changed(self, settings, parameter):
+        section, item, value = parameter
+
+        if item == 'color_scheme':
+            self.update_render_queue()
+
+    def on_scrolling_offset_changed(self, content):
+        self.update_render_queue()
+
+    def on_size_changed(self, content):
+        self.content.adjustment_x.set_upper(self.content.width)
+        self.update_render_queue()
+
+    def on_primary_button_press(self, content, data):
+        x_offset, y_offset, state = data
+        if self.preview.layout == None or len(self.page_offsets) == 0: return
+
+        page_number = self.get_page_by_offset(y_offset)
+        if y_offset - self.margin - self.page_offsets[page_number] > self.page_heights[page_number]: return
+
+        self.preview.scroll_to_position(self.preview.view.content.scrolling_offset_x, self.preview.layout.get_page_offset(page_number))
+
+    def is_visible(self):
+        return self.view.get_reveal_child()
+
+    def show_thumbnails(self):
+        if self.is_visible(): return
+
+        self.view.set_reveal_child(True)
+        self.scroll_current_page_into_view()
+        self.update_render_queue()
+        self.add_change_code('thumbnails_visibility_changed')
+
+    def hide_thumbnails(self):
+        if not self.is_visible(): return
+
+        self.view.set_reveal_child(False)
+        with self.render_queue_lock:
+            self.render_queue = list()
+        self.add_change_code('thumbnails_visibility_changed')
+
+    def update_layout(self):
+        self.page_heights = [self.thumbnail_width * page_height / page_width for page_width, page_height in self.preview.page_sizes]
+        if len(self.page_heights) > 0:
+            self.page_offsets = list(itertools.accumulate((page_height + self.page_gap for page_height in self.page_heights[:-1]), initial=0))
+        else:
+            self.page_offsets = list()
+        if len(self.page_offsets) > 0:
+            self.content.adjustment_y.set_upper(self.page_offsets[-1] + self.page_heights[-1] + 2 * self.margin)
+        else:
+            self.content.adjustment_y.set_upper(0)
+
+    def get_page_by_offset(self, offset):
+        return min(max(bisect.bisect_right(self.page_offsets, offset - self.margin) - 1, 0), len(self.page_offsets) - 1)
+
+    def get_current_page(self):
+        return self.preview.layout.get_page_by_offset(self.preview.view.content.scrolling_offset_y) - 1
+
+    def scroll_current_page_into_view(self):
+        if self.preview.layout == None or len(self.page_offsets) == 0: return
+
+        page_number = self.get_current_page()
+        top = self.margin + self.page_offsets[page_number]
+        bottom = top + self.page_heights[page_number]
+        if top < self.content.scrolling_offset_y or bottom > self.content.scrolling_offset_y + self.content.height:
+            self.content.scroll_to_position([0, top - self.margin])
+
+    def get_colors(self):
+        if self.preview.recolor_pdf:
+            return (ColorManager.get_ui_color('view_fg_color'), ColorManager.get_ui_color('view_bg_color'))
+        return None
+
+    def get_colors_key(self, colors):
+        if colors == None: return None
+        return (colors[0].to_string(), colors[1].to_string())
+
+    def update_render_queue(self):
+        ''' Queues the missing thumbnails close to the visible part of the
+            strip, closest first. Replaces the whole queue. '''
+
+        if not self.is_visible() or self.preview.poppler_document == None or len(self.page_offsets) == 0:
+            with self.render_queue_lock:
+                self.render_queue = list()
+            return
+
+        pdf_date = self.pdf_date
+        colors = self.get_colors()
+        colors_key = self.get_colors_key(colors)
+        device_width = self.thumbnail_width * self.content.view.get_scale_factor()
+        page_fingerprints = self.preview.page_renderer.page_fingerprints
+
+        first_page = max(self.get_page_by_offset(self.content.scrolling_offset_y) - self.additional_pages, 0)
+        last_page = min(self.get_page_by_offset(self.content.scrolling_offset_y + self.content.height) + self.additional_pages, len(self.page_offsets) - 1)
+        center = self.content.scrolling_offset_y + self.content.height / 2
+
+        with self.render_queue_lock:
+            rendering_pages = dict(self.rendering_pages)
+
+        render_queue = list()
+        for page_number in range(first_page, last_page + 1):
+            if rendering_pages.get(page_number) == (pdf_date, colors_key): continue
+
+            fingerprint = None
+            item = self.thumbnails.get(page_number)
+            if item != None and item['colors_key'] == colors_key and item['width'] == device_width:
+                if item['pdf_date'] == pdf_date: continue
+
+                # the page renderer may already know the page didn't change
+                fingerprint = item['fingerprint']
+                if page_fingerprints.get(page_number) == (pdf_date, fingerprint):
+                    item['pdf_date'] = pdf_date
+                    continue
+
+            todo = {'pdf_filename': self.preview.pdf_filename, 'pdf_date': pdf_date, 'page_number': page_number, 'device_width': device_width, 'fg_color': preview_render_pool.get_rgba_tuple(colors), 'colors_key': colors_key, 'fingerprint': fingerprint}
+            distance = abs(self.margin + self.page_offsets[page_number] + self.page_heights[page_number] / 2 - center)
+            render_queue.append((distance, len(render_queue), todo))
+
+        heapq.heapify(render_queue)
+        with self.render_queue_lock:
+            self.render_queue = render_queue
+        self.render_scheduler.notify()
+
+    def get_next_task(self, has_free_slot):
+        ''' Called by the render scheduler, when no preview has anything to do. '''
+
+        with self.render_queue_lock:
+            if len(self.render_queue) == 0: return None
+            todo = heapq.heappop(self.render_queue)[2]
+            self.rendering_pages[todo['page_number']] = (todo['pdf_date'], todo['colors_key'])
+        return (self.render_thumbnail, todo)
+
+    def render_thumbnail(self, todo):
+        ''' Runs in the scheduler thread, with its own Poppler document. '''
+
+        result = {'page_number': todo['page_number'], 'pdf_date': todo['pdf_date'], 'colors_key': todo['colors_key'], 'width': todo['device_width']}
+        try:
+            poppler_document = preview_render_pool.get_poppler_document(self.poppler_documents, todo['pdf_filename'], todo['pdf_date'])
+            page = poppler_document.get_page(todo['page_number'])
+            small_page = preview_render_pool.render_small_page(page)
+            result['fingerprint'] = preview_render_pool.get_page_fingerprint(page, small_page)
+            if result['fingerprint'] != todo['fingerprint']:
+                surface = preview_render_pool.get_thumbnail(small_page, todo['device_width'], todo['fg_color'])
+                result['height'] = surface.get_height()
+                result['stride'] = surface.get_stride()
+                result['data'] = zlib.compress(surface.get_data(), 1)
+        except Exception:
+            result['fingerprint'] = None
+        GLib.idle_add(self.on_thumbnail_rendered, result)
+
+    def on_thumbnail_rendered(self, result):
+        page_number = result['page_number']
+        with self.render_queue_lock:
+            if self.rendering_pages.get(page_number) == (result['pdf_date'], result['colors_key']):
+                del(self.rendering_pages[page_number])
+        if result['pdf_date'] != self.pdf_date or result['fingerprint'] == None: return False
+        if page_number >= len(self.page_offsets): return False
+
+        if 'data' in result:
+            self.thumbnails[page_number] = result
+            self.surfaces.pop(page_number, None)
+        else:
+            item = self.thumbnails.get(page_number)
+            if item == None or item['fingerprint'] != result['fingerprint'] or item['colors_key'] != result['colors_key'] or item['width'] != result['width']: return False
+            item['pdf_date'] = result['pdf_date']
+        self.content.queue_draw()
+        self.add_change_code('thumbnail_rendered', page_number)
+        return False
+
+    def get_surface(self, page_number):
+        ''' The decoded thumbnail of the page if there is one in the current colors, or None. '''
+
+        item = self.thumbnails.get(page_number)
+        if item == None or item['colors_key'] != self.get_colors_key(self.get_colors()): return None
+
+        if page_number in self.surfaces:
+            self.surfaces.move_to_end(page_number)
+            return self.surfaces[page_number]
+
+        surface = cairo.ImageSurface(cairo.Format.ARGB32, item['width'], item['height'])
+        pixels = zlib.decompress(item['data'])
+        if surface.get_stride() != item['stride'] or len(pixels) != item['stride'] * item['height']: return None
+        surface.get_data()[:] = pixels
+        surface.mark_dirty()
+
+        self.surfaces[page_number] = surface
+        while len(self.surfaces) > self.maximum_decoded_surfaces:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    #@timer
+    def draw(self, drawing_area, ctx, width, height):
+        Gdk.cairo_set_source_rgba(ctx, ColorManager.get_ui_color('window_bg_color'))
+        ctx.paint()
+        if self.preview.poppler_document == None or len(self.page_offsets) == 0: return
+
+        current_page = self.get_current_page() if self.preview.layout != None else None
+        scrolling_offset_y = self.content.scrolling_offset_y
+        x = int((width - self.thumbnail_width) / 2)
+        first_page = self.get_page_by_offset(scrolling_offset_y)
+        last_page = self.get_page_by_offset(scrolling_offset_y + height)
+
+        for page_number in range(first_page, last_page + 1):
+            y = self.margin + self.page_offsets[page_number] - scrolling_offset_y
+            page_height = self.page_heights[page_number]
+
+            border_width = 2 if page_number == current_page else 1
+            Gdk.cairo_set_source_rgba(ctx, ColorManager.get_ui_color('accent_bg_color' if page_number == current_page else 'borders'))
+            ctx.rectangle(x - border_width, y - border_width, self.thumbnail_width + 2 * border_width, page_height + 2 * border_width)
+            ctx.fill()
+
+            if self.preview.recolor_pdf:
+                Gdk.cairo_set_source_rgba(ctx, ColorManager.get_ui_color('view_bg_color'))
+            else:
+                ctx.set_source_rgba(1, 1, 1, 1)
+            ctx.rectangle(x, y, self.thumbnail_width, page_height)
+            ctx.fill()
+
+            surface = self.get_surface(page_number)
+            if surface != None:
+                ctx.save()
+                ctx.rectangle(x, y, self.thumbnail_width, page_height)
+                ctx.clip()
+                ctx.translate(x, y)
+                ctx.scale(self.thumbnail_width / surface.get_width(), self.thumbnail_width / surface.get_width())
+                ctx.set_source_surface(surface, 0, 0)
+                ctx.paint()
+                ctx.restore()
+
+
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import gi
+from gi.repository import GLib
+import cairo
+
+import _thread as thread, queue
+import os, os.path
+import hashlib
+import struct
+import zlib
+
+
+class PreviewTileCache(object):
+    ''' Rendered tiles on disk, so reopening a pdf file at the same zoom
+        level paints right away. Files are keyed by the content of the pdf
+        file, not its name or date, and hold width, height and stride,
+        then the zlib compressed pixels. The least recently used files go
+        once the cache is larger than maximum_size. '''
+
+    def __init__(self):
+        self.folder = os.path.join(GLib.get_user_cache_dir(), 'setzer', 'tiles')
+        self.maximum_size = 256 * 1024 * 1024
+        self.header_format = '<III'
+
+        self.lock = thread.allocate_lock()
+        self.files = None
+        self.total_size = 0
+        self.pdf_hashes = dict()
+
+        self.save_queue = queue.Queue()
+        thread.start_new_thread(self.save_loop, ())
+
+    def get_cache_key(self, pdf_hash, page_number, tile_key, device_width, device_height, hidpi_factor, colors_key):
+        if pdf_hash == None: return None
+
+        key = repr((pdf_hash, page_number, tile_key, device_width, device_height, hidpi_factor, colors_key))
+        return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def get_pdf_hash(self, pdf_filename, pdf_date):
+        ''' Reads the whole file, call it from the thread that loads the pdf
+            file, not from the render scheduler. Only the hash of the latest
+            date of each file is kept. '''
+
+        with self.lock:
+            if self.pdf_hashes.get(pdf_filename, (None, None))[0] == pdf_date:
+                return self.pdf_hashes[pdf_filename][1]
+
+        md5 = hashlib.md5()
+        try:
+            with open(pdf_filename, 'rb') as file:
+                for chunk in iter(lambda: file.read(1024 * 1024), b''):
+                    md5.update(chunk)
+            if os.path.getmtime(pdf_filename) != pdf_date: return None
+        except OSError:
+            return None
+
+        with self.lock:
+            self.pdf_hashes[pdf_filename] = (pdf_date, md5.hexdigest())
+        return md5.hexdigest()
+
+    def load(self, cache_key):
+        if cache_key == None: return None
+
+        filename = os.path.join(self.folder, cache_key)
+        try:
+            with open(filename, 'rb') as file:
+                data = file.read()
+            width, height, stride = struct.unpack_from(self.header_format, data)
+            pixels = zlib.decompress(data[struct.calcsize(self.header_format):])
+            os.utime(filename)
+        except (OSError, struct.error, zlib.error):
+            return None
+
+        surface = cairo.ImageSurface(cairo.Format.ARGB32, width, height)
+        if surface.get_stride() != stride or len(pixels) != stride * height: return None
+        surface.get_data()[:] = pixels
+        surface.mark_dirty()
+
+        with self.lock:
+            if self.files != None and cache_key in self.files:
+                self.files[cache_key] = self.files.pop(cache_key)
+        return surface
+
+    def save(self, cache_key, surface):
+        if cache_key == None: return
+
+        self.save_queue.put((cache_key, surface))
+
+    def save_loop(self):
+        self.read_folder()
+
+        while True:
+            cache_key, surface = self.save_queue.get()
+
+            surface.flush()
+            data = struct.pack(self.header_format, surface.get_width(), surface.get_height(), surface.get_stride())
+            data += zlib.compress(surface.get_data(), 1)
+            filename = os.path.join(self.folder, cache_key)
+            try:
+                with open(filename + '.part', 'wb') as file:
+                    file.write(data)
+                os.replace(filename + '.part', filename)
+            except OSError:
+                continue
+
+            with self.lock:
+                self.total_size -= self.files.pop(cache_key, 0)
+                self.files[cache_key] = len(data)
+                self.total_size += len(data)
+            self.remove_old_files()
+
+    def read_folder(self):
+        ''' Files ordered from least to most recently used. '''
+
+        entries = list()
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            with os.scandir(self.folder) as iterator:
+                for entry in iterator:
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, entry.name, stat.st_size))
+        except OSError: pass
+
+        with self.lock:
+            self.files = dict()
+            for mtime, name, size in sorted(entries):
+                self.files[name] = size
+                self.total_size += size
+        self.remove_old_files()
+
+    def remove_old_files(self):
+        while True:
+            with self.lock:
+                if self.total_size <= self.maximum_size or len(self.files) == 0: return
+                name = next(iter(self.files))
+                self.total_size -= self.files.pop(name)
+
+            try: os.remove(os.path.join(self.folder, name))
+            except OSError: pass
+
+
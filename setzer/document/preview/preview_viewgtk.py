@@ -22,6 +22,7 @@ from gi.repository import Gdk
 from gi.repository import Gio
 
 from setzer.widgets.scrolling_widget.scrolling_widget import ScrollingWidget
+from setzer.widgets.search_entry.search_entry import SearchEntry
 
 
 class PreviewView(Gtk.Box):
@@ -43,8 +44,17 @@ class PreviewView(Gtk.Box):
 
         self.overlay = Gtk.Overlay()
         self.overlay.set_vexpand(True)
+        self.overlay.set_hexpand(True)
         self.overlay.set_child(self.stack)
-        self.append(self.overlay)
+
+        self.thumbnails = PreviewThumbnailsView()
+
+        self.hbox = Gtk.Box.new(Gtk.Orientation.HORIZONTAL, 0)
+        self.hbox.set_vexpand(True)
+        self.hbox.get_style_context().add_class('preview-content')
+        self.hbox.append(self.thumbnails)
+        self.hbox.append(self.overlay)
+        self.append(self.hbox)
 
         self.target_label = Gtk.Label()
         self.target_label.set_halign(Gtk.Align.START)
@@ -54,6 +64,9 @@ class PreviewView(Gtk.Box):
         self.overlay.add_overlay(self.target_label)
         self.set_link_target_string('')
 
+        self.search_bar = PreviewSearchBar()
+        self.append(self.search_bar)
+
     def set_layout_data(self, layout_data):
         self.layout_data = layout_data
 
@@ -62,6 +75,73 @@ class PreviewView(Gtk.Box):
         self.target_label.set_visible(target_string != '')
 
 
+class PreviewThumbnailsView(Gtk.Revealer):
+    ''' A strip of small pages next to the preview '''
+
+    def __init__(self):
+        Gtk.Revealer.__init__(self)
+        self.set_transition_type(Gtk.RevealerTransitionType.SLIDE_RIGHT)
+
+        self.content = ScrollingWidget()
+        self.drawing_area = self.content.content
+        self.content.view.set_size_request(124, -1)
+        self.content.view.get_style_context().add_class('preview-thumbnails')
+
+        self.set_child(self.content.view)
+        self.set_reveal_child(False)
+
+
+class PreviewSearchBar(Gtk.Revealer):
+    ''' Find text in the pdf file '''
+
+    def __init__(self):
+        Gtk.Revealer.__init__(self)
+
+        self.box = Gtk.CenterBox()
+        self.box.set_orientation(Gtk.Orientation.HORIZONTAL)
+        self.box.get_style_context().add_class('search_bar')
+
+        self.left_box = Gtk.Box.new(Gtk.Orientation.HORIZONTAL, 0)
+
+        self.entry = SearchEntry()
+        self.entry.get_style_context().add_class('search_entry')
+        self.entry.set_size_request(200, -1)
+
+        self.prev_button = Gtk.Button.new_from_icon_name('go-up-symbolic')
+        self.prev_button.set_can_focus(False)
+        self.prev_button.set_tooltip_text(_('Previous result') + ' (Ctrl+Shift+G)')
+        self.next_button = Gtk.Button.new_from_icon_name('go-down-symbolic')
+        self.next_button.set_can_focus(False)
+        self.next_button.set_tooltip_text(_('Next result') + ' (Ctrl+G)')
+
+        self.left_box.append(self.entry)
+        self.left_box.append(self.prev_button)
+        self.left_box.append(self.next_button)
+        self.left_box.set_margin_start(6)
+        self.left_box.get_style_context().add_class('linked')
+
+        self.match_counter = Gtk.Label()
+        self.match_counter.set_halign(Gtk.Align.START)
+        self.match_counter.set_xalign(1)
+        self.match_counter.set_size_request(170, -1)
+        self.match_counter.set_property('can-target', False)
+        self.match_counter.get_style_context().add_class('search_match_counter')
+
+        self.overlay_wrapper = Gtk.Overlay()
+        self.overlay_wrapper.set_child(self.box)
+        self.overlay_wrapper.add_overlay(self.match_counter)
+
+        self.close_button = Gtk.Button.new_from_icon_name('window-close-symbolic')
+        self.close_button.get_style_context().add_class('flat')
+        self.close_button.set_can_focus(False)
+
+        self.box.set_start_widget(self.left_box)
+        self.box.set_end_widget(self.close_button)
+
+        self.set_child(self.overlay_wrapper)
+        self.set_reveal_child(False)
+
+
 class BlankSlateView(Gtk.Box):
 
     def __init__(self):
@@ -29,7 +29,8 @@ class Observable(object):
             changes in their states. '''
 
         if change_code in self.connected_functions:
-            for callback in self.connected_functions[change_code]:
+            # callbacks may disconnect themselves
+            for callback in list(self.connected_functions[change_code]):
                 if parameter != None:
                     callback(self, parameter)
                 else:
@@ -38,6 +38,10 @@ class HamburgerMenuView(Popover):
         self.button_save_all.set_action_name('win.save-all')
         self.add_closing_button(self.button_save_all)
 
+        self.button_build_all = MenuBuilder.create_button(_('Save and Build All Documents'))
+        self.button_build_all.set_action_name('win.save-and-build-all-roots')
+        self.add_closing_button(self.button_build_all)
+
         self.add_widget(Gtk.Separator.new(Gtk.Orientation.HORIZONTAL))
 
         self.add_menu_button(_('Session'), 'session')
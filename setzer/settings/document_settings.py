@@ -44,6 +44,15 @@ class DocumentSettings():
         document.build_system.document_has_been_built = document_data['has_been_built']
         document.build_system.build_time = document_data['build_time']
         document.build_system.has_synctex_file = document_data['has_synctex_file']
+        if 'input_fingerprints' in document_data:
+            document.build_system.input_fingerprints = document_data['input_fingerprints']
+        if 'build_history' in document_data:
+            document.build_system.build_history = document_data['build_history']
+            document.build_system.add_change_code('build_timing_changed')
+        if 'recorded_inputs' in document_data:
+            document.build_system.recorded_inputs = document_data['recorded_inputs']
+            document.build_system.recorded_inputs_key = document_data['recorded_inputs_key']
+            document.build_system.add_change_code('recorded_inputs_changed')
         document.build_system.update_can_sync()
 
         pdf_filename = document_data['pdf_filename']
@@ -72,6 +81,10 @@ class DocumentSettings():
         document_data['has_been_built'] = document.build_system.document_has_been_built
         document_data['build_time'] = document.build_system.build_time
         document_data['has_synctex_file'] = document.build_system.has_synctex_file
+        document_data['input_fingerprints'] = document.build_system.input_fingerprints
+        document_data['build_history'] = document.build_system.build_history
+        document_data['recorded_inputs'] = document.build_system.recorded_inputs
+        document_data['recorded_inputs_key'] = document.build_system.recorded_inputs_key
 
         document_data['pdf_filename'] = document.preview.pdf_filename
         document_data['pdf_date'] = document.preview.get_pdf_date()
@@ -72,8 +72,14 @@ class Settings(Observable):
         self.defaults['preferences']['autoshow_build_log'] = 'errors_warnings'
         self.defaults['preferences']['latex_interpreter'] = 'xelatex'
         self.defaults['preferences']['use_latexmk'] = False
+        self.defaults['preferences']['build_profile'] = 'normal'
+        self.defaults['preferences']['use_latex_worker'] = False
+        self.defaults['preferences']['halt_on_error'] = False
+        self.defaults['preferences']['auto_build'] = False
+        self.defaults['preferences']['auto_build_delay'] = 1500
         self.defaults['preferences']['color_scheme'] = 'default'
         self.defaults['preferences']['recolor_pdf'] = False
+        self.defaults['preferences']['preview_memory_budget'] = 256
         self.defaults['preferences']['spaces_instead_of_tabs'] = True
         self.defaults['preferences']['tab_width'] = 4
         self.defaults['preferences']['show_line_numbers'] = True
@@ -34,6 +34,8 @@ class ScrollingWidget(Observable):
         self.cursor_x, self.cursor_y = None, None
         self.scrolling_multiplier = 2.5
         self.last_cursor_scrolling_change = time.time()
+        self.velocity_y = 0
+        self.last_scrolling_time = time.time()
 
         self.view = Gtk.Overlay()
         self.content = Gtk.DrawingArea()
@@ -153,6 +155,7 @@ class ScrollingWidget(Observable):
         self.content.queue_draw()
 
     def on_adjustment_changed(self, adjustment):
+        self.update_velocity(self.adjustment_y.get_value())
         self.scrolling_offset_y = self.adjustment_y.get_value()
         self.scrolling_offset_x = self.adjustment_x.get_value()
         self.add_change_code('scrolling_offset_changed')
@@ -160,6 +163,25 @@ class ScrollingWidget(Observable):
         self.update_scrollbars()
         self.content.queue_draw()
 
+    def update_velocity(self, offset_y):
+        ''' Smoothed vertical scrolling speed in pixels per second, positive
+            when scrolling down. Pauses reset it. '''
+
+        if offset_y == self.scrolling_offset_y: return
+
+        now = time.time()
+        time_elapsed = now - self.last_scrolling_time
+        self.last_scrolling_time = now
+        if time_elapsed > 0.25:
+            self.velocity_y = 0
+        elif time_elapsed > 0:
+            velocity = (offset_y - self.scrolling_offset_y) / time_elapsed
+            self.velocity_y = 0.5 * self.velocity_y + 0.5 * velocity
+
+    def get_velocity_y(self):
+        if time.time() - self.last_scrolling_time > 0.25: return 0
+        return self.velocity_y
+
     def on_primary_button_press(self, controller, n_press, x, y):
         if n_press != 1: return
         modifiers = Gtk.accelerator_get_default_mod_mask()
@@ -38,8 +38,11 @@ class Actions(object):
         self.add_action('open-document-dialog', self.open_document_dialog)
         self.add_action('build', self.build)
         self.add_action('save-and-build', self.save_and_build)
+        self.add_action('save-and-build-current-part', self.save_and_build_current_part)
+        self.add_action('save-and-build-all-roots', self.save_and_build_all_roots)
         self.add_action('show-build-log', self.show_build_log)
         self.add_action('close-build-log', self.close_build_log)
+        self.add_action('export-build-timings', self.export_build_timings)
         self.add_action('save', self.save)
         self.add_action('save-as', self.save_as)
         self.add_action('save-all', self.save_all)
@@ -181,8 +184,11 @@ class Actions(object):
         self.actions['forward-sync'].set_enabled(can_sync)
         self.actions['build'].set_enabled(can_build)
         self.actions['save-and-build'].set_enabled(can_build)
+        self.actions['save-and-build-current-part'].set_enabled(can_build)
+        self.actions['save-and-build-all-roots'].set_enabled(can_build)
         self.actions['show-build-log'].set_enabled(document_active_is_latex)
         self.actions['close-build-log'].set_enabled(document_active_is_latex)
+        self.actions['export-build-timings'].set_enabled(can_build)
         self.actions['reset-zoom'].set_enabled(can_reset_zoom)
         self.actions['zoom-in'].set_enabled(can_zoom_in)
         self.actions['zoom-out'].set_enabled(can_zoom_out)
@@ -213,6 +219,25 @@ class Actions(object):
             self.save()
             document.build_system.build_and_forward_sync(active_document)
 
+    def save_and_build_current_part(self, action=None, parameter=None):
+        if self.workspace.get_active_document() == None: return
+
+        document = self.workspace.get_root_or_active_latex_document()
+        active_document = ServiceLocator.get_workspace().get_active_document()
+        if document == None or active_document == None: return
+
+        if document.filename == None:
+            DialogLocator.get_dialog('build_save').run(document)
+        else:
+            self.save()
+            document.build_system.build_current_part(active_document)
+
+    def save_and_build_all_roots(self, action=None, parameter=None):
+        for document in self.workspace.open_latex_documents:
+            if document.get_filename() != None and document.source_buffer.get_modified():
+                document.save_to_disk()
+        self.workspace.build_scheduler.build_all_roots()
+
     def build(self, action=None, parameter=None):
         if self.workspace.get_active_document() == None: return
 
@@ -242,6 +267,12 @@ class Actions(object):
     def close_build_log(self, action=None, parameter=''):
         self.workspace.set_show_build_log(False)
 
+    def export_build_timings(self, action=None, parameter=''):
+        document = self.workspace.get_root_or_active_latex_document()
+        if document == None: return
+
+        DialogLocator.get_dialog('export_build_timings').run(document)
+
     def save(self, action=None, parameter=None):
         if self.workspace.get_active_document() == None: return
 
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import gi
+from gi.repository import GLib, Gio
+
+import setzer.helpers.path as path_helpers
+from setzer.app.service_locator import ServiceLocator
+
+
+class AutoBuild(object):
+    ''' Saves and builds the root document once the user stopped typing for
+        a while. Edits during a running build cancel it, so there is never
+        more than one build per root document. Files the last build read
+        (figures, packages, data files) are watched as well. '''
+
+    def __init__(self, workspace):
+        self.workspace = workspace
+        self.settings = ServiceLocator.get_settings()
+
+        self.scheduled_builds = dict()
+        self.file_monitors = dict()
+
+        self.workspace.connect('new_document', self.on_new_document)
+        self.workspace.connect('document_removed', self.on_document_removed)
+        self.settings.connect('settings_changed', self.on_settings_changed)
+
+    def on_new_document(self, workspace, document):
+        if document.is_latex_document():
+            document.connect('changed', self.on_document_changed)
+            document.build_system.connect('recorded_inputs_changed', self.on_recorded_inputs_changed)
+            self.update_file_monitors(document)
+
+    def on_document_removed(self, workspace, document):
+        if document.is_latex_document():
+            document.disconnect('changed', self.on_document_changed)
+            document.build_system.disconnect('recorded_inputs_changed', self.on_recorded_inputs_changed)
+            self.remove_file_monitors(document)
+        self.cancel_scheduled_build(document)
+
+    def on_recorded_inputs_changed(self, build_system):
+        self.update_file_monitors(build_system.document)
+
+    def on_file_changed(self, monitor, file, other_file, event_type, document):
+        if event_type not in [Gio.FileMonitorEvent.CHANGES_DONE_HINT, Gio.FileMonitorEvent.CREATED, Gio.FileMonitorEvent.DELETED]: return
+        if not self.settings.get_value('preferences', 'auto_build'): return
+        if self.get_root_document_for(document) != document: return
+
+        self.schedule_build(document, None)
+
+    def on_settings_changed(self, settings, parameter):
+        section, item, value = parameter
+
+        if item == 'auto_build' and value == False:
+            for document in list(self.scheduled_builds):
+                self.cancel_scheduled_build(document)
+
+    def on_document_changed(self, document):
+        if not self.settings.get_value('preferences', 'auto_build'): return
+
+        root_document = self.get_root_document_for(document)
+        if root_document == None: return
+        if root_document.get_filename() == None: return
+
+        if root_document.build_system.get_build_state() not in ['', 'idle']:
+            root_document.build_system.stop_building()
+
+        self.schedule_build(root_document, document)
+
+    def schedule_build(self, root_document, edited_document):
+        self.cancel_scheduled_build(root_document)
+        delay = self.settings.get_value('preferences', 'auto_build_delay')
+        self.scheduled_builds[root_document] = GLib.timeout_add(delay, self.build, root_document, edited_document)
+
+    def cancel_scheduled_build(self, root_document):
+        if root_document in self.scheduled_builds:
+            GLib.source_remove(self.scheduled_builds[root_document])
+            del(self.scheduled_builds[root_document])
+
+    def build(self, root_document, edited_document):
+        # a watched file changed while building, try again once it's done.
+        if root_document.build_system.get_build_state() not in ['', 'idle']: return True
+
+        del(self.scheduled_builds[root_document])
+        if root_document not in self.workspace.open_documents: return False
+
+        documents = [document for document in self.workspace.open_latex_documents if self.get_root_document_for(document) == root_document]
+        unsaved_documents = [document for document in documents if document.source_buffer.get_modified()]
+        if len(unsaved_documents) == 0 and root_document.build_system.recorded_inputs == None: return False
+
+        for document in unsaved_documents:
+            if document.get_filename() != None:
+                document.save_to_disk()
+        if root_document.build_system.is_up_to_date(): return False
+
+        if edited_document in documents and edited_document.get_filename() != None:
+            root_document.build_system.build_and_forward_sync(edited_document)
+        else:
+            root_document.build_system.set_build_mode('build')
+            root_document.build_system.start_building()
+        return False
+
+    def get_root_document_for(self, document):
+        root_document = self.workspace.get_root_document()
+        if root_document == None:
+            return document
+        if document == root_document or document.get_filename() in self.get_included_filenames(root_document):
+            return root_document
+        return None
+
+    def update_file_monitors(self, document):
+        filenames = set(document.build_system.get_recorded_input_filenames())
+        file_monitors = self.file_monitors.setdefault(document, dict())
+
+        for filename in list(file_monitors):
+            if filename not in filenames:
+                file_monitors[filename].cancel()
+                del(file_monitors[filename])
+        for filename in filenames:
+            if filename in file_monitors: continue
+
+            try:
+                monitor = Gio.File.new_for_path(filename).monitor_file(Gio.FileMonitorFlags.NONE, None)
+            except GLib.Error: continue
+            monitor.connect('changed', self.on_file_changed, document)
+            file_monitors[filename] = monitor
+
+    def remove_file_monitors(self, document):
+        if document not in self.file_monitors: return
+
+        for monitor in self.file_monitors[document].values():
+            monitor.cancel()
+        del(self.file_monitors[document])
+
+    def get_included_filenames(self, root_document):
+        filenames = set(filename for filename in root_document.build_system.get_recorded_input_filenames() if filename.endswith('.tex'))
+        filenames.discard(root_document.get_filename())
+        documents = [root_document]
+        while len(documents) > 0:
+            document = documents.pop()
+            for filename, offset in document.parser.symbols['included_latex_files']:
+                filename = path_helpers.get_abspath(filename, root_document.get_dirname())
+                if filename in filenames: continue
+
+                filenames.add(filename)
+                included_document = self.workspace.get_document_by_filename(filename)
+                if included_document != None and included_document.is_latex_document():
+                    documents.append(included_document)
+        return filenames
+
+
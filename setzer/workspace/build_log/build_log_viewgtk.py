@@ -47,6 +47,12 @@ class BuildLogView(Gtk.Box):
         self.close_button.set_can_focus(False)
         self.close_button.set_action_name('win.close-build-log')
 
+        self.export_button = Gtk.Button.new_from_icon_name('document-save-symbolic')
+        self.export_button.get_style_context().add_class('flat')
+        self.export_button.set_can_focus(False)
+        self.export_button.set_tooltip_text(_('Export build timings'))
+        self.export_button.set_action_name('win.export-build-timings')
+
         self.header_label = Gtk.Label()
         self.header_label.set_size_request(300, -1)
         self.header_label.set_xalign(0)
@@ -55,6 +61,7 @@ class BuildLogView(Gtk.Box):
 
         self.header = Gtk.Box.new(Gtk.Orientation.HORIZONTAL, 0)
         self.header.append(self.header_label)
+        self.header.append(self.export_button)
         self.header.append(self.close_button)
 
         self.append(self.header)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# coding: utf-8
+
+# Copyright (C) 2017-present Robert Griesel
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+# 
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+# 
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>
+
+import os
+import os.path
+import time
+import base64
+import shutil
+import itertools
+import threading
+
+from setzer.dialogs.dialog_locator import DialogLocator
+from setzer.app.service_locator import ServiceLocator
+
+
+class BuildScheduler(object):
+    ''' Lets documents build in parallel, up to one build per CPU. The
+        document shown in the preview goes first. Every document builds
+        into a folder of its own, so documents in the same folder don't
+        have to wait for each other. '''
+
+    def __init__(self, workspace):
+        self.workspace = workspace
+
+        self.max_running_builds = os.cpu_count() or 1
+        self.running_builds = 0
+        self.waiting_tickets = list()
+        self.ticket_numbers = itertools.count()
+        self.condition = threading.Condition()
+
+        self.documentclass_regex = ServiceLocator.get_regex_object(r'(?m)^[^%\n]*\\documentclass')
+        self.batch = None
+
+        self.build_folder_max_age = 30 * 24 * 60 * 60
+        threading.Thread(target=self.remove_old_build_folders, daemon=True).start()
+
+    def acquire(self, build_system, query):
+        ''' Called from the build thread, blocks until the build may start.
+            Returns False if the build was stopped while waiting. '''
+
+        ticket = (self.get_priority(build_system), next(self.ticket_numbers))
+        with self.condition:
+            self.waiting_tickets.append(ticket)
+            while not self.can_start(ticket):
+                if query.force_building_to_stop:
+                    self.waiting_tickets.remove(ticket)
+                    self.condition.notify_all()
+                    return False
+                self.condition.wait()
+            self.waiting_tickets.remove(ticket)
+            self.running_builds += 1
+        return True
+
+    def release(self, query):
+        with self.condition:
+            self.running_builds -= 1
+            self.condition.notify_all()
+
+    def notify(self):
+        ''' Wakes up the waiting builds, one of them may have been stopped. '''
+
+        with self.condition:
+            self.condition.notify_all()
+
+    def can_start(self, ticket):
+        if self.running_builds >= self.max_running_builds: return False
+        return ticket == min(self.waiting_tickets)
+
+    def remove_old_build_folders(self):
+        ''' Build folders stay between sessions, so the first build of a
+            document can reuse its .aux files. Those of documents that are
+            gone or weren't built for a while are removed. '''
+
+        folder = os.path.join(ServiceLocator.get_cache_folder(), 'build')
+        try: entries = list(os.scandir(folder))
+        except OSError: return
+
+        for entry in entries:
+            try: filename = base64.urlsafe_b64decode(entry.name).decode()
+            except ValueError: filename = None
+
+            if filename in [document.get_filename() for document in self.workspace.open_latex_documents]: continue
+            try:
+                if filename != None and os.path.isfile(filename) and time.time() - entry.stat().st_mtime < self.build_folder_max_age: continue
+            except OSError: continue
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    def get_priority(self, build_system):
+        if build_system.document == self.workspace.get_root_or_active_latex_document(): return 0
+        return 1
+
+    def get_root_documents(self):
+        ''' All open documents that can be built on their own. The root
+            document, if one is set, only goes first (see get_priority). '''
+
+        documents = list()
+        for document in self.workspace.open_latex_documents:
+            if document.get_filename() == None: continue
+            if self.documentclass_regex.search(document.get_all_text()) == None: continue
+            documents.append(document)
+        return documents
+
+    def build_all_roots(self):
+        ''' Does nothing while the last batch is still building, its
+            documents would be started again and never reported. '''
+
+        if self.batch != None: return
+
+        documents = self.get_root_documents()
+        if len(documents) == 0: return
+
+        self.batch = {'documents': documents, 'running': set(), 'start_time': time.time()}
+        for document in documents:
+            document.build_system.set_build_mode('build')
+            document.build_system.start_building()
+            if document.build_system.get_build_state() not in ['', 'idle']:
+                self.batch['running'].add(document)
+                document.build_system.connect('build_state_change', self.on_build_state_change)
+        self.check_batch_finished()
+
+    def on_build_state_change(self, build_system, build_state):
+        if build_state != 'idle': return
+        if self.batch == None or build_system.document not in self.batch['running']: return
+
+        build_system.disconnect('build_state_change', self.on_build_state_change)
+        self.batch['running'].discard(build_system.document)
+        self.check_batch_finished()
+
+    def check_batch_finished(self):
+        if len(self.batch['running']) > 0: return
+
+        wall_time = time.time() - self.batch['start_time']
+        build_times = [(document.get_displayname(), document.build_system.build_time) for document in self.batch['documents']]
+        self.batch = None
+        DialogLocator.get_dialog('build_all_finished').run(wall_time, build_times)
+
+
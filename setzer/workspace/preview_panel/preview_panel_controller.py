@@ -34,6 +34,8 @@ class PreviewPanelController(object):
 
         self.view.external_viewer_button.connect('clicked', self.on_external_viewer_button_clicked)
         self.view.recolor_pdf_toggle.connect('toggled', self.on_recolor_pdf_toggle_toggled)
+        self.view.search_toggle.connect('toggled', self.on_search_toggle_toggled)
+        self.view.thumbnails_toggle.connect('toggled', self.on_thumbnails_toggle_toggled)
 
     def on_zoom_in_button_clicked(self, button):
         document = self.workspace.get_root_or_active_latex_document()
@@ -52,6 +54,22 @@ class PreviewPanelController(object):
             if document.preview.poppler_document != None:
                 Gio.AppInfo.launch_default_for_uri(GLib.filename_to_uri(pdf_filename))
 
+    def on_search_toggle_toggled(self, toggle_button, parameter=None):
+        document = self.workspace.get_root_or_active_latex_document()
+        if document != None:
+            if toggle_button.get_active():
+                document.preview.search.show_search_bar()
+            else:
+                document.preview.search.hide_search_bar()
+
+    def on_thumbnails_toggle_toggled(self, toggle_button, parameter=None):
+        document = self.workspace.get_root_or_active_latex_document()
+        if document != None:
+            if toggle_button.get_active():
+                document.preview.thumbnails.show_thumbnails()
+            else:
+                document.preview.thumbnails.hide_thumbnails()
+
     def on_recolor_pdf_toggle_toggled(self, toggle_button, parameter=None):
         recolor_pdf = toggle_button.get_active()
         if ServiceLocator.get_settings().get_value('preferences', 'recolor_pdf') != recolor_pdf:
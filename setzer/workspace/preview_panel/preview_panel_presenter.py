@@ -61,6 +61,8 @@ class PreviewPanelPresenter(object):
     def set_preview_document(self):
         if self.document != None:
             self.document.preview.disconnect('pdf_changed', self.on_pdf_changed)
+            self.document.preview.search.disconnect('search_bar_visibility_changed', self.on_search_bar_visibility_changed)
+            self.document.preview.thumbnails.disconnect('thumbnails_visibility_changed', self.on_thumbnails_visibility_changed)
 
         self.document = self.workspace.get_root_or_active_latex_document()
         if self.document == None:
@@ -73,6 +75,8 @@ class PreviewPanelPresenter(object):
             self.update_buttons()
             self.update_zoom_level()
             self.document.preview.connect('pdf_changed', self.on_pdf_changed)
+            self.document.preview.search.connect('search_bar_visibility_changed', self.on_search_bar_visibility_changed)
+            self.document.preview.thumbnails.connect('thumbnails_visibility_changed', self.on_thumbnails_visibility_changed)
             self.document.preview.connect('position_changed', self.on_position_changed)
             self.document.preview.connect('layout_changed', self.on_layout_changed)
             self.document.preview.zoom_manager.connect('zoom_level_changed', self.on_zoom_level_changed)
@@ -81,6 +85,12 @@ class PreviewPanelPresenter(object):
         self.update_label()
         self.update_buttons()
 
+    def on_search_bar_visibility_changed(self, search):
+        self.update_buttons()
+
+    def on_thumbnails_visibility_changed(self, thumbnails):
+        self.update_buttons()
+
     def on_position_changed(self, preview):
         self.update_label()
 
@@ -118,7 +128,13 @@ class PreviewPanelPresenter(object):
             self.view.zoom_out_button.set_visible(False)
             self.view.zoom_level_button.set_visible(False)
             self.view.zoom_in_button.set_visible(False)
+            self.view.search_toggle.set_visible(False)
+            self.view.thumbnails_toggle.set_visible(False)
         else:
+            self.view.search_toggle.set_visible(True)
+            self.view.search_toggle.set_active(self.document.preview.search.is_visible())
+            self.view.thumbnails_toggle.set_visible(True)
+            self.view.thumbnails_toggle.set_active(self.document.preview.thumbnails.is_visible())
             self.view.external_viewer_button.set_visible(True)
             self.view.recolor_pdf_toggle.set_visible(True)
             self.view.zoom_out_button.set_visible(True)
@@ -67,7 +67,22 @@ class PreviewPanelView(Gtk.Box):
         self.external_viewer_button.set_can_focus(False)
         self.external_viewer_button.get_style_context().add_class('scbar')
 
+        self.search_toggle = Gtk.ToggleButton()
+        self.search_toggle.set_icon_name('edit-find-symbolic')
+        self.search_toggle.set_tooltip_text(_('Find in pdf'))
+        self.search_toggle.get_style_context().add_class('flat')
+        self.search_toggle.set_can_focus(False)
+        self.search_toggle.get_style_context().add_class('scbar')
+
+        self.thumbnails_toggle = Gtk.ToggleButton()
+        self.thumbnails_toggle.set_icon_name('sidebar-show-symbolic')
+        self.thumbnails_toggle.set_tooltip_text(_('Show page thumbnails'))
+        self.thumbnails_toggle.get_style_context().add_class('flat')
+        self.thumbnails_toggle.set_can_focus(False)
+        self.thumbnails_toggle.get_style_context().add_class('scbar')
+
         self.action_bar_right = Gtk.Box.new(Gtk.Orientation.HORIZONTAL, 0)
+        self.action_bar_right.append(self.search_toggle)
         self.action_bar_right.append(self.zoom_out_button)
         self.action_bar_right.append(self.zoom_level_button)
         self.action_bar_right.append(self.zoom_in_button)
@@ -79,6 +94,7 @@ class PreviewPanelView(Gtk.Box):
         self.paging_label.get_style_context().add_class('paging-widget')
 
         self.action_bar_left = Gtk.Box.new(Gtk.Orientation.HORIZONTAL, 0)
+        self.action_bar_left.append(self.thumbnails_toggle)
         self.action_bar_left.append(self.paging_label)
 
         self.action_bar = Gtk.CenterBox()
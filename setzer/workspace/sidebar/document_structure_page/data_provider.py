@@ -56,6 +56,9 @@ class DataProvider(Observable):
     def on_is_root_changed(self, document, parameter=None):
         self.update_data()
 
+    def on_recorded_inputs_changed(self, build_system):
+        self.update_data()
+
     def on_realize(self, view, *parameter):
         view.disconnect(self.signal_id)
         self.update_data()
@@ -66,10 +69,12 @@ class DataProvider(Observable):
             if self.document != None:
                 self.document.disconnect('changed', self.on_buffer_changed)
                 self.document.disconnect('is_root_changed', self.on_is_root_changed)
+                self.document.build_system.disconnect('recorded_inputs_changed', self.on_recorded_inputs_changed)
             self.document = document
             if self.document != None:
                 self.document.connect('changed', self.on_buffer_changed)
                 self.document.connect('is_root_changed', self.on_is_root_changed)
+                self.document.build_system.connect('recorded_inputs_changed', self.on_recorded_inputs_changed)
             self.update_data()
 
     def update_data(self, *params):
@@ -81,8 +86,7 @@ class DataProvider(Observable):
     def update_integrated_includes(self):
         integrated_includes = dict()
         if self.document.get_is_root():
-            for filename, offset in self.document.parser.symbols['included_latex_files']:
-                filename = path_helpers.get_abspath(filename, self.document.get_dirname())
+            for filename, offset in self.get_included_files():
                 document = self.workspace.get_document_by_filename(filename)
                 if document:
                     integrated_includes[document] = (document, offset)
@@ -94,8 +98,7 @@ class DataProvider(Observable):
 
     def get_includes(self):
         includes = list()
-        for filename, offset in self.document.parser.symbols['included_latex_files']:
-            filename = path_helpers.get_abspath(filename, self.document.get_dirname())
+        for filename, offset in self.get_included_files():
             document = self.workspace.get_document_by_filename(filename)
             if document and document in self.integrated_includes:
                 includes.append({'filename': filename, 'offset': offset, 'document': document})
@@ -103,4 +106,22 @@ class DataProvider(Observable):
                 includes.append({'filename': filename, 'offset': offset, 'document': None})
         return includes
 
+    def get_included_files(self):
+        ''' Files included by the document, from the parser and from what the
+            last build actually read (e.g. \input inside macros). Files only
+            the build knows about are listed at the end of the document. '''
+
+        included_files = list()
+        for filename, offset in self.document.parser.symbols['included_latex_files']:
+            included_files.append((path_helpers.get_abspath(filename, self.document.get_dirname()), offset))
+
+        filenames = set(filename for filename, offset in included_files)
+        end_offset = self.document.source_buffer.get_char_count()
+        for filename in self.document.build_system.get_recorded_input_filenames():
+            if not filename.endswith('.tex'): continue
+            if filename == self.document.get_filename() or filename in filenames: continue
+
+            included_files.append((filename, end_offset))
+        return included_files
+
 
@@ -34,6 +34,8 @@ import setzer.workspace.headerbar.headerbar as headerbar
 import setzer.workspace.sidebar.sidebar as sidebar
 import setzer.workspace.shortcutsbar.shortcutsbar as shortcutsbar
 import setzer.workspace.build_log.build_log as build_log
+import setzer.workspace.auto_build.auto_build as auto_build
+import setzer.workspace.build_scheduler.build_scheduler as build_scheduler
 import setzer.workspace.actions.actions as actions
 import setzer.workspace.context_menu.context_menu as context_menu
 from setzer.app.service_locator import ServiceLocator
@@ -76,6 +78,8 @@ class Workspace(Observable):
         self.preview_panel = preview_panel.PreviewPanel(self)
         self.help_panel = help_panel.HelpPanel(self)
         self.build_log = build_log.BuildLog(self)
+        self.auto_build = auto_build.AutoBuild(self)
+        self.build_scheduler = build_scheduler.BuildScheduler(self)
         self.controller = workspace_controller.WorkspaceController(self)
 
     def open_document_by_filename(self, filename):
@@ -118,6 +122,7 @@ class Workspace(Observable):
         self.open_documents.remove(document)
         if document.is_latex_document():
             self.open_latex_documents.remove(document)
+            document.build_system.shutdown()
         if self.active_document == document:
             candidate = self.get_last_active_document()
             if candidate == None: